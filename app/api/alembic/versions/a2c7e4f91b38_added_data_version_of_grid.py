@@ -0,0 +1,33 @@
+"""Added data version of grid
+
+Revision ID: a2c7e4f91b38
+Revises: f3a9d1e7b254
+Create Date: 2026-10-18 19:12:44.208613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+import sqlmodel  
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c7e4f91b38'
+down_revision = 'f3a9d1e7b254'
+branch_labels = None
+depends_on = None
+
+data_version_tables = ["basic.grid_visualization", "basic.study_area_grid_visualization"]
+
+
+def upgrade():
+    for table in data_version_tables:
+        op.execute(
+            f"""CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('grid');"""
+        )
+
+
+def downgrade():
+    for table in data_version_tables:
+        op.execute(f"DROP TRIGGER IF EXISTS trigger_data_version ON {table};")
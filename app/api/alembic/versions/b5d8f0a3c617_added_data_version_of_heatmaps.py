@@ -0,0 +1,41 @@
+"""Added data version of heatmaps
+
+Revision ID: b5d8f0a3c617
+Revises: a2c7e4f91b38
+Create Date: 2026-10-18 19:40:21.553017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+import sqlmodel  
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8f0a3c617'
+down_revision = 'a2c7e4f91b38'
+branch_labels = None
+depends_on = None
+
+data_version_tables = {
+    "customer.reached_poi_heatmap_scenario": "heatmap_scenario",
+    "customer.heatmap_grid_scenario": "heatmap_scenario",
+    "customer.nearest_poi_heatmap": "nearest_poi_heatmap",
+}
+
+
+def upgrade():
+    for table, name in data_version_tables.items():
+        op.execute(
+            f"""CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('{name}');"""
+        )
+    op.execute(
+        """CREATE TRIGGER trigger_data_version AFTER UPDATE OF routing_heatmap_computed OR DELETE ON customer.scenario
+        FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');"""
+    )
+
+
+def downgrade():
+    for table in list(data_version_tables) + ["customer.scenario"]:
+        op.execute(f"DROP TRIGGER IF EXISTS trigger_data_version ON {table};")
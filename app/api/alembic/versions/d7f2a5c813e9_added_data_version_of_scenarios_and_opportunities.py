@@ -0,0 +1,49 @@
+"""Added data version of scenarios and opportunities
+
+Revision ID: d7f2a5c813e9
+Revises: c41e9d7a2b60
+Create Date: 2026-10-18 16:48:12.730164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+import sqlmodel  
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f2a5c813e9'
+down_revision = 'c41e9d7a2b60'
+branch_labels = None
+depends_on = None
+
+data_version_tables = {
+    "customer.way_modified": "scenario",
+    "customer.poi_modified": "scenario",
+    "customer.building_modified": "scenario",
+    "customer.population_modified": "scenario",
+    "customer.aoi_modified": "scenario",
+    "basic.poi": "opportunities",
+    "customer.poi_user": "opportunities",
+    "basic.population": "opportunities",
+    "basic.aoi": "opportunities",
+    "customer.aoi_user": "opportunities",
+    "customer.data_upload": "opportunities",
+    "basic.opportunity_group": "opportunities",
+    "basic.opportunity_default_config": "opportunities",
+    "basic.opportunity_study_area_config": "opportunities",
+    "customer.opportunity_user_config": "opportunities",
+}
+
+
+def upgrade():
+    for table, name in data_version_tables.items():
+        op.execute(
+            f"""CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('{name}');"""
+        )
+
+
+def downgrade():
+    for table in data_version_tables:
+        op.execute(f"DROP TRIGGER IF EXISTS trigger_data_version ON {table};")
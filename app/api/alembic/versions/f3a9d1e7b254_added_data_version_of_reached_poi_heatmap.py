@@ -0,0 +1,36 @@
+"""Added data version of reached poi heatmap
+
+Revision ID: f3a9d1e7b254
+Revises: e58b0c6d4f17
+Create Date: 2026-10-18 18:05:37.412890
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+import sqlmodel  
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9d1e7b254'
+down_revision = 'e58b0c6d4f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for operation, transition in [("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")]:
+        op.execute(
+            f"""CREATE TRIGGER trigger_data_version_{operation} AFTER {operation.upper()} ON customer.reached_poi_heatmap
+            REFERENCING {transition} TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('reached_poi_heatmap');"""
+        )
+    op.execute(
+        """CREATE TRIGGER trigger_data_version_truncate AFTER TRUNCATE ON customer.reached_poi_heatmap
+        FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('reached_poi_heatmap');"""
+    )
+
+
+def downgrade():
+    for operation in ["insert", "update", "delete", "truncate"]:
+        op.execute(f"DROP TRIGGER IF EXISTS trigger_data_version_{operation} ON customer.reached_poi_heatmap;")
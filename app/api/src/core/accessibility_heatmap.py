@@ -0,0 +1,617 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.data_version import OPPORTUNITIES, REACHED_POI_HEATMAP, read_data_version
+from src.resources.enums import CalculationTypes
+
+PERCENTILES = 5
+
+# Reached POIs of the default heatmap (basic.poi) and of the uploaded POIs
+# (customer.poi_user) that intersect the heatmap buffer of the study area. Default POIs
+# have the data_upload_id 0.
+BASE_POIS_QUERY = """
+    SELECT r.poi_uid, p.category, p.name, 0 AS data_upload_id,
+    r.grid_visualization_ids, r.accessibility_indices
+    FROM customer.reached_poi_heatmap r, basic.study_area s, basic.poi p
+    WHERE s.id = $1
+    AND ST_Intersects(p.geom, s.buffer_geom_heatmap)
+    AND p.uid = r.poi_uid
+    AND r.scenario_id IS NULL
+    UNION ALL
+    SELECT r.poi_uid, p.category, p.name, p.data_upload_id,
+    r.grid_visualization_ids, r.accessibility_indices
+    FROM customer.reached_poi_heatmap r, basic.study_area s, customer.poi_user p
+    WHERE s.id = $1
+    AND ST_Intersects(p.geom, s.buffer_geom_heatmap)
+    AND p.uid = r.poi_uid
+    AND r.scenario_id IS NULL
+"""
+SCENARIO_POIS_QUERY = """
+    SELECT r.poi_uid, p.category, p.name, 0 AS data_upload_id,
+    r.grid_visualization_ids, r.accessibility_indices
+    FROM customer.reached_poi_heatmap r, basic.study_area s, customer.poi_modified p
+    WHERE s.id = $1
+    AND ST_Intersects(p.geom, s.buffer_geom_heatmap)
+    AND p.uid = r.poi_uid
+    AND p.scenario_id = $2
+    AND r.scenario_id = $2
+    AND p.edit_type <> 'd'
+"""
+# Reached POIs of the grid cells which are recomputed on the network of a scenario
+# (customer.reached_poi_heatmap_scenario). Entries of modified POIs belong to
+# customer.poi_modified.
+SCENARIO_GRID_QUERY = """
+    SELECT g.grid_visualization_ids
+    FROM customer.scenario s, customer.heatmap_grid_scenario g
+    WHERE s.id = $1
+    AND g.scenario_id = s.id
+    AND s.routing_heatmap_computed
+"""
+SCENARIO_BASE_POIS_DELTA_QUERY = """
+    SELECT r.poi_uid, p.category, p.name, 0 AS data_upload_id,
+    r.grid_visualization_ids, r.accessibility_indices
+    FROM customer.reached_poi_heatmap_scenario r, basic.poi p
+    WHERE r.scenario_id = $1
+    AND p.uid = r.poi_uid
+    AND NOT p.uid = ANY($2::text[])
+    UNION ALL
+    SELECT r.poi_uid, p.category, p.name, p.data_upload_id,
+    r.grid_visualization_ids, r.accessibility_indices
+    FROM customer.reached_poi_heatmap_scenario r, customer.poi_user p
+    WHERE r.scenario_id = $1
+    AND p.uid = r.poi_uid
+    AND NOT p.uid = ANY($2::text[])
+"""
+SCENARIO_POIS_DELTA_QUERY = """
+    SELECT r.poi_uid, p.category, p.name, 0 AS data_upload_id,
+    r.grid_visualization_ids, r.accessibility_indices
+    FROM customer.reached_poi_heatmap_scenario r, customer.poi_modified p
+    WHERE r.scenario_id = $1
+    AND p.uid = r.poi_uid
+    AND p.scenario_id = $1
+    AND p.edit_type <> 'd'
+"""
+# Nearest POI per grid calculation cell of the categories (customer.nearest_poi_heatmap)
+NEAREST_POIS_QUERY = """
+    SELECT n.grid_calculation_ids, n.grid_visualization_ids, n.costs, n.poi_uids
+    FROM customer.nearest_poi_heatmap n
+    WHERE n.category = ANY($1::text[])
+"""
+
+
+def ntile(values: np.ndarray, buckets: int = PERCENTILES) -> np.ndarray:
+    """Same as ntile(buckets) OVER (ORDER BY values) in PostgreSQL."""
+    n = len(values)
+    order = np.argsort(values, kind="stable")
+    size, larger = divmod(n, buckets)
+    # The first (n % buckets) buckets get one row more
+    position = np.arange(n)
+    split = larger * (size + 1)
+    bucket = np.where(
+        position < split,
+        position // (size + 1),
+        larger + (position - split) // max(size, 1),
+    )
+    result = np.empty(n, dtype=np.int64)
+    result[order] = bucket + 1
+    return result
+
+
+def accessibility_indices(
+    costs: np.ndarray, sensitivities: Sequence[int]
+) -> np.ndarray:
+    """
+    Accessibility indices of travel times, one row per sensitivity in ascending order
+    (see basic.reached_pois_heatmap).
+    """
+    costs = np.asarray(costs, dtype=np.float32)
+    sensitivities = np.sort(np.asarray(sensitivities, dtype=np.float32))
+    indices = (
+        np.exp((costs * costs)[np.newaxis, :] / -sensitivities[:, np.newaxis]) * 10000
+    )
+    return np.rint(indices).astype(np.int32)
+
+
+def reached_poi_arrays(
+    poi_index: np.ndarray,
+    grid_visualization_ids: np.ndarray,
+    costs: np.ndarray,
+    sensitivities: Sequence[int],
+) -> Iterator[Tuple[int, List[int], List[int], List[List[int]]]]:
+    """
+    Aggregate the travel times between grid calculation cells and POIs to the arrays of
+    customer.reached_poi_heatmap: the average cost per POI and grid visualization cell
+    and its accessibility indices. Yields (poi_index, grid_visualization_ids, costs,
+    accessibility_indices).
+    """
+    if len(poi_index) == 0:
+        return
+    keys = np.column_stack((poi_index, grid_visualization_ids)).astype(np.int64)
+    keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    average = np.rint(
+        np.bincount(inverse, weights=costs, minlength=len(keys))
+        / np.bincount(inverse, minlength=len(keys))
+    ).astype(np.int64)
+    indices = accessibility_indices(average, sensitivities)
+
+    starts = np.flatnonzero(np.r_[True, keys[1:, 0] != keys[:-1, 0]])
+    ends = np.r_[starts[1:], len(keys)]
+    for start, end in zip(starts, ends):
+        yield (
+            int(keys[start, 0]),
+            keys[start:end, 1].tolist(),
+            average[start:end].tolist(),
+            indices[:, start:end].tolist(),
+        )
+
+
+def nearest_poi(records: Sequence) -> pd.DataFrame:
+    """
+    Travel time to the nearest POI per grid visualization cell from rows of
+    (grid_calculation_ids, grid_visualization_ids, costs, poi_uids). The nearest POI of
+    a grid calculation cell is the one with the lowest cost over all rows, the cost of a
+    grid visualization cell is the average over its reached grid calculation cells and
+    its POI the one of the nearest grid calculation cell.
+
+    Returns grid_visualization_id, percentile_nearest_poi (5 is the nearest),
+    nearest_poi_cost and nearest_poi_uid of the reached grid cells.
+    """
+    grid_calculation_ids = np.concatenate(
+        [np.asarray(r[0], dtype=np.int64) for r in records]
+        + [np.empty(0, dtype=np.int64)]
+    )
+    grid_visualization_ids = np.concatenate(
+        [np.asarray(r[1], dtype=np.int64) for r in records]
+        + [np.empty(0, dtype=np.int64)]
+    )
+    costs = np.concatenate(
+        [np.asarray(r[2], dtype=np.int64) for r in records]
+        + [np.empty(0, dtype=np.int64)]
+    )
+    poi_uids = np.array([uid for r in records for uid in r[3]], dtype=object)
+
+    # Nearest POI per grid calculation cell
+    order = np.lexsort((costs, grid_calculation_ids))
+    _, first = np.unique(grid_calculation_ids[order], return_index=True)
+    nearest = order[first]
+    grid_visualization_ids = grid_visualization_ids[nearest]
+    costs = costs[nearest]
+    poi_uids = poi_uids[nearest]
+
+    order = np.lexsort((costs, grid_visualization_ids))
+    grid_ids, first, inverse = np.unique(
+        grid_visualization_ids[order], return_index=True, return_inverse=True
+    )
+    average = np.rint(
+        np.bincount(inverse, weights=costs[order], minlength=len(grid_ids))
+        / np.bincount(inverse, minlength=len(grid_ids))
+    ).astype(np.int64)
+    return pd.DataFrame(
+        {
+            "grid_visualization_id": grid_ids,
+            "percentile_nearest_poi": ntile(-average),
+            "nearest_poi_cost": average,
+            "nearest_poi_uid": poi_uids[order[first]],
+        }
+    )
+
+
+def classify(values: np.ndarray, borders: np.ndarray) -> np.ndarray:
+    """
+    Percentiles of the scenario values against the lower borders of the default
+    percentiles (see basic.heatmap_local_accessibility). Missing borders are NaN and
+    never match.
+    """
+    conditions = [values == 0, (values > 0) & (values < borders[1])]
+    for i in range(1, PERCENTILES - 1):
+        conditions.append((values >= borders[i]) & (values < borders[i + 1]))
+    conditions.append(values >= borders[PERCENTILES - 1])
+    return np.select(conditions, list(range(PERCENTILES + 1)), default=0)
+
+
+@dataclass
+class PoiAccessibility:
+    """
+    Accessibility indices of reached POIs, inverted to the grid cells they reach.
+
+    The entries (POI, grid cell) are sorted by grid cell and grouped by (grid cell,
+    source, category, name), which is the grouping of POIs with multiple entrances. The
+    groups of grid_ids[i] are [grid_offsets[i], grid_offsets[i + 1]), the entries of
+    group j are [group_offsets[j], group_offsets[j + 1]). indices holds one row per
+    sensitivity.
+    """
+
+    poi_uid: np.ndarray
+    poi_category: np.ndarray  # Index into categories
+    poi_data_upload_id: np.ndarray
+    categories: List[str]
+    entry_poi: np.ndarray
+    indices: np.ndarray
+    group_category: np.ndarray
+    group_offsets: np.ndarray
+    grid_ids: np.ndarray
+    grid_offsets: np.ndarray
+
+    @classmethod
+    def from_records(cls, records: Sequence) -> "PoiAccessibility":
+        """
+        Build from rows of (poi_uid, category, name, data_upload_id,
+        grid_visualization_ids, accessibility_indices).
+        """
+        records = [r for r in records if r[4]]
+        poi_uid = np.array([r[0] for r in records], dtype=object)
+        poi_category, categories = pd.factorize(
+            pd.Series([r[1] for r in records], dtype=object)
+        )
+        poi_name, _ = pd.factorize(pd.Series([r[2] for r in records], dtype=object))
+        poi_data_upload_id = np.array([r[3] for r in records], dtype=np.int64)
+
+        counts = np.fromiter(
+            (len(r[4]) for r in records), dtype=np.int64, count=len(records)
+        )
+        entry_poi = np.repeat(np.arange(len(records)), counts)
+        entry_grid = np.fromiter(
+            (g for r in records for g in r[4]), dtype=np.int64, count=int(counts.sum())
+        )
+        rows = [
+            np.asarray(r[5], dtype=np.int32).reshape(-1, len(r[4])) for r in records
+        ]
+        n_sensitivities = min((len(r) for r in rows), default=0)
+        if rows:
+            indices = np.concatenate([r[:n_sensitivities] for r in rows], axis=1)
+        else:
+            indices = np.empty((0, 0), dtype=np.int32)
+
+        # Default and uploaded POIs are grouped separately
+        poi_source = (poi_data_upload_id != 0).astype(np.int64)
+        group_key = np.column_stack(
+            (
+                entry_grid,
+                poi_source[entry_poi],
+                poi_category[entry_poi],
+                poi_name[entry_poi],
+            )
+        )
+        order = np.lexsort(group_key.T[::-1])
+        group_key = group_key[order]
+        entry_poi = entry_poi[order]
+        indices = indices[:, order]
+
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = np.any(group_key[1:] != group_key[:-1], axis=1)
+        group_starts = np.flatnonzero(new_group)
+        group_offsets = np.append(group_starts, len(order))
+        group_grid = group_key[group_starts, 0]
+
+        new_grid = np.ones(len(group_starts), dtype=bool)
+        new_grid[1:] = group_grid[1:] != group_grid[:-1]
+        grid_starts = np.flatnonzero(new_grid)
+
+        return cls(
+            poi_uid=poi_uid,
+            poi_category=poi_category.astype(np.int64),
+            poi_data_upload_id=poi_data_upload_id,
+            categories=list(categories),
+            entry_poi=entry_poi,
+            indices=np.ascontiguousarray(indices),
+            group_category=group_key[group_starts, 2],
+            group_offsets=group_offsets,
+            grid_ids=group_grid[grid_starts],
+            grid_offsets=np.append(grid_starts, len(group_starts)),
+        )
+
+    def accessibility(
+        self,
+        configuration: Dict[str, dict],
+        sensitivities: List[int],
+        multiple_entrances: Dict[str, bool],
+        poi_mask: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Weighted sum of the accessibility indices per grid cell
+        (basic.prepare_heatmap_local_accessibility summed per grid cell). Entrances of
+        POIs with multiple entrances count once per category and name with their maximum
+        index.
+
+        Returns the ids of the grid cells reached by any selected POI and their
+        accessibility index.
+        """
+        n_categories = len(self.categories)
+        sensitivity_row = np.full(n_categories + 1, -1, dtype=np.int64)
+        weight = np.zeros(n_categories + 1, dtype=np.int64)
+        multiple = np.zeros(n_categories + 1, dtype=bool)
+        for i, category in enumerate(self.categories):
+            config = configuration.get(category)
+            if config is None or category not in multiple_entrances:
+                continue
+            if config["sensitivity"] not in sensitivities:
+                continue
+            row = sensitivities.index(config["sensitivity"])
+            if row >= self.indices.shape[0]:
+                continue
+            sensitivity_row[i] = row
+            weight[i] = config["weight"]
+            multiple[i] = multiple_entrances[category]
+
+        if len(self.grid_ids) == 0 or self.indices.shape[0] == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        entry_category = self.poi_category[self.entry_poi]
+        row = sensitivity_row[entry_category]
+        selected = row >= 0
+        if poi_mask is not None:
+            selected &= poi_mask[self.entry_poi]
+        values = np.where(
+            selected, self.indices[np.maximum(row, 0), np.arange(len(row))], 0
+        ).astype(np.int64)
+
+        group_starts = self.group_offsets[:-1]
+        group_sum = np.add.reduceat(values, group_starts)
+        group_max = np.maximum.reduceat(values, group_starts)
+        group_selected = np.logical_or.reduceat(selected, group_starts)
+        group_values = np.where(multiple[self.group_category], group_max, group_sum)
+        group_values *= weight[self.group_category]
+
+        grid_starts = self.grid_offsets[:-1]
+        grid_values = np.add.reduceat(group_values, grid_starts)
+        grid_selected = np.logical_or.reduceat(group_selected, grid_starts)
+        return self.grid_ids[grid_selected], grid_values[grid_selected]
+
+
+def combine(*heatmaps: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum the accessibility of the same grid cells."""
+    grid_ids = np.concatenate([h[0] for h in heatmaps])
+    values = np.concatenate([h[1] for h in heatmaps])
+    grid_ids, inverse = np.unique(grid_ids, return_inverse=True)
+    return grid_ids, np.bincount(
+        inverse, weights=values, minlength=len(grid_ids)
+    ).astype(np.int64)
+
+
+def align(
+    grid_ids: np.ndarray, heatmaps: List[Tuple[np.ndarray, np.ndarray]]
+) -> List[np.ndarray]:
+    """
+    Values of the heatmaps at the passed (sorted) grid cells, 0 where a heatmap does not
+    reach a cell. Values of grid cells which are not passed are dropped.
+    """
+    aligned = []
+    for ids, values in heatmaps:
+        result = np.zeros(len(grid_ids), dtype=values.dtype)
+        if len(grid_ids) > 0:
+            positions = np.minimum(np.searchsorted(grid_ids, ids), len(grid_ids) - 1)
+            found = grid_ids[positions] == ids
+            result[positions[found]] = values[found]
+        aligned.append(result)
+    return aligned
+
+
+class AccessibilityHeatmap:
+    """
+    In-process engine of the local accessibility heatmap.
+
+    The reached POIs of the default and uploaded POIs are loaded once per study area and
+    cached. They are invalidated when rows without scenario of
+    customer.reached_poi_heatmap or the POIs change, which bumps their data version in
+    basic.data_version. The reached POIs of a scenario are small and loaded per request.
+    In the grid cells which are recomputed on the network of a scenario they replace the
+    reached POIs of the default heatmap. The weighted sums and percentiles are computed
+    with NumPy, so changing the heatmap configuration does not touch the database
+    besides a few small lookups.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, PoiAccessibility]" = OrderedDict()
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    @staticmethod
+    async def _connection(db: AsyncSession):
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection
+
+    async def data_version(self, db: AsyncSession) -> int:
+        """
+        Data version of the reached POIs without scenario and of the POIs
+        (basic.data_version).
+        """
+        return await read_data_version(db, [REACHED_POI_HEATMAP, OPPORTUNITIES])
+
+    async def get(self, db: AsyncSession, study_area_id: int) -> PoiAccessibility:
+        lock = self._locks.setdefault(study_area_id, asyncio.Lock())
+        async with lock:
+            key = (study_area_id, await self.data_version(db))
+            entry = self._entries.get(key)
+            if entry is None:
+                connection = await self._connection(db)
+                records = await connection.fetch(BASE_POIS_QUERY, study_area_id)
+                entry = PoiAccessibility.from_records(records)
+                for old_key in [k for k in self._entries if k[0] == study_area_id]:
+                    del self._entries[old_key]
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+        return entry
+
+    def invalidate(self, study_area_id: Optional[int] = None):
+        """Drop the cached reached POIs of a study area or all cached reached POIs."""
+        if study_area_id is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == study_area_id]:
+            del self._entries[key]
+
+    async def nearest_poi(
+        self, db: AsyncSession, categories: List[str]
+    ) -> pd.DataFrame:
+        """Nearest POI of the categories per grid visualization cell."""
+        connection = await self._connection(db)
+        records = await connection.fetch(NEAREST_POIS_QUERY, list(categories))
+        return nearest_poi(records)
+
+    async def compute(
+        self,
+        db: AsyncSession,
+        heatmap_configuration: Dict[str, dict],
+        user_id: int,
+        study_area_id: int,
+        modus: str,
+        scenario_id: int,
+        data_upload_ids: List[int],
+    ) -> pd.DataFrame:
+        """
+        Compute the local accessibility heatmap like basic.heatmap_local_accessibility.
+
+        Returns grid_visualization_id, percentile_accessibility and accessibility_index
+        of the grid cells reached by any POI of the configuration. All other grid cells
+        have 0 in both columns.
+        """
+        connection = await self._connection(db)
+        sensitivities = await connection.fetchval(
+            """SELECT ARRAY_AGG(s.sensitivity::integer)
+            FROM jsonb_array_elements_text(
+                basic.select_customization('heatmap_sensitivities')
+            ) s(sensitivity)"""
+        )
+        sensitivities = list(sensitivities or [])
+        poi_categories = await connection.fetchrow(
+            """SELECT ARRAY(SELECT jsonb_array_elements_text(c -> 'false')),
+            ARRAY(SELECT jsonb_array_elements_text(c -> 'true'))
+            FROM basic.poi_categories($1) c""",
+            user_id,
+        )
+        multiple_entrances = {c: False for c in poi_categories[0]}
+        multiple_entrances.update({c: True for c in poi_categories[1]})
+
+        pois = await self.get(db, study_area_id)
+        base_mask = (pois.poi_data_upload_id == 0) | np.isin(
+            pois.poi_data_upload_id, np.asarray(data_upload_ids, dtype=np.int64)
+        )
+        default = pois.accessibility(
+            heatmap_configuration, sensitivities, multiple_entrances, base_mask
+        )
+        default_percentiles = ntile(default[1])
+
+        if modus == CalculationTypes.default.value:
+            return pd.DataFrame(
+                {
+                    "grid_visualization_id": default[0],
+                    "percentile_accessibility": default_percentiles,
+                    "accessibility_index": default[1],
+                }
+            )
+
+        # POIs deleted or modified in the scenario are replaced by their entry in
+        # customer.poi_modified
+        scenario = default
+        if scenario_id:
+            modified_pois = await connection.fetchval(
+                "SELECT basic.modified_pois($1)", scenario_id
+            )
+            scenario_mask = base_mask & ~np.isin(
+                pois.poi_uid, np.array(modified_pois, dtype=object)
+            )
+            records = await connection.fetch(
+                SCENARIO_POIS_QUERY, study_area_id, scenario_id
+            )
+            scenario = combine(
+                pois.accessibility(
+                    heatmap_configuration,
+                    sensitivities,
+                    multiple_entrances,
+                    scenario_mask,
+                ),
+                PoiAccessibility.from_records(records).accessibility(
+                    heatmap_configuration, sensitivities, multiple_entrances
+                ),
+            )
+
+            # Grid cells recomputed on the network of the scenario take their reached
+            # POIs from customer.reached_poi_heatmap_scenario
+            scenario_grid_ids = await connection.fetchval(
+                SCENARIO_GRID_QUERY, scenario_id
+            )
+            if scenario_grid_ids is not None:
+                keep = ~np.isin(
+                    scenario[0], np.asarray(scenario_grid_ids, dtype=np.int64)
+                )
+                base_delta = PoiAccessibility.from_records(
+                    await connection.fetch(
+                        SCENARIO_BASE_POIS_DELTA_QUERY, scenario_id, modified_pois
+                    )
+                )
+                base_delta_mask = (base_delta.poi_data_upload_id == 0) | np.isin(
+                    base_delta.poi_data_upload_id,
+                    np.asarray(data_upload_ids, dtype=np.int64),
+                )
+                scenario_delta = PoiAccessibility.from_records(
+                    await connection.fetch(SCENARIO_POIS_DELTA_QUERY, scenario_id)
+                )
+                scenario = combine(
+                    (scenario[0][keep], scenario[1][keep]),
+                    base_delta.accessibility(
+                        heatmap_configuration,
+                        sensitivities,
+                        multiple_entrances,
+                        base_delta_mask,
+                    ),
+                    scenario_delta.accessibility(
+                        heatmap_configuration, sensitivities, multiple_entrances
+                    ),
+                )
+
+        # Lower borders of the default percentiles
+        borders = np.full(PERCENTILES, np.nan)
+        nonzero = default[1] != 0
+        for i, percentile in enumerate(np.unique(default_percentiles[nonzero])):
+            borders[i] = default[1][nonzero & (default_percentiles == percentile)].min()
+        scenario_percentiles = classify(scenario[1], borders)
+
+        if modus == CalculationTypes.scenario.value:
+            return pd.DataFrame(
+                {
+                    "grid_visualization_id": scenario[0],
+                    "percentile_accessibility": scenario_percentiles,
+                    "accessibility_index": scenario[1],
+                }
+            )
+
+        grid_ids = np.union1d(default[0], scenario[0])
+        aligned = align(
+            grid_ids,
+            [
+                default,
+                (default[0], default_percentiles),
+                scenario,
+                (scenario[0], scenario_percentiles),
+            ],
+        )
+        default_values, default_percentiles, scenario_values, scenario_percentiles = (
+            aligned
+        )
+        difference = scenario_values - default_values
+        return pd.DataFrame(
+            {
+                "grid_visualization_id": grid_ids,
+                "percentile_accessibility": np.where(
+                    difference != 0, scenario_percentiles - default_percentiles, 0
+                ),
+                "accessibility_index": difference,
+            }
+        )
+
+
+accessibility_heatmap = AccessibilityHeatmap(
+    max_size=settings.HEATMAP_ACCESSIBILITY_CACHE_MAX_SIZE
+)
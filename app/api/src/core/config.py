@@ -1,5 +1,5 @@
 import secrets
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from pydantic import AnyHttpUrl, BaseSettings, EmailStr, HttpUrl, PostgresDsn, validator
 
@@ -127,6 +127,23 @@ class Settings(BaseSettings):
     MAX_FEATURES_PER_TILE: int = 10000
     DEFAULT_MINZOOM: int = 0
     DEFAULT_MAXZOOM: int = 22
+    # Routing network cache config
+    NETWORK_CACHE_ENABLED: bool = True
+    NETWORK_CACHE_MAX_SIZE: int = 8  # Number of cached networks (study area, routing profile, speed)
+    NETWORK_CACHE_BUFFER: int = 10000  # Buffer around the study area in meters
+    # Isochrone result cache config
+    ISOCHRONE_CACHE_ENABLED: bool = True
+    ISOCHRONE_CACHE_MAX_SIZE: int = 256  # Number of cached single isochrones
+    # Heatmap config
+    HEATMAP_THREADS: int = 0  # Threads of the isochrone extension per heatmap batch (0 = all cores)
+    HEATMAP_PROCESSES: int = 1  # Processes of the heatmap build, each with its own database connections
+    HEATMAP_TRAVELTIME_STORE: Literal["database", "file", "none"] = "database"  # Store of the heatmap travel times
+    HEATMAP_TRAVELTIME_STORE_DIR: str = "/app/src/data/heatmap"
+    HEATMAP_REACHED_POIS_SEARCH: Literal["edges", "reverse"] = "edges"  # Reached POIs from the stored travel times ("edges") or a reverse search from the POIs ("reverse")
+    HEATMAP_ACCESSIBILITY_ENGINE_ENABLED: bool = True  # Compute the local accessibility heatmap in-process
+    HEATMAP_ACCESSIBILITY_CACHE_MAX_SIZE: int = 8  # Number of study areas with cached reached POIs
+    HEATMAP_TILE_CACHE_MAX_SIZE: int = 4096  # Number of cached heatmap vector tiles
+    HEATMAP_TILE_CACHE_MAX_HEATMAPS: int = 32  # Number of heatmaps whose values are cached for tiles
 
     class Config:
         case_sensitive = True
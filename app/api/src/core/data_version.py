@@ -0,0 +1,38 @@
+from typing import Dict, Sequence
+
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import text
+
+# Groups of tables with a version counter in basic.data_version (see trigger_data_version.sql)
+NETWORK = "network"
+SCENARIO = "scenario"
+OPPORTUNITIES = "opportunities"
+REACHED_POI_HEATMAP = "reached_poi_heatmap"
+GRID = "grid"
+HEATMAP_SCENARIO = "heatmap_scenario"
+NEAREST_POI_HEATMAP = "nearest_poi_heatmap"
+
+
+async def read_data_versions(db: AsyncSession, names: Sequence[str]) -> Dict[str, int]:
+    """
+    Version counters of the passed groups of tables, 0 for groups which were never changed.
+
+    The counters only grow. Read them before the data they guard, then a concurrent change leads to
+    a reload at worst.
+    """
+    versions = await db.execute(
+        text(
+            """SELECT name, version
+            FROM basic.data_version
+            WHERE name = ANY(CAST(:names AS text[]))"""
+        ),
+        {"names": list(names)},
+    )
+    data_versions = {name: 0 for name in names}
+    data_versions.update({name: int(version) for name, version in versions.all()})
+    return data_versions
+
+
+async def read_data_version(db: AsyncSession, names: Sequence[str]) -> int:
+    """Sum of the version counters of the passed groups of tables, changes with every change of them."""
+    return sum((await read_data_versions(db, names)).values())
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import text
+
+from src.core.data_version import GRID, read_data_version
+
+
+@dataclass
+class HeatmapGrid:
+    """Geometry of the visualization grid of a study area as geobuf and the ids in the same order."""
+
+    grid_visualization_ids: np.ndarray
+    bbox: np.ndarray  # xmin, ymin, xmax, ymax of the cells in EPSG:4326
+    geobuf: bytes
+    etag: str
+
+    def cells(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """Ids of the grid cells whose bounding box intersects the passed box (EPSG:4326)."""
+        mask = (
+            (self.bbox[:, 0] <= xmax)
+            & (self.bbox[:, 2] >= xmin)
+            & (self.bbox[:, 1] <= ymax)
+            & (self.bbox[:, 3] >= ymin)
+        )
+        return self.grid_visualization_ids[mask]
+
+
+class HeatmapGridCache:
+    """
+    In-process cache of the visualization grid per study area.
+
+    The grid rarely changes, so its geometry is serialized once and served as a static artifact
+    with an ETag. Heatmap responses in the values format only carry the values per grid cell and
+    are joined with the grid on the client. Entries are invalidated when the version of the grid
+    tables in basic.data_version changes, so changes by other processes invalidate them as well.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[int, HeatmapGrid]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def data_version(self, db: AsyncSession) -> int:
+        """Version of the grid tables, bumped by triggers on every change of them."""
+        return await read_data_version(db, [GRID])
+
+    async def load(self, db: AsyncSession, study_area_id: int) -> HeatmapGrid:
+        grid = await db.execute(
+            text(
+                """SELECT ST_AsGeobuf(g.*, 'geom'), ARRAY_AGG(g.grid_visualization_id ORDER BY g.grid_visualization_id),
+                ARRAY_AGG(ARRAY[ST_XMin(g.geom), ST_YMin(g.geom), ST_XMax(g.geom), ST_YMax(g.geom)] ORDER BY g.grid_visualization_id)
+                FROM (
+                    SELECT g.id AS grid_visualization_id, g.geom
+                    FROM basic.grid_visualization g, basic.study_area_grid_visualization s
+                    WHERE g.id = s.grid_visualization_id
+                    AND s.study_area_id = :study_area_id
+                    ORDER BY g.id
+                ) g"""
+            ),
+            {"study_area_id": study_area_id},
+        )
+        geobuf, grid_visualization_ids, bbox = grid.fetchone()
+        geobuf = bytes(geobuf or b"")
+        return HeatmapGrid(
+            grid_visualization_ids=np.array(grid_visualization_ids or [], dtype=np.int64),
+            bbox=np.array(bbox or [], dtype=np.float64).reshape(-1, 4),
+            geobuf=geobuf,
+            etag='"{}"'.format(hashlib.sha1(geobuf).hexdigest()),
+        )
+
+    async def get(self, db: AsyncSession, study_area_id: int) -> HeatmapGrid:
+        lock = self._locks.setdefault(study_area_id, asyncio.Lock())
+        async with lock:
+            version = await self.data_version(db)
+            entry = self._entries.get(study_area_id)
+            if entry is None or entry[0] != version:
+                entry = (version, await self.load(db, study_area_id))
+                self._entries[study_area_id] = entry
+        return entry[1]
+
+    def invalidate(self, study_area_id: int = None):
+        if study_area_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(study_area_id, None)
+
+
+heatmap_grid_cache = HeatmapGridCache()
@@ -0,0 +1,94 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Size of the tiles the network edges are counted in (EPSG:3857)
+TILE_SIZE = 250
+
+
+class EdgeDensity:
+    """
+    Number of network edges per tile of TILE_SIZE as summed area table, so the edges inside any
+    box are counted in constant time. Edges are counted in the tile of their centroid.
+    """
+
+    def __init__(self, tile_x: np.ndarray, tile_y: np.ndarray, counts: np.ndarray):
+        tile_x = np.asarray(tile_x, dtype=np.int64)
+        tile_y = np.asarray(tile_y, dtype=np.int64)
+        self.origin = (
+            (int(tile_x.min()), int(tile_y.min())) if len(tile_x) > 0 else (0, 0)
+        )
+        shape = (
+            int(tile_x.max()) - self.origin[0] + 1 if len(tile_x) > 0 else 0,
+            int(tile_y.max()) - self.origin[1] + 1 if len(tile_y) > 0 else 0,
+        )
+        table = np.zeros((shape[0] + 1, shape[1] + 1), dtype=np.int64)
+        np.add.at(
+            table,
+            (tile_x - self.origin[0] + 1, tile_y - self.origin[1] + 1),
+            np.asarray(counts, dtype=np.int64),
+        )
+        self.table = table.cumsum(axis=0).cumsum(axis=1)
+
+    def count(self, xmin, ymin, xmax, ymax) -> np.ndarray:
+        """Number of edges in the tiles which intersect the boxes (EPSG:3857)."""
+        nx, ny = self.table.shape[0] - 1, self.table.shape[1] - 1
+        x0 = np.clip(np.floor(np.asarray(xmin) / TILE_SIZE) - self.origin[0], 0, nx).astype(np.int64)
+        y0 = np.clip(np.floor(np.asarray(ymin) / TILE_SIZE) - self.origin[1], 0, ny).astype(np.int64)
+        x1 = np.clip(np.floor(np.asarray(xmax) / TILE_SIZE) - self.origin[0] + 1, 0, nx).astype(np.int64)
+        y1 = np.clip(np.floor(np.asarray(ymax) / TILE_SIZE) - self.origin[1] + 1, 0, ny).astype(np.int64)
+        return self.table[x1, y1] - self.table[x0, y1] - self.table[x1, y0] + self.table[x0, y0]
+
+
+def partition(
+    x: np.ndarray, y: np.ndarray, density: EdgeDensity, buffer: float, batches: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split grid cells (centroids in EPSG:3857) into batches of about the same routing work.
+
+    The work of a cell is the number of edges within the buffer around it, which is the network its
+    search explores. The cells are split recursively at the weighted median of the longer side of
+    their extent, so the batches are compact and their work is proportional to the number of batches
+    on each side. The footprint of a batch is the number of edges inside its buffered extent, the
+    network which is read for the batch.
+
+    Returns the batch of each cell and the footprint of each batch. The batches are numbered by
+    descending footprint.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    work = density.count(x - buffer, y - buffer, x + buffer, y + buffer) + 1
+
+    leaves: List[np.ndarray] = []
+    stack = [(np.arange(len(x)), max(1, batches))]
+    while stack:
+        cells, n = stack.pop()
+        if n == 1 or len(cells) <= 1:
+            leaves.append(cells)
+            continue
+        coordinates = x[cells] if np.ptp(x[cells]) >= np.ptp(y[cells]) else y[cells]
+        cells = cells[np.argsort(coordinates, kind="stable")]
+        cumulative = np.cumsum(work[cells])
+        n_left = n // 2
+        split = np.searchsorted(cumulative, cumulative[-1] * n_left / n)
+        split = int(np.clip(split, 1, len(cells) - 1))
+        stack.append((cells[split:], n - n_left))
+        stack.append((cells[:split], n_left))
+
+    footprints = np.array(
+        [
+            density.count(
+                x[cells].min() - buffer,
+                y[cells].min() - buffer,
+                x[cells].max() + buffer,
+                y[cells].max() + buffer,
+            )
+            for cells in leaves
+        ],
+        dtype=np.int64,
+    )
+    order = np.argsort(-footprints, kind="stable")
+    labels = np.empty(len(x), dtype=np.int64)
+    for batch, leaf in enumerate(order):
+        labels[leaves[leaf]] = batch
+    return labels, footprints[order]
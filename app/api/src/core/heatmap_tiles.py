@@ -0,0 +1,152 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.data_version import (
+    GRID,
+    HEATMAP_SCENARIO,
+    NEAREST_POI_HEATMAP,
+    NETWORK,
+    OPPORTUNITIES,
+    REACHED_POI_HEATMAP,
+    SCENARIO,
+    read_data_version,
+)
+from src.resources.enums import CalculationTypes, HeatmapTypes
+
+# Groups of tables in basic.data_version the cached heatmaps depend on. The scenario group is also
+# bumped when the heatmap of a scenario is reset, so the delta tiles of all processes are dropped.
+HEATMAP_DATA_VERSIONS = {
+    HeatmapTypes.connectivity: [GRID, NETWORK],
+    HeatmapTypes.population: [GRID, OPPORTUNITIES, SCENARIO],
+    HeatmapTypes.local_accessibility: [
+        GRID,
+        NETWORK,
+        SCENARIO,
+        OPPORTUNITIES,
+        REACHED_POI_HEATMAP,
+        HEATMAP_SCENARIO,
+        NEAREST_POI_HEATMAP,
+    ],
+}
+
+
+def configuration_hash(heatmap_type: Optional[str], heatmap_configuration: Optional[str]) -> str:
+    """Hash of the heatmap configuration, independent of the order of the categories."""
+    if heatmap_configuration is None:
+        return ""
+    configuration = json.dumps(json.loads(heatmap_configuration), sort_keys=True)
+    return hashlib.sha1(f"{heatmap_type}:{configuration}".encode()).hexdigest()
+
+
+def select_values(
+    values: Tuple[list, list, list], grid_visualization_ids: np.ndarray
+) -> Tuple[list, list, list]:
+    """Values of the passed grid cells, cells without value are dropped."""
+    ids = np.asarray(values[0], dtype=np.int64)
+    if len(ids) == 0:
+        return [], [], []
+    positions = np.minimum(np.searchsorted(ids, grid_visualization_ids), len(ids) - 1)
+    positions = positions[ids[positions] == grid_visualization_ids]
+    return (
+        ids[positions].tolist(),
+        np.asarray(values[1], dtype=object)[positions].tolist(),
+        np.asarray(values[2], dtype=object)[positions].tolist(),
+    )
+
+
+class HeatmapTileCache:
+    """
+    In-process LRU cache of heatmap vector tiles.
+
+    A heatmap is keyed on its type, the hash of its configuration, the study area, the modus and
+    scenario and a data version of the tables it depends on. The values of a heatmap are computed
+    once per key and cached next to the tiles, so each tile only joins the values of its cells
+    onto the grid geometry.
+    """
+
+    def __init__(self, max_size: int, max_heatmaps: int):
+        self.max_size = max_size
+        self.max_heatmaps = max_heatmaps
+        self._tiles: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._values: "OrderedDict[tuple, Tuple[list, list, list]]" = OrderedDict()
+
+    async def data_version(self, db: AsyncSession, heatmap: HeatmapTypes) -> int:
+        """Version of the tables the heatmap depends on, bumped by triggers on every change of them."""
+        return await read_data_version(db, HEATMAP_DATA_VERSIONS[heatmap])
+
+    async def key(
+        self,
+        db: AsyncSession,
+        heatmap: HeatmapTypes,
+        study_area_id: int,
+        user_id: int,
+        modus: CalculationTypes,
+        scenario_id: int,
+        heatmap_type: Optional[str] = None,
+        heatmap_configuration: Optional[str] = None,
+    ) -> tuple:
+        if heatmap == HeatmapTypes.connectivity:
+            modus, scenario_id = CalculationTypes.default, 0
+        if modus == CalculationTypes.default:
+            scenario_id = 0
+        # The local accessibility depends on the categories and data uploads of the user
+        if heatmap != HeatmapTypes.local_accessibility:
+            user_id = 0
+        return (
+            heatmap.value,
+            configuration_hash(heatmap_type, heatmap_configuration),
+            study_area_id,
+            user_id,
+            modus.value,
+            scenario_id,
+            await self.data_version(db, heatmap),
+        )
+
+    def get_values(self, key: tuple) -> Optional[Tuple[list, list, list]]:
+        values = self._values.get(key)
+        if values is not None:
+            self._values.move_to_end(key)
+        return values
+
+    def put_values(self, key: tuple, values: Tuple[list, list, list]):
+        self._values[key] = values
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_heatmaps:
+            self._values.popitem(last=False)
+
+    def get_tile(self, key: tuple) -> Optional[bytes]:
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def put_tile(self, key: tuple, tile: bytes):
+        self._tiles[key] = tile
+        self._tiles.move_to_end(key)
+        while len(self._tiles) > self.max_size:
+            self._tiles.popitem(last=False)
+
+    def invalidate(self, scenario_id: Optional[int] = None):
+        """
+        Drop the cached heatmaps and tiles of a scenario or all of them. Other processes see the
+        change through the data version.
+        """
+        # The keys of the tiles start with the key of their heatmap
+        for entries in (self._values, self._tiles):
+            if scenario_id is None:
+                entries.clear()
+                continue
+            for key in [k for k in entries if k[5] == scenario_id]:
+                del entries[key]
+
+
+heatmap_tile_cache = HeatmapTileCache(
+    max_size=settings.HEATMAP_TILE_CACHE_MAX_SIZE,
+    max_heatmaps=settings.HEATMAP_TILE_CACHE_MAX_HEATMAPS,
+)
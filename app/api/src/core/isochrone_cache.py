@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.config import settings
+from src.core.data_version import NETWORK, OPPORTUNITIES, SCENARIO, read_data_versions
+from src.resources.enums import CalculationTypes
+
+
+@dataclass
+class IsochroneCacheEntry:
+    """Engine result of a single isochrone and the reached opportunities computed for it."""
+
+    result: Any
+    starting_point: str  # Snapped starting point as WKT in EPSG:4326
+    # (user_id, active_upload_ids, opportunities version) -> {step: reached_opportunities}
+    reached_opportunities: Dict[Tuple, Dict[int, dict]] = field(default_factory=dict)
+
+
+class IsochroneCache:
+    """
+    In-process LRU cache of single isochrone results.
+
+    Entries are keyed on the rounded starting point, the routing parameters and the data version of the
+    network and scenario tables, the reached opportunities of an entry on the data version of the
+    opportunity tables. The versions are bumped by triggers (basic.data_version), so changes made by
+    other processes invalidate the entries as well. Scenario edits through the API additionally drop
+    the entries of the scenario right away.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, IsochroneCacheEntry]" = OrderedDict()
+
+    async def data_version(self, db, modus: str) -> Tuple[int, int]:
+        """
+        Data versions of the network (with the scenarios unless the modus is default) and of the
+        opportunities. The engine results depend on the first one, the reached opportunities on both.
+        """
+        names = [NETWORK, OPPORTUNITIES]
+        if modus != CalculationTypes.default.value:
+            names.append(SCENARIO)
+        versions = await read_data_versions(db, names)
+        return versions[NETWORK] + versions.get(SCENARIO, 0), versions[OPPORTUNITIES]
+
+    @staticmethod
+    def key(obj_in, data_version: int, x: float = None, y: float = None) -> tuple:
+        scenario_id = 0
+        if obj_in.modus != CalculationTypes.default.value:
+            scenario_id = obj_in.scenario_id or 0
+        return (
+            round(float(obj_in.x if x is None else x), 5),
+            round(float(obj_in.y if y is None else y), 5),
+            obj_in.routing_profile,
+            round(obj_in.speed, 4),
+            obj_in.minutes,
+            obj_in.n,
+            obj_in.modus,
+            scenario_id,
+            data_version,
+        )
+
+    def get(self, key: tuple) -> Optional[IsochroneCacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: IsochroneCacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, scenario_id: Optional[int] = None):
+        """Drop the cached isochrones of a scenario or all cached isochrones."""
+        if scenario_id is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[7] == scenario_id]:
+            del self._entries[key]
+
+
+isochrone_cache = IsochroneCache(max_size=settings.ISOCHRONE_CACHE_MAX_SIZE)
@@ -0,0 +1,333 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pygeos
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.data_version import NETWORK, read_data_version
+
+EARTH_RADIUS = 6378137.0
+
+
+INTEGER_COLUMNS = {"wid", "id", "source", "target"}
+FLOAT_COLUMNS = {"cost", "reverse_cost", "length"}
+WKB_HEADER_SIZE = 9  # Byte order (1 byte), geometry type (uint32), number of points (uint32)
+WKB_LINESTRING = 2
+
+
+def lonlat_to_3857(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Project WGS84 coordinates to web mercator (EPSG:3857)."""
+    x_3857 = np.radians(x) * EARTH_RADIUS
+    y_3857 = np.log(np.tan(np.pi / 4 + np.radians(y) / 2)) * EARTH_RADIUS
+    return x_3857, y_3857
+
+
+def decode_wkb_linestrings(geoms: Sequence[Optional[bytes]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode 2D little endian WKB linestrings (ST_AsBinary(geom, 'NDR')) into one coordinate buffer.
+
+    Returns the coordinates (n, 2) and the offsets of the linestrings into them. Missing geometries
+    are decoded as empty linestrings.
+    """
+    sizes = np.fromiter((len(g) if g else 0 for g in geoms), dtype=np.int64, count=len(geoms))
+    buffer = np.frombuffer(b"".join(g for g in geoms if g), dtype=np.uint8)
+    starts = np.zeros(len(geoms), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=starts[1:])
+
+    present = np.flatnonzero(sizes)
+    header_index = starts[present, None] + np.arange(WKB_HEADER_SIZE)
+    headers = buffer[header_index]
+    geometry_types = headers[:, 1:5].copy().view("<u4").ravel()
+    counts = np.zeros(len(geoms), dtype=np.int64)
+    counts[present] = headers[:, 5:9].copy().view("<u4").ravel()
+    if (
+        np.any(headers[:, 0] != 1)
+        or np.any(geometry_types != WKB_LINESTRING)
+        or np.any(sizes[present] != WKB_HEADER_SIZE + 16 * counts[present])
+    ):
+        raise ValueError("Geometries have to be 2D linestrings in little endian WKB.")
+
+    # The points follow the header of each linestring, so dropping the headers leaves the coordinates
+    mask = np.ones(buffer.shape[0], dtype=bool)
+    mask[header_index.ravel()] = False
+    coordinates = buffer[mask].view("<f8").astype(np.float64, copy=False).reshape(-1, 2)
+
+    offsets = np.zeros(len(geoms) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return coordinates, offsets
+
+
+def snap_points(
+    coordinates: np.ndarray, offsets: np.ndarray, x: np.ndarray, y: np.ndarray, max_distance: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Snap points to the nearest linestring of a coordinate buffer (see decode_wkb_linestrings) with an
+    STRtree, all in EPSG:3857. The max_distance in meters is scaled to web mercator at each point.
+
+    Returns the index of the nearest linestring per point, -1 if there is none within max_distance,
+    and the position of the snapped point as fraction of the linestring length.
+    """
+    line_index = np.full(len(x), -1, dtype=np.int64)
+    fractions = np.full(len(x), np.nan)
+    counts = np.diff(offsets)
+    coordinate_lines = np.repeat(np.arange(len(counts)), counts)
+    valid = counts[coordinate_lines] >= 2
+    if len(x) == 0 or not np.any(valid):
+        return line_index, fractions
+
+    # Linestrings with less than two points stay empty (None) and are not part of the tree
+    lines = np.full(len(counts), None, dtype=object)
+    pygeos.linestrings(coordinates[valid], indices=coordinate_lines[valid], out=lines)
+    points = pygeos.points(x, y)
+    scaled_distance = max_distance / np.cos(2 * np.arctan(np.exp(y / EARTH_RADIUS)) - np.pi / 2)
+    tree = pygeos.STRtree(lines)
+    (point_index, tree_index), distances = tree.nearest_all(
+        points, max_distance=float(scaled_distance.max()), return_distance=True
+    )
+    # Equidistant linestrings are all returned, the first one is kept
+    point_index, first = np.unique(point_index, return_index=True)
+    tree_index, distances = tree_index[first], distances[first]
+    within = distances <= scaled_distance[point_index]
+    point_index, tree_index = point_index[within], tree_index[within]
+
+    line_index[point_index] = tree_index
+    fractions[point_index] = pygeos.line_locate_point(
+        lines[tree_index], points[point_index], normalized=True
+    )
+    return line_index, fractions
+
+
+async def fetch_network(db: AsyncSession, query: str, *args) -> Dict[str, Any]:
+    """
+    Run a network query directly on the asyncpg connection of the session.
+
+    The query uses asyncpg placeholders ($1, $2, ...) and selects the geometries as WKB (geom). The
+    edge columns are returned as NumPy arrays, the geometries as one coordinate buffer (coordinates)
+    with the offsets of the edges into it (offsets) and all other columns as lists.
+    """
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    records = await raw_connection.driver_connection.fetch(query, *args)
+
+    columns = {}
+    names = list(records[0].keys()) if records else []
+    for i, name in enumerate(names):
+        if name in INTEGER_COLUMNS:
+            columns[name] = np.fromiter(
+                (r[i] if r[i] is not None else -1 for r in records), dtype=np.int64, count=len(records)
+            )
+        elif name in FLOAT_COLUMNS:
+            columns[name] = np.fromiter(
+                (r[i] if r[i] is not None else np.nan for r in records),
+                dtype=np.float64,
+                count=len(records),
+            )
+        elif name == "geom":
+            columns["coordinates"], columns["offsets"] = decode_wkb_linestrings([r[i] for r in records])
+        else:
+            columns[name] = [r[i] for r in records]
+    return columns
+
+
+@dataclass
+class RoutingNetwork:
+    """
+    Compact array representation of a routing network.
+
+    The geometries of all edges are stored in one coordinate buffer (EPSG:3857). The
+    coordinates of edge i are coordinates[offsets[i]:offsets[i + 1]].
+    """
+
+    id: np.ndarray
+    source: np.ndarray
+    target: np.ndarray
+    cost: np.ndarray
+    reverse_cost: np.ndarray
+    length: np.ndarray
+    coordinates: np.ndarray
+    offsets: np.ndarray
+    bbox: np.ndarray
+    extent: Optional[Tuple[float, float, float, float]] = None
+
+    def __len__(self) -> int:
+        return self.id.shape[0]
+
+    @classmethod
+    def from_columns(cls, edges: Mapping[str, Any], extent=None) -> "RoutingNetwork":
+        """Build the network from the columns of the fetch_network_routing functions (see fetch_network)."""
+        coordinates = np.asarray(edges["coordinates"], dtype=np.float64).reshape(-1, 2)
+        offsets = np.asarray(edges["offsets"], dtype=np.int64)
+
+        # Edges without geometry (e.g. the row of the starting points) get an empty bounding box
+        bbox = np.full((len(offsets) - 1, 4), np.nan)
+        edges_with_geometry = np.flatnonzero(np.diff(offsets))
+        if len(edges_with_geometry) > 0:
+            starts = offsets[edges_with_geometry]
+            bbox[edges_with_geometry] = np.column_stack(
+                (
+                    np.minimum.reduceat(coordinates[:, 0], starts),
+                    np.minimum.reduceat(coordinates[:, 1], starts),
+                    np.maximum.reduceat(coordinates[:, 0], starts),
+                    np.maximum.reduceat(coordinates[:, 1], starts),
+                )
+            )
+
+        return cls(
+            id=np.asarray(edges["id"], dtype=np.int64),
+            source=np.asarray(edges["source"], dtype=np.int64),
+            target=np.asarray(edges["target"], dtype=np.int64),
+            cost=np.asarray(edges["cost"], dtype=np.float64),
+            reverse_cost=np.asarray(edges["reverse_cost"], dtype=np.float64),
+            length=np.asarray(edges["length"], dtype=np.float64),
+            coordinates=coordinates,
+            offsets=offsets,
+            bbox=bbox,
+            extent=extent,
+        )
+
+    def take(self, indices: np.ndarray) -> "RoutingNetwork":
+        """Return a new network containing only the edges at the given indices."""
+        counts = self.offsets[indices + 1] - self.offsets[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        coordinate_index = np.repeat(self.offsets[indices] - offsets[:-1], counts) + np.arange(
+            offsets[-1], dtype=np.int64
+        )
+        return RoutingNetwork(
+            id=self.id[indices],
+            source=self.source[indices],
+            target=self.target[indices],
+            cost=self.cost[indices],
+            reverse_cost=self.reverse_cost[indices],
+            length=self.length[indices],
+            coordinates=self.coordinates[coordinate_index],
+            offsets=offsets,
+            bbox=self.bbox[indices],
+        )
+
+    def append(self, other: "RoutingNetwork") -> "RoutingNetwork":
+        """Return a new network with the edges of other appended."""
+        return RoutingNetwork(
+            id=np.concatenate((self.id, other.id)),
+            source=np.concatenate((self.source, other.source)),
+            target=np.concatenate((self.target, other.target)),
+            cost=np.concatenate((self.cost, other.cost)),
+            reverse_cost=np.concatenate((self.reverse_cost, other.reverse_cost)),
+            length=np.concatenate((self.length, other.length)),
+            coordinates=np.concatenate((self.coordinates, other.coordinates)),
+            offsets=np.concatenate((self.offsets, other.offsets[1:] + self.offsets[-1])),
+            bbox=np.concatenate((self.bbox, other.bbox)),
+        )
+
+    def covers(self, x: np.ndarray, y: np.ndarray, radius: np.ndarray) -> bool:
+        """Check if the circles (EPSG:3857) around the points are inside the cached extent."""
+        if self.extent is None:
+            return False
+        xmin, ymin, xmax, ymax = self.extent
+        return bool(
+            np.all(x - radius >= xmin)
+            and np.all(y - radius >= ymin)
+            and np.all(x + radius <= xmax)
+            and np.all(y + radius <= ymax)
+        )
+
+    def clip(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """Indices of the edges whose bounding box intersects the passed box (EPSG:3857)."""
+        mask = (
+            (self.bbox[:, 0] <= xmax)
+            & (self.bbox[:, 2] >= xmin)
+            & (self.bbox[:, 1] <= ymax)
+            & (self.bbox[:, 3] >= ymin)
+        )
+        return np.flatnonzero(mask)
+
+
+class NetworkCache:
+    """
+    In-process cache of the default routing network per study area, routing profile and speed.
+
+    The network is loaded once for the buffered extent of the study area. For each request only the
+    artificial edges at the starting points are fetched from the database and spliced into the
+    edges around the starting points. Every entry is stored with the data version of the network
+    (basic.data_version), so changes of basic.edge by any process reload the network.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # key -> (data version of the network, network)
+        self._networks: "OrderedDict[tuple, Tuple[int, RoutingNetwork]]" = OrderedDict()
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(study_area_id: int, routing_profile: str, speed: float) -> tuple:
+        return (study_area_id, routing_profile, round(speed, 4))
+
+    async def load(
+        self, db: AsyncSession, study_area_id: int, routing_profile: str, speed: float
+    ) -> RoutingNetwork:
+        """Read the network of the buffered study area from the database."""
+        buffer_distance = settings.NETWORK_CACHE_BUFFER
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        extent = await raw_connection.driver_connection.fetchrow(
+            """SELECT ST_XMIN(e), ST_YMIN(e), ST_XMAX(e), ST_YMAX(e)
+            FROM (
+                SELECT ST_TRANSFORM(ST_Envelope(ST_Buffer(s.geom::geography, $2)::geometry), 3857) AS e
+                FROM basic.study_area s
+                WHERE s.id = $1
+            ) x""",
+            study_area_id,
+            float(buffer_distance),
+        )
+        if extent is None:
+            raise ValueError(f"Study area {study_area_id} does not exist.")
+
+        edges = await fetch_network(
+            db,
+            """SELECT id, source, target, cost, reverse_cost, geom_3857 AS geom, length_3857 AS length
+            FROM basic.fetch_network_routing_study_area($1::integer, $2::float, $3::float, $4::text)""",
+            study_area_id,
+            float(buffer_distance),
+            float(speed),
+            routing_profile,
+        )
+        return RoutingNetwork.from_columns(edges, extent=tuple(extent))
+
+    async def get(
+        self, db: AsyncSession, study_area_id: int, routing_profile: str, speed: float
+    ) -> RoutingNetwork:
+        key = self._key(study_area_id, routing_profile, speed)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # The version is read before the network, so a concurrent change only leads to a reload
+            version = await read_data_version(db, [NETWORK])
+            entry = self._networks.get(key)
+            if entry is None or entry[0] != version:
+                network = await self.load(db, study_area_id, routing_profile, speed)
+                self._networks[key] = (version, network)
+                self._networks.move_to_end(key)
+                while len(self._networks) > self.max_size:
+                    self._drop(next(iter(self._networks)))
+            else:
+                network = entry[1]
+                self._networks.move_to_end(key)
+        return network
+
+    def _drop(self, key: tuple):
+        """Drop a cached network and its lock unless a request is waiting for it."""
+        self._networks.pop(key, None)
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+
+    def invalidate(self, study_area_id: Optional[int] = None):
+        """Drop the cached networks of a study area or all cached networks."""
+        for key in [k for k in self._networks if study_area_id is None or k[0] == study_area_id]:
+            self._drop(key)
+
+
+network_cache = NetworkCache(max_size=settings.NETWORK_CACHE_MAX_SIZE)
@@ -0,0 +1,228 @@
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import settings
+
+# Codes of the edge types of customer.reached_edge_heatmap_grid_calculation
+EDGE_TYPES = [None, "a", "p", "ap"]
+FULL_EDGE_TYPES = [0, 1]
+NULL_PERC = -1
+# start_perc and end_perc are stored as fraction of the edge length times PERC_SCALE
+PERC_SCALE = 10000
+
+# Columns of the travel times, the rows of an edge are stored at [offsets[i], offsets[i + 1])
+COLUMNS = {
+    "grid_calculation_id": np.int64,
+    "start_cost": np.int16,
+    "end_cost": np.int16,
+    "start_perc": np.int16,
+    "end_perc": np.int16,
+    "edge_type": np.int8,
+}
+MATRIX_DIR = "matrix"
+
+
+def write_arrays(path: Path, arrays: Dict[str, np.ndarray]):
+    """Write the arrays as .npy files into a directory, which replaces the directory at once."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(tmp_path / f"{name}.npy", array)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def read_arrays(path: Path, mmap_mode="r") -> Dict[str, np.ndarray]:
+    return {p.stem: np.load(p, mmap_mode=mmap_mode) for p in path.glob("*.npy")}
+
+
+def group_by_edge(edges_traveltime: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Columns of reached edges (columns of reached_edge_heatmap_grid_calculation) grouped by edge."""
+    edge_id = edges_traveltime["reached_edge_heatmap_id"].to_numpy(dtype=np.int64)
+    order = np.argsort(edge_id, kind="stable")
+    edge_ids, counts = np.unique(edge_id[order], return_counts=True)
+    offsets = np.zeros(len(edge_ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    edge_type = edges_traveltime["edge_type"].map(
+        {t: i for i, t in enumerate(EDGE_TYPES) if t is not None}
+    )
+    arrays = {
+        "edge_ids": edge_ids,
+        "offsets": offsets,
+        "edge_type": edge_type.fillna(0).to_numpy(dtype=np.int8)[order],
+    }
+    for name in ["grid_calculation_id", "start_cost", "end_cost"]:
+        arrays[name] = edges_traveltime[name].to_numpy(dtype=COLUMNS[name])[order]
+    for name in ["start_perc", "end_perc"]:
+        arrays[name] = edges_traveltime[name].to_numpy(dtype=COLUMNS[name], na_value=NULL_PERC)[order]
+    return arrays
+
+
+@dataclass
+class TravelTimeMatrix:
+    """
+    Memory-mapped travel times of the heatmap grid, grouped by edge.
+
+    The rows of edge_ids[i] are stored at [offsets[i], offsets[i + 1]) in the columns.
+    """
+
+    edge_ids: np.ndarray
+    offsets: np.ndarray
+    columns: Dict[str, np.ndarray]
+
+    @classmethod
+    def from_dataframe(cls, edges_traveltime: pd.DataFrame) -> "TravelTimeMatrix":
+        """In-memory matrix of reached edges (columns of reached_edge_heatmap_grid_calculation)."""
+        arrays = group_by_edge(edges_traveltime)
+        return cls(edge_ids=arrays.pop("edge_ids"), offsets=arrays.pop("offsets"), columns=arrays)
+
+    def rows(self, edge_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices of the rows of the edges and the index of the requested edge of each row."""
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        if len(self.edge_ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.edge_ids, edge_ids), len(self.edge_ids) - 1)
+        found = self.edge_ids[positions] == edge_ids
+        starts = self.offsets[positions]
+        counts = np.where(found, self.offsets[positions + 1] - starts, 0)
+        request_index = np.repeat(np.arange(len(edge_ids)), counts)
+        row_index = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        return row_index, request_index
+
+    def costs(
+        self, edge_ids: np.ndarray, fractions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Travel times from the grid cells to points on edges, the same lookup as reached_pois_heatmap.
+
+        Full edges ('a' or NULL) are always reached, partial edges ('p', 'ap') only if the fraction is
+        between their start_perc and end_perc (stored times PERC_SCALE). The cost is interpolated
+        between the start_cost at start_perc and the end_cost at end_perc. Returns the index of the
+        requested point, the grid_calculation_id and the cost of every match.
+        """
+        fractions = np.asarray(fractions, dtype=np.float64)
+        row_index, request_index = self.rows(edge_ids)
+        full = np.isin(self.columns["edge_type"][row_index], FULL_EDGE_TYPES)
+        start_perc = self.columns["start_perc"][row_index].astype(np.float64)
+        end_perc = self.columns["end_perc"][row_index].astype(np.float64)
+        # Full edges are stored without percentages and span the whole edge
+        start_perc[full] = 0
+        end_perc[full] = PERC_SCALE
+        position = fractions[request_index] * PERC_SCALE
+        reached = full | (
+            (position >= np.minimum(start_perc, end_perc)) & (position <= np.maximum(start_perc, end_perc))
+        )
+        row_index, request_index = row_index[reached], request_index[reached]
+        start_perc, end_perc, position = start_perc[reached], end_perc[reached], position[reached]
+        start_cost = self.columns["start_cost"][row_index].astype(np.float64)
+        end_cost = self.columns["end_cost"][row_index].astype(np.float64)
+        span = end_perc - start_perc
+        share = np.divide(
+            position - start_perc, span, out=np.zeros_like(position), where=span != 0
+        )
+        cost = start_cost + share * (end_cost - start_cost)
+        return request_index, self.columns["grid_calculation_id"][row_index], cost
+
+
+class TravelTimeStore:
+    """
+    File store of the heatmap travel times as an alternative to customer.reached_edge_heatmap_grid_calculation.
+
+    Every cluster of the heatmap build writes its travel times into its own directory of .npy columns.
+    After the build the clusters are merged into one matrix grouped by edge, which is read memory-mapped.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def cluster_path(self, cluster_id: int) -> Path:
+        return self.path / f"cluster_{cluster_id}"
+
+    def cluster_ids(self) -> List[int]:
+        return sorted(
+            int(p.name.split("_")[1])
+            for p in self.path.glob("cluster_*")
+            if p.is_dir() and not p.name.endswith(".tmp")
+        )
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def write_cluster(self, cluster_id: int, edges_traveltime: pd.DataFrame):
+        """Write the reached edges of a cluster (columns of reached_edge_heatmap_grid_calculation)."""
+        write_arrays(self.cluster_path(cluster_id), group_by_edge(edges_traveltime))
+
+    def full_edge_ids(self) -> np.ndarray:
+        """Ids of the edges which are fully reached in any of the written clusters."""
+        edge_ids = [np.empty(0, dtype=np.int64)]
+        for cluster_id in self.cluster_ids():
+            cluster = read_arrays(self.cluster_path(cluster_id))
+            full = np.isin(cluster["edge_type"], FULL_EDGE_TYPES)
+            counts = np.diff(cluster["offsets"])
+            edge_ids.append(np.unique(np.repeat(cluster["edge_ids"], counts)[full]))
+        return np.unique(np.concatenate(edge_ids))
+
+    def consolidate(self):
+        """
+        Merge the clusters into one matrix grouped by edge. The rows are scattered cluster by cluster
+        into memory-mapped output files, so only one cluster is held in memory.
+        """
+        cluster_ids = self.cluster_ids()
+        clusters = [read_arrays(self.cluster_path(c)) for c in cluster_ids]
+        if clusters:
+            edge_ids = np.unique(np.concatenate([c["edge_ids"] for c in clusters]))
+        else:
+            edge_ids = np.empty(0, dtype=np.int64)
+        counts = np.zeros(len(edge_ids), dtype=np.int64)
+        for cluster in clusters:
+            np.add.at(counts, np.searchsorted(edge_ids, cluster["edge_ids"]), np.diff(cluster["offsets"]))
+        offsets = np.zeros(len(edge_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        tmp_path = self.path / (MATRIX_DIR + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        np.save(tmp_path / "edge_ids.npy", edge_ids)
+        np.save(tmp_path / "offsets.npy", offsets)
+        columns = {
+            name: np.lib.format.open_memmap(
+                tmp_path / f"{name}.npy", mode="w+", dtype=dtype, shape=(int(offsets[-1]),)
+            )
+            for name, dtype in COLUMNS.items()
+        }
+        # Next free row of every edge
+        cursor = offsets[:-1].copy()
+        for cluster in clusters:
+            index = np.searchsorted(edge_ids, cluster["edge_ids"])
+            cluster_counts = np.diff(cluster["offsets"])
+            target = np.repeat(cursor[index] - cluster["offsets"][:-1], cluster_counts) + np.arange(
+                cluster["offsets"][-1]
+            )
+            for name, column in columns.items():
+                column[target] = cluster[name]
+            cursor[index] += cluster_counts
+        for column in columns.values():
+            column.flush()
+        del columns
+
+        matrix_path = self.path / MATRIX_DIR
+        shutil.rmtree(matrix_path, ignore_errors=True)
+        os.replace(tmp_path, matrix_path)
+
+    def load(self) -> TravelTimeMatrix:
+        """Open the merged matrix memory-mapped."""
+        arrays = read_arrays(self.path / MATRIX_DIR)
+        return TravelTimeMatrix(
+            edge_ids=arrays.pop("edge_ids"), offsets=arrays.pop("offsets"), columns=arrays
+        )
+
+
+traveltime_store = TravelTimeStore(settings.HEATMAP_TRAVELTIME_STORE_DIR)
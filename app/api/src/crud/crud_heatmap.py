@@ -1,30 +1,351 @@
 import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Set, Tuple
 
 import numpy as np
 import pandas as pd
 import psycopg2
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
-from geopandas import GeoDataFrame, GeoSeries
+from geopandas import GeoDataFrame
 from numpy import ndarray
 from pyparsing import dblQuotedString
 from rich import print
-from shapely.geometry import MultiPolygon, Polygon
 from sqlalchemy import event
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import delete, text
+from sqlalchemy.sql import delete, text, update
+from starlette.concurrency import run_in_threadpool
 
 from src import crud, schemas
+from src.core.accessibility_heatmap import accessibility_heatmap, align, reached_poi_arrays
 from src.core.config import settings
+from src.core.heatmap_grid import heatmap_grid_cache
+from src.core.heatmap_partition import TILE_SIZE, EdgeDensity, partition
+from src.core.heatmap_tiles import heatmap_tile_cache
+from src.core.network_cache import decode_wkb_linestrings, lonlat_to_3857, snap_points
+from src.core.traveltime_store import TravelTimeMatrix, traveltime_store
 from src.crud.base import CRUDBase
 from src.db import models
+from src.db.copy import copy_dataframe
 from src.db.models.grid import GridVisualization
-from src.db.session import legacy_engine
+from src.db.session import async_session, engine, legacy_engine
 from src.exts.cpp.bind import isochrone as isochrone_cpp
+from src.exts.cpp.bind import vertex_costs
+from src.resources.enums import AccessibilityHeatmapTypes, CalculationTypes, HeatmapTypes
+
+CONNECTIVITY_HEATMAP_SQL = """
+    SELECT g.id AS grid_visualization_id, g.percentile_area_isochrone, g.area_isochrone, 'default' AS modus, g.geom  
+    FROM basic.grid_visualization g, basic.study_area_grid_visualization s 
+    WHERE g.id = s.grid_visualization_id
+    AND s.study_area_id = :active_study_area_id
+"""
+POPULATION_HEATMAP_SQL = """
+    SELECT * FROM basic.heatmap_population(:active_study_area_id, :modus, :scenario_id)
+"""
+ACCESSIBILITY_HEATMAP_SQL = """
+    SELECT * 
+    FROM basic.{heatmap_type}((:heatmap_configuration)::jsonb, :user_id, :active_study_area_id, :modus, :scenario_id, :data_upload_ids)
+"""
+# Edges of the default network which are changed by a scenario: modified or deleted ways (removed),
+# ways split by the scenario and ways touching an edge of the scenario. Artificial edges of the
+# heatmap inherit the state of the way they split.
+SCENARIO_EDGES_SQL = """
+    WITH modified AS
+    (
+        SELECT UNNEST(basic.modified_edges(:scenario_id)) AS id, TRUE AS removed
+        UNION ALL
+        SELECT e.edge_id, FALSE
+        FROM basic.edge e
+        WHERE e.scenario_id = :scenario_id
+        AND e.edge_id IS NOT NULL
+        UNION ALL
+        SELECT d.id, FALSE
+        FROM basic.edge d, basic.edge e
+        WHERE e.scenario_id = :scenario_id
+        AND d.scenario_id IS NULL
+        AND ST_Intersects(d.geom, e.geom)
+    ),
+    edges AS
+    (
+        SELECT m.id, m.removed
+        FROM modified m
+        UNION ALL
+        SELECT a.id, m.removed
+        FROM temporal.heatmap_edges_artificial a, modified m
+        WHERE a.wid = m.id
+    )
+    SELECT e.id, bool_or(e.removed)
+    FROM edges e
+    GROUP BY e.id
+"""
+# Starting points of all grid calculation cells of the grid visualization cells reached by the passed cells
+SCENARIO_STARTING_POINTS_SQL = """
+    SELECT v.id AS starting_id, c.id AS grid_calculation_id, c.grid_visualization_id, h.cid,
+    ST_X(ST_CENTROID(v.geom)) AS x, ST_Y(ST_CENTROID(v.geom)) AS y
+    FROM temporal.heatmap_starting_vertices v, basic.grid_calculation c, temporal.heatmap_grid_helper h
+    WHERE ST_Intersects(v.geom, c.geom)
+    AND c.grid_visualization_id = h.id
+    AND c.grid_visualization_id IN
+    (
+        SELECT grid_visualization_id
+        FROM basic.grid_calculation
+        WHERE id = ANY(:grid_calculation_ids)
+    )
+    ORDER BY h.cid
+"""
+# POIs around the rerouted grid cells snapped to the fully reached edges of the scenario network
+# (see basic.reached_pois_heatmap)
+SCENARIO_POIS_EDGES_SQL = """
+    WITH area AS
+    (
+        SELECT ST_Buffer(ST_Envelope(ST_Collect(c.geom))::geography, CAST(:max_distance AS float))::geometry AS geom
+        FROM basic.grid_calculation c
+        WHERE c.id = ANY(:grid_calculation_ids)
+    ),
+    categories AS
+    (
+        SELECT jsonb_array_elements_text(basic.poi_categories(:user_id) -> 'true') AS category
+        UNION ALL
+        SELECT jsonb_array_elements_text(basic.poi_categories(:user_id) -> 'false') AS category
+    ),
+    pois AS
+    (
+        SELECT p.uid, NULL::integer AS data_upload_id, p.geom
+        FROM basic.poi p, area a
+        WHERE ST_Intersects(p.geom, a.geom)
+        AND p.category IN (SELECT category FROM categories)
+        AND NOT p.uid = ANY(basic.modified_pois(:scenario_id))
+        UNION ALL
+        SELECT p.uid, p.data_upload_id, p.geom
+        FROM customer.poi_user p, customer.scenario s, area a
+        WHERE ST_Intersects(p.geom, a.geom)
+        AND s.id = :scenario_id
+        AND p.data_upload_id = ANY(s.data_upload_ids)
+        AND NOT p.uid = ANY(basic.modified_pois(:scenario_id))
+        UNION ALL
+        SELECT p.uid, NULL::integer, p.geom
+        FROM customer.poi_modified p, area a
+        WHERE ST_Intersects(p.geom, a.geom)
+        AND p.scenario_id = :scenario_id
+        AND p.edit_type <> 'd'
+    )
+    SELECT p.uid, p.data_upload_id, f.edge_id, f.fraction
+    FROM pois p
+    CROSS JOIN LATERAL
+    (
+        SELECT ST_LineLocatePoint(e.geom, p.geom) AS fraction, e.edge_id
+        FROM customer.reached_edge_full_heatmap e
+        WHERE e.geom && ST_Buffer(p.geom::geography, basic.select_customization('snap_distance_poi_heatmap')::integer)::geometry
+        AND ((e.scenario_id IS NULL AND NOT e.edge_id = ANY(:removed_edge_ids)) OR e.scenario_id = :scenario_id)
+        ORDER BY ST_CLOSESTPOINT(e.geom, p.geom) <-> p.geom
+        LIMIT 1
+    ) AS f
+    WHERE f.edge_id = ANY(:reached_edge_ids)
+"""
+# Grid cells around the changed edges of a scenario if the travel times are not stored
+SCENARIO_GRID_CALCULATION_SQL = """
+    SELECT DISTINCT c.id
+    FROM basic.grid_calculation c, basic.edge e
+    WHERE e.id = ANY(:edge_ids)
+    AND c.geom && ST_Buffer(e.geom::geography, CAST(:max_distance AS float))::geometry
+"""
+# Starting vertices of the grid calculation cells of the heatmap build
+HEATMAP_STARTING_VERTICES_SQL = """
+    SELECT v.id, c.grid_visualization_id
+    FROM temporal.heatmap_starting_vertices v, basic.grid_calculation c
+    WHERE ST_Intersects(v.geom, c.geom)
+    ORDER BY v.id
+"""
+# POIs around the grid cells of a cluster which are not computed yet (see basic.reached_pois_heatmap)
+CLUSTER_POIS_SQL = """
+    WITH area AS
+    (
+        SELECT ST_Buffer(ST_Union(h.geom)::geography, basic.select_customization('snap_distance_poi_heatmap')::integer)::geometry AS geom
+        FROM temporal.heatmap_grid_helper h
+        WHERE h.cid = :cid
+    ),
+    categories AS
+    (
+        SELECT jsonb_array_elements_text(basic.poi_categories(:user_id) -> 'true') AS category
+        UNION ALL
+        SELECT jsonb_array_elements_text(basic.poi_categories(:user_id) -> 'false') AS category
+    )
+    SELECT p.uid, NULL::integer AS data_upload_id, ST_X(p.geom) AS x, ST_Y(p.geom) AS y
+    FROM basic.poi p, area a
+    WHERE ST_Intersects(p.geom, a.geom)
+    AND p.category IN (SELECT category FROM categories)
+    AND NOT EXISTS (SELECT 1 FROM customer.reached_poi_heatmap r WHERE r.poi_uid = p.uid)
+    ORDER BY ST_GeoHash(p.geom)
+"""
+# Fully reached edges of the default network around the POIs of a cluster
+CLUSTER_REACHED_EDGES_SQL = """
+    WITH area AS
+    (
+        SELECT ST_Buffer(ST_Union(h.geom)::geography, 2 * basic.select_customization('snap_distance_poi_heatmap')::integer)::geometry AS geom
+        FROM temporal.heatmap_grid_helper h
+        WHERE h.cid = :cid
+    )
+    SELECT e.edge_id, ST_AsBinary(ST_Transform(e.geom, 3857), 'NDR') AS geom
+    FROM customer.reached_edge_full_heatmap e, area a
+    WHERE e.geom && a.geom
+    AND e.scenario_id IS NULL
+"""
+# Uploaded POIs of a data upload around the study area
+REVERSE_POIS_USER_SQL = """
+    SELECT p.uid, p.data_upload_id, ST_X(p.geom) AS x, ST_Y(p.geom) AS y
+    FROM customer.poi_user p, basic.study_area s
+    WHERE s.id = :active_study_area_id
+    AND ST_Intersects(p.geom, ST_Buffer(s.geom::geography, basic.select_customization('snap_distance_poi_heatmap')::integer)::geometry)
+    AND p.data_upload_id = :data_upload_id
+    ORDER BY ST_GeoHash(p.geom)
+"""
+# Centroids of the grid cells which are split into the batches of the heatmap build
+HEATMAP_GRID_CENTROIDS_SQL = """
+    SELECT g.id, ST_X(ST_Centroid(g.geom)), ST_Y(ST_Centroid(g.geom))
+    FROM basic.grid_visualization g
+"""
+# Number of edges per tile (EPSG:3857) around the grid, the work estimate of the heatmap batches
+EDGE_DENSITY_SQL = """
+    WITH area AS
+    (
+        SELECT ST_Buffer(ST_SetSRID(ST_Extent(g.geom)::geometry, 4326)::geography, CAST(:max_distance AS float))::geometry AS geom
+        FROM basic.grid_visualization g
+    ),
+    edges AS
+    (
+        SELECT ST_Transform(ST_Centroid(e.geom), 3857) AS geom
+        FROM basic.edge e, area a
+        WHERE e.geom && a.geom
+    )
+    SELECT floor(ST_X(e.geom) / :tile_size)::integer AS tile_x, floor(ST_Y(e.geom) / :tile_size)::integer AS tile_y, count(*)
+    FROM edges e
+    GROUP BY 1, 2
+"""
+# Starting points of the grid calculation cells of a cluster
+CLUSTER_STARTING_POINTS_SQL = """
+    SELECT v.id, c.id, c.grid_visualization_id, ST_X(ST_CENTROID(v.geom)), ST_Y(ST_CENTROID(v.geom))
+    FROM temporal.heatmap_starting_vertices v, basic.grid_calculation c, temporal.heatmap_grid_helper h
+    WHERE ST_Intersects(v.geom, c.geom)
+    AND c.grid_visualization_id = h.id
+    AND h.cid = :cid
+    ORDER BY v.id
+"""
+# POIs of the heatmap categories which can be reached from the grid cells of a cluster
+NEAREST_POIS_SQL = """
+    WITH area AS
+    (
+        SELECT ST_Buffer(ST_Union(h.geom)::geography, CAST(:max_distance AS float))::geometry AS geom
+        FROM temporal.heatmap_grid_helper h
+        WHERE h.cid = :cid
+    ),
+    categories AS
+    (
+        SELECT jsonb_array_elements_text(basic.poi_categories(:user_id) -> 'true') AS category
+        UNION ALL
+        SELECT jsonb_array_elements_text(basic.poi_categories(:user_id) -> 'false') AS category
+    )
+    SELECT p.uid, p.category, ST_X(p.geom) AS x, ST_Y(p.geom) AS y
+    FROM basic.poi p, area a
+    WHERE ST_Intersects(p.geom, a.geom)
+    AND p.category IN (SELECT category FROM categories)
+"""
+# Number of POIs whose reverse searches share one routing network
+REVERSE_SEARCH_BATCH_SIZE = 1000
+# Columns of customer.reached_edge_heatmap_grid_calculation written by the heatmap build
+REACHED_EDGE_COLUMNS = [
+    "reached_edge_heatmap_id",
+    "start_cost",
+    "end_cost",
+    "start_perc",
+    "end_perc",
+    "grid_calculation_id",
+    "edge_type",
+]
+# Value and percentile column of the heatmaps in the values format
+HEATMAP_VALUE_COLUMNS = {
+    HeatmapTypes.connectivity: ("area_isochrone", "percentile_area_isochrone"),
+    HeatmapTypes.population: ("population", "percentile_population"),
+    AccessibilityHeatmapTypes.local_accessibility: ("accessibility_index", "percentile_accessibility"),
+    AccessibilityHeatmapTypes.local_accessibility_population: (
+        "accessibility_index",
+        "population_accessibility",
+    ),
+}
+
+
+def heatmap_values_sql(query: str, value: str, percentile: str) -> str:
+    """Aggregate the value and percentile columns of a heatmap query per grid cell of the study area."""
+    return f"""
+    WITH heatmap AS
+    (
+        {query}
+    )
+    SELECT COALESCE(ARRAY_AGG(h.grid_visualization_id ORDER BY h.grid_visualization_id), '{{}}'),
+    COALESCE(ARRAY_AGG(h.{value} ORDER BY h.grid_visualization_id), '{{}}'),
+    COALESCE(ARRAY_AGG(h.{percentile} ORDER BY h.grid_visualization_id), '{{}}')
+    FROM heatmap h, basic.study_area_grid_visualization s
+    WHERE h.grid_visualization_id = s.grid_visualization_id
+    AND s.study_area_id = :active_study_area_id
+    """
+
+
+def reached_edges_traveltime(network, dict_starting_ids: dict) -> pd.DataFrame:
+    """
+    Classify the reached edges of a heatmap batch and return them in the columns of
+    customer.reached_edge_heatmap_grid_calculation.
+    """
+    network_df = pd.DataFrame(
+        {
+            "edge_id": network.edge,
+            "start_cost": network.start_cost,
+            "end_cost": network.end_cost,
+            "start_perc": network.start_perc,
+            "end_perc": network.end_perc,
+            "start_id": network.start_id,
+        }
+    )
+    network_df["grid_calculation_id"] = network_df["start_id"].map(dict_starting_ids)
+
+    # Classify network
+    network_df.loc[~network_df["start_perc"].isin([0, 1]), "edge_type"] = "p"
+    network_df.loc[~network_df["end_perc"].isin([0, 1]), "edge_type"] = "p"
+    network_df.loc[
+        (network_df["edge_id"] > 2000000000) & (network_df["edge_type"] == "p"),
+        "edge_type",
+    ] = "ap"
+    network_df.loc[
+        (network_df["edge_id"] > 2000000000) & (network_df["edge_type"].isnull()),
+        "edge_type",
+    ] = "a"
+
+    network_df["start_perc"] = network_df["start_perc"] * 10000
+    network_df["end_perc"] = network_df["end_perc"] * 10000
+    network_df = network_df.astype(
+        {
+            "start_cost": int,
+            "end_cost": int,
+            "start_perc": int,
+            "end_perc": int,
+        }
+    )
+
+    network_df.loc[
+        (network_df["edge_type"] != "p") & (network_df["edge_type"] != "ap"), "start_perc"
+    ] = np.nan
+    network_df.loc[
+        (network_df["edge_type"] != "p") & (network_df["edge_type"] != "ap"), "end_perc"
+    ] = np.nan
+    network_df["end_perc"] = network_df["end_perc"].astype("Int64")
+    network_df["start_perc"] = network_df["start_perc"].astype("Int64")
+
+    network_df = network_df.rename(columns={"edge_id": "reached_edge_heatmap_id"})
+    return network_df[REACHED_EDGE_COLUMNS]
 
 
 class CRUDGridCalculation(
@@ -33,60 +354,149 @@ class CRUDGridCalculation(
     pass
 
 
-# Alternative to_sql() *method* for DBs that support COPY FROM
-import csv
-from io import StringIO
-
-
-def psql_insert_copy(table, conn, keys, data_iter):
-    """
-    Execute SQL statement inserting data
-
-    Parameters
-    ----------
-    table : pandas.io.sql.SQLTable
-    conn : sqlalchemy.engine.Engine or sqlalchemy.engine.Connection
-    keys : list of str
-        Column names
-    data_iter : Iterable that iterates the values to be inserted
-    """
-    # gets a DBAPI connection that can provide a cursor
-    dbapi_conn = conn.connection
-    with dbapi_conn.cursor() as cur:
-        s_buf = StringIO()
-        writer = csv.writer(s_buf)
-        writer.writerows(data_iter)
-        s_buf.seek(0)
-
-        columns = ", ".join(['"{}"'.format(k) for k in keys])
-        if table.schema:
-            table_name = "{}.{}".format(table.schema, table.name)
+class CRUDHeatmap:
+    async def read_heatmap_values(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        heatmap: HeatmapTypes,
+        modus: CalculationTypes = CalculationTypes.default,
+        scenario_id: int = 0,
+        heatmap_type: AccessibilityHeatmapTypes = AccessibilityHeatmapTypes.local_accessibility,
+        heatmap_configuration: str = None,
+    ) -> Tuple[list, list, list]:
+        """
+        Read grid_visualization_id, value and percentile of a heatmap for the grid cells of the
+        active study area, ordered by grid_visualization_id.
+        """
+        study_area_id = current_user.active_study_area_id
+        query_params = {
+            "active_study_area_id": study_area_id,
+            "modus": modus.value,
+            "scenario_id": scenario_id,
+        }
+        if heatmap == HeatmapTypes.connectivity:
+            query, columns = CONNECTIVITY_HEATMAP_SQL, HEATMAP_VALUE_COLUMNS[heatmap]
+        elif heatmap == HeatmapTypes.population:
+            query, columns = POPULATION_HEATMAP_SQL, HEATMAP_VALUE_COLUMNS[heatmap]
+        elif heatmap_type == AccessibilityHeatmapTypes.nearest_poi:
+            if modus != CalculationTypes.default:
+                raise HTTPException(
+                    status_code=400,
+                    detail="The nearest POI heatmap is only available for the default modus.",
+                )
+            values = await accessibility_heatmap.nearest_poi(
+                db, list(json.loads(heatmap_configuration))
+            )
+            grid = await heatmap_grid_cache.get(db, study_area_id)
+            grid_ids = values["grid_visualization_id"].to_numpy()
+            costs, percentiles, reached = align(
+                grid.grid_visualization_ids,
+                [
+                    (grid_ids, values["nearest_poi_cost"].to_numpy()),
+                    (grid_ids, values["percentile_nearest_poi"].to_numpy()),
+                    (grid_ids, np.ones(len(grid_ids), dtype=bool)),
+                ],
+            )
+            # Grid cells without POI of the categories within 20 minutes have no travel time
+            return (
+                grid.grid_visualization_ids.tolist(),
+                np.where(reached, costs, None).tolist(),
+                percentiles.tolist(),
+            )
         else:
-            table_name = table.name
+            data_upload_ids = await db.execute(
+                text("SELECT basic.active_data_uploads_study_area(:user_id)"),
+                {"user_id": current_user.id},
+            )
+            data_upload_ids = data_upload_ids.scalar() or []
+            if (
+                settings.HEATMAP_ACCESSIBILITY_ENGINE_ENABLED
+                and heatmap_type == AccessibilityHeatmapTypes.local_accessibility
+            ):
+                values = await accessibility_heatmap.compute(
+                    db,
+                    json.loads(heatmap_configuration),
+                    current_user.id,
+                    study_area_id,
+                    modus.value,
+                    scenario_id,
+                    data_upload_ids,
+                )
+                grid = await heatmap_grid_cache.get(db, study_area_id)
+                grid_ids = values["grid_visualization_id"].to_numpy()
+                accessibility_indices, percentiles = align(
+                    grid.grid_visualization_ids,
+                    [
+                        (grid_ids, values["accessibility_index"].to_numpy()),
+                        (grid_ids, values["percentile_accessibility"].to_numpy()),
+                    ],
+                )
+                return (
+                    grid.grid_visualization_ids.tolist(),
+                    accessibility_indices.tolist(),
+                    percentiles.tolist(),
+                )
 
-        sql = "COPY {} ({}) FROM STDIN WITH CSV".format(table_name, columns)
-        cur.copy_expert(sql=sql, file=s_buf)
+            query = ACCESSIBILITY_HEATMAP_SQL.format(heatmap_type=heatmap_type.value)
+            columns = HEATMAP_VALUE_COLUMNS[heatmap_type]
+            query_params.update(
+                {
+                    "heatmap_configuration": heatmap_configuration,
+                    "user_id": current_user.id,
+                    "data_upload_ids": data_upload_ids,
+                }
+            )
 
+        heatmap_values = await db.execute(text(heatmap_values_sql(query, *columns)), query_params)
+        grid_visualization_ids, values, percentiles = heatmap_values.fetchone()
+        return list(grid_visualization_ids), list(values), list(percentiles)
 
-class CRUDHeatmap:
-    async def prepare_starting_points(self, db: AsyncSession, current_user: models.User):
-        """Get starting points for heatmap calculation."""
+    async def prepare_starting_points(
+        self, db: AsyncSession, current_user: models.User, batch_size: int = 50
+    ):
+        """
+        Get starting points for heatmap calculation.
+
+        The grid is split into batches of about the same routing work, on average batch_size grid
+        cells per batch (see heatmap_partition.partition). The network footprint of each batch is
+        stored with its grid cells, the batches with the largest footprint are computed first.
+        """
+        max_distance = 20 * 60 * 1.333
+        grid = await db.execute(text(HEATMAP_GRID_CENTROIDS_SQL))
+        grid = np.array(grid.fetchall(), dtype=np.float64).reshape(-1, 3)
+        edge_density = await db.execute(
+            text(EDGE_DENSITY_SQL), {"max_distance": max_distance, "tile_size": TILE_SIZE}
+        )
+        edge_density = np.array(edge_density.fetchall(), dtype=np.int64).reshape(-1, 3)
+
+        # Distances in web mercator are stretched by 1 / cos(latitude)
+        buffer = max_distance / np.cos(np.radians(grid[:, 2].mean())) if len(grid) else 0
+        batches, footprints = partition(
+            *lonlat_to_3857(grid[:, 1], grid[:, 2]),
+            EdgeDensity(*edge_density.T),
+            buffer,
+            max(1, len(grid) // batch_size),
+        )
 
         await db.execute(text("DROP TABLE IF EXISTS temporal.heatmap_grid_helper;"))
         await db.commit()
-        query = text(
-            """
-            CREATE TABLE temporal.heatmap_grid_helper AS 
-            WITH cnt AS 
-            (
-                SELECT count(*) cnt 
-                FROM basic.grid_visualization g 
-            )
-            SELECT ST_ClusterKMeans(geom, (cnt / 50)::integer) OVER() AS cid, id, geom, False as already_processed  
-            FROM basic.grid_visualization g, cnt; 
-            """
+        await db.execute(
+            text(
+                """
+                CREATE TABLE temporal.heatmap_grid_helper AS 
+                SELECT h.cid, g.id, g.geom, False AS already_processed, h.footprint 
+                FROM basic.grid_visualization g, 
+                UNNEST(CAST(:ids AS bigint[]), CAST(:cids AS integer[]), CAST(:footprints AS integer[])) AS h(id, cid, footprint)
+                WHERE g.id = h.id; 
+                """
+            ),
+            {
+                "ids": grid[:, 0].astype(np.int64).tolist(),
+                "cids": batches.tolist(),
+                "footprints": footprints[batches].tolist(),
+            },
         )
-        await db.execute(query)
         await db.commit()
 
     async def clean_tables(self, db: AsyncSession):
@@ -95,6 +505,10 @@ class CRUDHeatmap:
         await db.execute(text("DROP TABLE IF EXISTS temporal.size_isochrone_heatmap;"))
         await db.execute(text("TRUNCATE customer.reached_edge_full_heatmap;"))
         await db.execute(text("TRUNCATE customer.reached_edge_heatmap_grid_calculation;"))
+        # The heatmaps of the scenarios are based on the reached edges and have to be recomputed
+        await db.execute(text("TRUNCATE customer.reached_poi_heatmap_scenario;"))
+        await db.execute(text("TRUNCATE customer.heatmap_grid_scenario;"))
+        await db.execute(text("UPDATE customer.scenario SET routing_heatmap_computed = FALSE;"))
         await db.commit()
 
         # Reset serials columns
@@ -108,299 +522,310 @@ class CRUDHeatmap:
         )
         await db.commit()
 
-    async def process_heatmap_edges(self, db: AsyncSession):
-        """Process heatmap edges."""
+    async def process_heatmap_edges(self, db: AsyncSession, edge_ids: Set[int]):
+        """Write the geometries of the fully reached edges to reached_edge_full_heatmap in one bulk load."""
 
         await db.execute(
             text(
                 """INSERT INTO customer.reached_edge_full_heatmap(edge_id, geom)
-                    SELECT a.edge_id, ST_TRANSFORM(ST_SETSRID(
-                        ST_GeomFromGeoJSON('{"type":"LineString","coordinates":' || a.geom || '}'),
-                        3857
-                    ), 4326) AS geom  
-                    FROM temporal.artificial_full_edges a;"""
-            )
-        )
-        await db.commit()
-
-        await db.execute(
-            text(
-                """INSERT INTO customer.reached_edge_full_heatmap(geom, edge_id)
-                WITH merged AS 
-                (
-                    SELECT f.edge_id
-                    FROM temporal.full_edges f
-                    LEFT JOIN customer.reached_edge_full_heatmap r 
-                    ON f.edge_id = r.edge_id 
-                    WHERE r.edge_id IS NULL  
-                )
-                SELECT e.geom, m.edge_id 
-                FROM merged m, basic.edge e 
-                WHERE m.edge_id = e.id; """
-            )
+                SELECT e.id, e.geom  
+                FROM basic.edge e 
+                WHERE e.id = ANY(:edge_ids)
+                UNION ALL 
+                SELECT a.id, a.geom 
+                FROM temporal.heatmap_edges_artificial a 
+                WHERE a.id = ANY(:edge_ids);"""
+            ),
+            {"edge_ids": sorted(edge_ids)},
         )
         await db.commit()
 
     async def compute_traveltime(
-        self, db: AsyncSession, db_sync: Session, current_user: models.User
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        processes: int = settings.HEATMAP_PROCESSES,
+        resume: bool = False,
     ):
+        """
+        Compute the traveltime and connectivity heatmap for the clusters of temporal.heatmap_grid_helper.
+
+        With processes > 1 the clusters are spread over a pool of processes, each with its own database
+        connections. Finished clusters are marked as already_processed, with resume=True only the
+        clusters which are not processed yet are computed. With HEATMAP_TRAVELTIME_STORE=none the travel
+        times of the grid cells are not stored, the reached POIs are then computed with a reverse search
+        from the POIs and the fully reached edges of a resumed build only cover the clusters of this run.
+        """
         before = datetime.now()
+        if not resume:
+            await db.execute(text("UPDATE temporal.heatmap_grid_helper SET already_processed = False;"))
+            await db.commit()
+            if settings.HEATMAP_TRAVELTIME_STORE == "file":
+                traveltime_store.clear()
+
+        # Batches with the largest network footprint first, so no straggler is left at the end of the build
         kmeans_classes = await db.execute(
-            text("SELECT DISTINCT cid FROM temporal.heatmap_grid_helper;")
+            text(
+                """SELECT cid FROM temporal.heatmap_grid_helper WHERE already_processed = False 
+                GROUP BY cid ORDER BY max(footprint) DESC, cid;"""
+            )
         )
         kmeans_classes = kmeans_classes.fetchall()
         kmeans_classes = [c[0] for c in kmeans_classes]
 
+        # The artificial edges of an interrupted build are kept, the ids of the artificial edges which are
+        # already written would not match otherwise.
+        artificial_edges_exist = await db.execute(
+            text("SELECT to_regclass('temporal.heatmap_edges_artificial') IS NOT NULL;")
+        )
+        if not resume or not artificial_edges_exist.scalar():
+            await db.execute(
+                "SELECT basic.heatmap_prepare_artificial(:kmeans_classes);",
+                {"kmeans_classes": kmeans_classes},
+            )
         await db.execute(
-            "SELECT basic.heatmap_prepare_artificial(:kmeans_classes);",
-            {"kmeans_classes": kmeans_classes},
+            text(
+                """CREATE TABLE IF NOT EXISTS temporal.size_isochrone_heatmap 
+                (id bigint, area_isochrone float);"""
+            )
         )
         await db.commit()
 
+        # Ids of the fully reached edges, their geometries are written once after all clusters are computed
+        reached_edge_ids = set()
+        if resume and settings.HEATMAP_TRAVELTIME_STORE == "file":
+            reached_edge_ids.update(traveltime_store.full_edge_ids().tolist())
+        elif resume and settings.HEATMAP_TRAVELTIME_STORE == "database":
+            processed_edge_ids = await db.execute(
+                text(
+                    """SELECT DISTINCT reached_edge_heatmap_id 
+                    FROM customer.reached_edge_heatmap_grid_calculation 
+                    WHERE edge_type IS NULL OR edge_type = 'a';"""
+                )
+            )
+            reached_edge_ids.update(r[0] for r in processed_edge_ids.fetchall())
+
         cnt = 0
         cnt_sections = len(kmeans_classes)
+        if processes > 1:
+            threads = settings.HEATMAP_THREADS
+            if threads <= 0:
+                # Share the cores between the processes
+                threads = max(1, (os.cpu_count() or 1) // processes)
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                clusters = [
+                    loop.run_in_executor(
+                        executor, compute_traveltime_worker, kmeans_class, current_user.id, threads
+                    )
+                    for kmeans_class in kmeans_classes
+                ]
+                for cluster in asyncio.as_completed(clusters):
+                    edge_ids = await cluster
+                    if edge_ids is not None:
+                        reached_edge_ids.update(edge_ids.tolist())
+                    cnt += 1
+                    print(
+                        f"INFO: You computed [bold magenta]{cnt}[/bold magenta] out of [bold magenta]{cnt_sections}[/bold magenta] added."
+                    )
+        else:
+            for kmeans_class in kmeans_classes:
+                edge_ids = await self.compute_traveltime_cluster(db, current_user, kmeans_class)
+                if edge_ids is not None:
+                    reached_edge_ids.update(edge_ids.tolist())
+                cnt += 1
+                print(
+                    f"INFO: You computed [bold magenta]{cnt}[/bold magenta] out of [bold magenta]{cnt_sections}[/bold magenta] added."
+                )
 
-        for kmeans_class in kmeans_classes:
-            cnt += 1
-            starting_time_section = datetime.now()
-
-            # Get starting points for starting grids
-            starting_points = await db.execute(
-                text(
-                    """SELECT v.id AS starting_id, c.id AS grid_calculation_id, ST_X(ST_CENTROID(v.geom)) AS x, ST_Y(ST_CENTROID(v.geom)) AS y   
-                    FROM temporal.heatmap_starting_vertices v, basic.grid_calculation c, temporal.heatmap_grid_helper h  
-                    WHERE ST_Intersects(v.geom, c.geom)
-                    AND c.grid_visualization_id = h.id 
-                    AND h.cid = :cid 
-                    AND h.already_processed = False 
-                    """
-                ),
-                {"cid": kmeans_class},
-            )
-
-            starting_points = starting_points.fetchall()
-            starting_id = [i[0] for i in starting_points]
-            grid_ids = [i[1] for i in starting_points]
-            x = [i[2] for i in starting_points]
-            y = [i[3] for i in starting_points]
-            dict_starting_ids = dict(zip(starting_id, grid_ids))
-
-            obj_multi_isochrones = schemas.IsochroneMulti(
-                user_id=current_user.id,
-                scenario_id=0,
-                speed=1.333,
-                modus="default",
-                n=1,
-                minutes=20,
-                routing_profile="walking_standard",
-                active_upload_ids=[],
-                x=x,
-                y=y,
-            )
-            # Read network
-            starting_time_network = datetime.now()
-            network = await crud.isochrone.read_network(
-                db,
-                schemas.isochrone.IsochroneTypeEnum.heatmap.value,
-                obj_multi_isochrones,
-                jsonable_encoder(obj_multi_isochrones),
-            )
+        # Edges which were written by a previous run of the build are skipped
+        written_edge_ids = await db.execute(
+            text("SELECT edge_id FROM customer.reached_edge_full_heatmap;")
+        )
+        reached_edge_ids.difference_update(r[0] for r in written_edge_ids.fetchall())
+        await self.process_heatmap_edges(db, reached_edge_ids)
 
-            edges_network = network[0]
-            network_ids = network[1]
-            distance_limits = network[2]
-            reading_time_network = (datetime.now() - starting_time_network).total_seconds()
+        if settings.HEATMAP_TRAVELTIME_STORE == "file":
+            traveltime_store.consolidate()
 
-            # Compute isochrones for connectivity heatmap
-            await self.compute_connectivity_heatmap(
-                db_sync, edges_network, dict_starting_ids, network_ids, distance_limits
-            )
+        # The percentiles are computed over the whole grid, so the connectivity heatmap is finalized once
+        # after all clusters are computed
+        await self.finalize_connectivity_heatmap(db)
 
-            # Compute traveltime
-            starting_time_calculation = datetime.now()
-            try:
-                result = isochrone_cpp(edges_network, network_ids, distance_limits)
-            except Exception as e:
-                print(f"Error: {e}")
-                continue
-            calculation_time_catchment = (
-                datetime.now() - starting_time_calculation
-            ).total_seconds()
+        print(
+            f"It took [bold magenta]{(datetime.now() - before).total_seconds() / 60} minutes[/bold magenta] to compute the isochrones."
+        )
 
-            network_df = pd.DataFrame(
-                [
-                    {
-                        "edge_id": getattr(f, "edge"),
-                        "start_cost": getattr(f, "start_cost"),
-                        "end_cost": getattr(f, "end_cost"),
-                        "start_perc": getattr(f, "start_perc"),
-                        "end_perc": getattr(f, "end_perc"),
-                        "start_id": getattr(f, "start_id"),
-                        "geom": getattr(f, "shape"),
-                    }
-                    for f in result.network
-                ]
-            )
-            network_df["grid_calculation_id"] = network_df["start_id"].map(dict_starting_ids)
-
-            # Classify network
-            network_df.loc[~network_df["start_perc"].isin([0, 1]), "edge_type"] = "p"
-            network_df.loc[~network_df["end_perc"].isin([0, 1]), "edge_type"] = "p"
-            network_df.loc[
-                (network_df["edge_id"] > 2000000000) & (network_df["edge_type"] == "p"),
-                "edge_type",
-            ] = "ap"
-            network_df.loc[
-                (network_df["edge_id"] > 2000000000) & (network_df["edge_type"].isnull()),
-                "edge_type",
-            ] = "a"
-
-            network_df["start_perc"] = network_df["start_perc"] * 10000
-            network_df["end_perc"] = network_df["end_perc"] * 10000
-            network_df = network_df.astype(
-                {
-                    "start_cost": int,
-                    "end_cost": int,
-                    "start_perc": int,
-                    "end_perc": int,
-                    "geom": str,
-                }
-            )
+    async def read_heatmap_network(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        x: List[float],
+        y: List[float],
+        modus: CalculationTypes = CalculationTypes.default,
+        scenario_id: int = 0,
+    ):
+        """Read the routing network of the heatmap (20 minutes walking) around the starting points."""
+        obj_multi_isochrones = schemas.IsochroneMulti(
+            user_id=current_user.id,
+            scenario_id=scenario_id,
+            speed=1.333,
+            modus=modus.value,
+            n=1,
+            minutes=20,
+            routing_profile="walking_standard",
+            active_upload_ids=[],
+            x=x,
+            y=y,
+        )
+        network = await crud.isochrone.read_network(
+            db,
+            schemas.isochrone.IsochroneTypeEnum.heatmap.value,
+            obj_multi_isochrones,
+            jsonable_encoder(obj_multi_isochrones),
+        )
+        await db.commit()
+        return network
+
+    async def compute_traveltime_cluster(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        kmeans_class: int,
+        threads: int = settings.HEATMAP_THREADS,
+    ) -> Optional[ndarray]:
+        """
+        Compute the traveltime and connectivity heatmap of a single cluster. The results are written and the
+        cluster is marked as processed in one transaction. Returns the ids of the fully reached edges or None
+        if the computation failed.
+        """
+        starting_time_section = datetime.now()
+
+        # Get starting points for starting grids
+        starting_points = await db.execute(
+            text(
+                """SELECT v.id AS starting_id, c.id AS grid_calculation_id, ST_X(ST_CENTROID(v.geom)) AS x, ST_Y(ST_CENTROID(v.geom)) AS y   
+                FROM temporal.heatmap_starting_vertices v, basic.grid_calculation c, temporal.heatmap_grid_helper h  
+                WHERE ST_Intersects(v.geom, c.geom)
+                AND c.grid_visualization_id = h.id 
+                AND h.cid = :cid 
+                AND h.already_processed = False 
+                """
+            ),
+            {"cid": kmeans_class},
+        )
 
-            network_df.loc[
-                (network_df["edge_type"] != "p") & (network_df["edge_type"] != "ap"), "start_perc"
-            ] = np.nan
-            network_df.loc[
-                (network_df["edge_type"] != "p") & (network_df["edge_type"] != "ap"), "end_perc"
-            ] = np.nan
-            network_df["end_perc"] = network_df["end_perc"].astype("Int64")
-            network_df["start_perc"] = network_df["start_perc"].astype("Int64")
-
-            # Write network to database
-            artificial_full_edges = network_df[network_df["edge_type"] == "a"][["edge_id", "geom"]]
-            artificial_full_edges = artificial_full_edges.drop_duplicates(
-                subset=["edge_id", "geom"], keep="last"
-            )
-            artificial_full_edges.to_sql(
-                "artificial_full_edges",
-                legacy_engine,
-                method=psql_insert_copy,
-                index=True,
-                if_exists="replace",
-                chunksize=10000,
-                schema="temporal",
-            )
-            full_edges = network_df[network_df["edge_type"].isnull()][["edge_id"]].drop_duplicates(
-                "edge_id", keep="last"
-            )
-            full_edges.to_sql(
-                "full_edges",
-                legacy_engine,
-                method=psql_insert_copy,
-                index=True,
-                if_exists="replace",
-                chunksize=10000,
-                schema="temporal",
-            )
-
-            edges_traveltime = network_df[
-                [
-                    "edge_id",
-                    "start_cost",
-                    "end_cost",
-                    "start_perc",
-                    "end_perc",
-                    "grid_calculation_id",
-                    "edge_type",
-                ]
-            ]
-            edges_traveltime.rename(columns={"edge_id": "reached_edge_heatmap_id"}, inplace=True)
-            edges_traveltime.to_sql(
-                "reached_edge_heatmap_grid_calculation",
-                legacy_engine,
-                method=psql_insert_copy,
-                index=False,
-                if_exists="append",
-                chunksize=10000,
-                schema="customer",
+        starting_points = starting_points.fetchall()
+        starting_id = [i[0] for i in starting_points]
+        grid_ids = [i[1] for i in starting_points]
+        x = [i[2] for i in starting_points]
+        y = [i[3] for i in starting_points]
+        dict_starting_ids = dict(zip(starting_id, grid_ids))
+
+        # Read network
+        starting_time_network = datetime.now()
+        network = await self.read_heatmap_network(db, current_user, x, y)
+        edges_network = network[0]
+        network_ids = network[1]
+        distance_limits = network[2]
+        reading_time_network = (datetime.now() - starting_time_network).total_seconds()
+
+        # Compute isochrones and traveltime network in one run
+        starting_time_calculation = datetime.now()
+        try:
+            result = isochrone_cpp(
+                edges_network,
+                network_ids,
+                distance_limits,
+                threads=threads,
+                cumulative=True,
             )
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+        calculation_time_catchment = (datetime.now() - starting_time_calculation).total_seconds()
+
+        edges_traveltime = reached_edges_traveltime(result.network, dict_starting_ids)
+        full_edge_ids = np.unique(
+            edges_traveltime.loc[
+                edges_traveltime["edge_type"].isnull() | (edges_traveltime["edge_type"] == "a"),
+                "reached_edge_heatmap_id",
+            ].to_numpy()
+        )
 
-            # Process edges inside database
-            await self.process_heatmap_edges(db)
-
-            # Finalize connectivity heatmap
-            await self.finalize_connectivity_heatmap(db)
+        # Write network to database and mark the cluster as processed in one transaction. The writes run in
+        # a worker thread to not block the event loop.
+        def write_cluster():
+            with legacy_engine.begin() as connection:
+                # Compute connectivity heatmap
+                self.compute_connectivity_heatmap(connection, result, dict_starting_ids)
+
+                if settings.HEATMAP_TRAVELTIME_STORE == "file":
+                    # The files are written before the cluster is marked as processed
+                    traveltime_store.write_cluster(kmeans_class, edges_traveltime)
+                elif settings.HEATMAP_TRAVELTIME_STORE == "database":
+                    copy_dataframe(
+                        connection,
+                        edges_traveltime,
+                        "reached_edge_heatmap_grid_calculation",
+                        schema="customer",
+                    )
+
+                connection.execute(
+                    text("UPDATE temporal.heatmap_grid_helper SET already_processed = True WHERE cid = :cid;"),
+                    {"cid": kmeans_class},
+                )
 
-            print(
-                "#################################################################################################################"
-            )
-            print(
-                f"INFO: You computed [bold magenta]{cnt}[/bold magenta] out of [bold magenta]{cnt_sections}[/bold magenta] added."
-            )
-            print(
-                f"INFO: Section contains [bold magenta]{len(starting_points)}[/bold magenta] starting points"
-            )
-            print(
-                f"INFO: This section took [bold magenta]{(datetime.now() - starting_time_section).total_seconds()} s[/bold magenta]. For reading the network [bold magenta]{reading_time_network} s[/bold magenta] and for computing the catchments [bold magenta]{calculation_time_catchment} s[/bold magenta]."
-            )
-            print(
-                "#################################################################################################################"
-            )
+        await run_in_threadpool(write_cluster)
 
         print(
-            f"It took [bold magenta]{(datetime.now() - before).total_seconds() / 60} minutes[/bold magenta] to compute the isochrones."
+            "#################################################################################################################"
         )
+        print(
+            f"INFO: Section [bold magenta]{kmeans_class}[/bold magenta] contains [bold magenta]{len(starting_points)}[/bold magenta] starting points"
+        )
+        print(
+            f"INFO: This section took [bold magenta]{(datetime.now() - starting_time_section).total_seconds()} s[/bold magenta]. For reading the network [bold magenta]{reading_time_network} s[/bold magenta] and for computing the catchments [bold magenta]{calculation_time_catchment} s[/bold magenta]."
+        )
+        print(
+            "#################################################################################################################"
+        )
+        return full_edge_ids
 
-    async def compute_connectivity_heatmap(
-        self, db, edges_network, dict_starting_ids, starting_ids, distance_limits
-    ):
-        # Compute isochrones for connectivity heatmap
-        isochrones_connectivity = isochrone_cpp(edges_network, starting_ids, distance_limits)
-
-        isochrones = {}
-        for isochrone_result in isochrones_connectivity.isochrone:
-            isochrones[isochrone_result.start_id] = {}
-            for step in sorted(isochrone_result.shape):
-                if len(isochrone_result.shape[step]) > 2:
-                    if list(isochrones[isochrone_result.start_id].keys()) == []:
-                        isochrones[isochrone_result.start_id][step] = {}
-                        isochrones[isochrone_result.start_id][step]["shape"] = GeoSeries(
-                            Polygon(isochrone_result.shape[step])
-                        )
-                    else:
-                        isochrones[isochrone_result.start_id][step] = {}
-                        isochrones[isochrone_result.start_id][step]["shape"] = GeoSeries(
-                            isochrones[isochrone_result.start_id][previous_step]["shape"].union(
-                                Polygon(isochrone_result.shape[step])
-                            )
-                        )
-                    previous_step = step
-
+    def compute_connectivity_heatmap(self, connection, result, dict_starting_ids):
+        # The engine returns the area of the cumulative isochrone of each step (cumulative=True)
         average_area_isochrones = []
-        for start_id, shapes in isochrones.items():
-            row_to_update = {}
-            for step in shapes:
-                isochrones[start_id][step]["area_isochrone"] = float(
-                    isochrones[start_id][step]["shape"].area
-                )
-            row_to_update["id"] = dict_starting_ids[start_id]
-            row_to_update["area_isochrone"] = sum(
-                isochrones[start_id][step]["area_isochrone"] for step in isochrones[start_id]
+        for isochrone_result in result.isochrone:
+            average_area_isochrones.append(
+                {
+                    "id": dict_starting_ids[isochrone_result.start_id],
+                    "area_isochrone": sum(isochrone_result.area.values()),
+                }
             )
-            average_area_isochrones.append(row_to_update)
 
-        pd.DataFrame(average_area_isochrones).to_sql(
+        copy_dataframe(
+            connection,
+            pd.DataFrame(average_area_isochrones, columns=["id", "area_isochrone"]),
             "size_isochrone_heatmap",
-            legacy_engine,
-            method=psql_insert_copy,
-            index=True,
-            if_exists="append",
             schema="temporal",
         )
 
         return {"msg": "Success"}
 
     async def finalize_connectivity_heatmap(self, db):
+        """Aggregate the isochrone sizes per grid cell and classify them into percentiles over the whole grid."""
+        # Cells of a previous build which are not reached anymore are reset
+        await db.execute(
+            text(
+                """
+            UPDATE basic.grid_visualization
+            SET area_isochrone = NULL, percentile_area_isochrone = NULL
+            WHERE area_isochrone IS NOT NULL OR percentile_area_isochrone IS NOT NULL;
+            """
+            )
+        )
         await db.execute(
             text(
                 """WITH grouped AS 
@@ -451,24 +876,39 @@ class CRUDHeatmap:
             )
         )
 
-        # Compute reached pois for the data upload id
-        await db.execute(
-            text(
+        # Compute reached pois for the data upload id. basic.reached_pois_heatmap reads the travel times
+        # from the database, with the other stores the reverse search is used.
+        if (
+            settings.HEATMAP_REACHED_POIS_SEARCH == "reverse"
+            or settings.HEATMAP_TRAVELTIME_STORE != "database"
+        ):
+            pois = await db.execute(
+                text(REVERSE_POIS_USER_SQL),
+                {
+                    "active_study_area_id": current_user.active_study_area_id,
+                    "data_upload_id": data_upload_id,
+                },
+            )
+            pois = pd.DataFrame(pois.fetchall(), columns=["poi_uid", "data_upload_id", "x", "y"])
+            await self.compute_reached_pois_reverse(db, current_user, pois)
+        else:
+            await db.execute(
+                text(
+                    """
+                SELECT r.* 
+                FROM basic.study_area s, 
+                LATERAL basic.reached_pois_heatmap(:table_name, s.geom, :user_id_input, :scenario_id_input, :data_upload_ids) r 
+                WHERE s.id = :active_study_area_id
                 """
-            SELECT r.* 
-            FROM basic.study_area s, 
-            LATERAL basic.reached_pois_heatmap(:table_name, s.geom, :user_id_input, :scenario_id_input, :data_upload_ids) r 
-            WHERE s.id = :active_study_area_id
-            """
-            ),
-            {
-                "active_study_area_id": current_user.active_study_area_id,
-                "table_name": "poi_user",
-                "user_id_input": current_user.id,
-                "scenario_id_input": 0,
-                "data_upload_ids": [data_upload_id],
-            },
-        )
+                ),
+                {
+                    "active_study_area_id": current_user.active_study_area_id,
+                    "table_name": "poi_user",
+                    "user_id_input": current_user.id,
+                    "scenario_id_input": 0,
+                    "data_upload_ids": [data_upload_id],
+                },
+            )
         await db.commit()
 
         scenario_ids = await db.execute(
@@ -513,6 +953,10 @@ class CRUDHeatmap:
     async def bulk_compute_reached_pois(
         self, db: AsyncSession, current_user: models.User
     ):
+        """
+        Compute the reached POIs of the default heatmap for all clusters of temporal.heatmap_grid_helper
+        and afterwards the nearest POI per category of the grid cells (compute_nearest_poi_heatmap).
+        """
         # Reset reached_pois_heatmap table
         await db.execute(text("TRUNCATE customer.reached_poi_heatmap;"))
         await db.execute(
@@ -534,30 +978,30 @@ class CRUDHeatmap:
         kmeans_classes = kmeans_classes.fetchall()
         kmeans_classes = [c[0] for c in kmeans_classes]
 
+        # Without stored travel times the reached POIs can only be computed with the reverse search
+        reverse_search = (
+            settings.HEATMAP_REACHED_POIS_SEARCH == "reverse"
+            or settings.HEATMAP_TRAVELTIME_STORE == "none"
+        )
+        matrix = None
+        if not reverse_search and settings.HEATMAP_TRAVELTIME_STORE == "file":
+            matrix = traveltime_store.load()
+
         cnt = 0
         cnt_sections = len(kmeans_classes)
         for kmeans_class in kmeans_classes:
             starting_time_section = datetime.now()
             cnt += 1
-            calculation_geom = await db.execute(
-                "SELECT ST_ASTEXT(ST_UNION(geom)) AS geom FROM temporal.heatmap_grid_helper WHERE cid = :cid",
-                {"cid": kmeans_class},
-            )
-            calculation_geom = calculation_geom.fetchall()[0][0]
-            await db.execute(
-                text(
-                    """SELECT basic.reached_pois_heatmap(
-                    :table_name, ST_SETSRID(ST_GEOMFROMTEXT(:calculation_geom), 4326), 
-                    :user_id_input, :scenario_id_input)"""
-                ),
-                {
-                    "table_name": "poi",
-                    "calculation_geom": calculation_geom,
-                    "user_id_input": current_user.id,
-                    "scenario_id_input": 0,
-                },
-            )
-            await db.commit()
+            if reverse_search:
+                pois = await db.execute(
+                    text(CLUSTER_POIS_SQL), {"cid": kmeans_class, "user_id": current_user.id}
+                )
+                pois = pd.DataFrame(pois.fetchall(), columns=["poi_uid", "data_upload_id", "x", "y"])
+                await self.compute_reached_pois_reverse(db, current_user, pois)
+                await db.commit()
+            else:
+                await self.compute_reached_pois_cluster(db, current_user, kmeans_class, matrix)
+                await db.commit()
 
             print(
                 "#################################################################################################################"
@@ -572,6 +1016,498 @@ class CRUDHeatmap:
                 "#################################################################################################################"
             )
 
+        await self.compute_nearest_poi_heatmap(db, current_user)
+
+    async def compute_reached_pois_cluster(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        kmeans_class: int,
+        matrix: Optional[TravelTimeMatrix] = None,
+    ):
+        """
+        Compute the reached grid cells of the POIs around a cluster from the stored travel times of
+        the fully reached edges (see basic.reached_pois_heatmap).
+
+        The reached edges around the cluster are loaded once and all POIs are snapped to them in one
+        pass with an STRtree. With HEATMAP_TRAVELTIME_STORE=database the snapped POIs are bulk loaded
+        into pois_edges_full and the travel times are aggregated by basic.reached_pois_heatmap_costs in
+        the same transaction. With HEATMAP_TRAVELTIME_STORE=file the travel times are looked up in the
+        matrix of the file store, which is opened if it is not passed.
+        """
+        if settings.HEATMAP_TRAVELTIME_STORE == "none":
+            raise ValueError(
+                "The reached POIs need the stored travel times, use the reverse search with HEATMAP_TRAVELTIME_STORE=none."
+            )
+        if settings.HEATMAP_TRAVELTIME_STORE == "file" and matrix is None:
+            matrix = traveltime_store.load()
+
+        pois = await db.execute(
+            text(CLUSTER_POIS_SQL), {"cid": kmeans_class, "user_id": current_user.id}
+        )
+        pois = pd.DataFrame(pois.fetchall(), columns=["poi_uid", "data_upload_id", "x", "y"])
+        if len(pois) == 0:
+            return
+
+        reached_edges = await db.execute(text(CLUSTER_REACHED_EDGES_SQL), {"cid": kmeans_class})
+        reached_edges = reached_edges.fetchall()
+        edge_ids = np.array([e[0] for e in reached_edges], dtype=np.int64)
+        coordinates, offsets = decode_wkb_linestrings([e[1] for e in reached_edges])
+        edge_index, fractions = snap_points(
+            coordinates,
+            offsets,
+            *lonlat_to_3857(pois["x"].to_numpy(dtype=np.float64), pois["y"].to_numpy(dtype=np.float64)),
+            await self.read_snap_distance(db),
+        )
+        snapped = np.flatnonzero(edge_index >= 0)
+        if len(snapped) == 0:
+            return
+
+        if matrix is not None:
+            poi_index, grid_calculation_ids, costs = matrix.costs(
+                edge_ids[edge_index[snapped]], fractions[snapped]
+            )
+            grid_calculation = await db.execute(
+                text(
+                    """SELECT id, grid_visualization_id 
+                    FROM basic.grid_calculation 
+                    WHERE id = ANY(:grid_calculation_ids) 
+                    ORDER BY id;"""
+                ),
+                {"grid_calculation_ids": np.unique(grid_calculation_ids).tolist()},
+            )
+            grid_calculation = np.array(grid_calculation.fetchall(), dtype=np.int64).reshape(-1, 2)
+            poi_uids = pois["poi_uid"].to_numpy()[snapped].tolist()
+            records = [
+                (poi_uids[i], None, None, grid_ids, poi_costs, indices)
+                for i, grid_ids, poi_costs, indices in reached_poi_arrays(
+                    poi_index,
+                    grid_calculation[np.searchsorted(grid_calculation[:, 0], grid_calculation_ids), 1],
+                    costs,
+                    await self.read_sensitivities(db),
+                )
+            ]
+            await self.write_reached_pois(db, records)
+            return
+
+        # The temporary table is dropped at the end of the transaction
+        await db.execute(
+            text(
+                """CREATE TEMP TABLE pois_edges_full 
+                (poi_uid text, fraction float, edge_id integer, scenario_id integer, data_upload_id integer) 
+                ON COMMIT DROP;"""
+            )
+        )
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "pois_edges_full",
+            columns=["poi_uid", "fraction", "edge_id"],
+            records=zip(
+                pois["poi_uid"].to_numpy()[snapped].tolist(),
+                fractions[snapped].tolist(),
+                edge_ids[edge_index[snapped]].tolist(),
+            ),
+        )
+        await db.execute(text("SELECT basic.reached_pois_heatmap_costs();"))
+
+    async def write_reached_pois(
+        self, db: AsyncSession, records: List[tuple], table: str = "reached_poi_heatmap"
+    ):
+        """Bulk load rows of (poi_uid, scenario_id, data_upload_id, grid_visualization_ids, costs, accessibility_indices)."""
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table,
+            schema_name="customer",
+            columns=[
+                "poi_uid",
+                "scenario_id",
+                "data_upload_id",
+                "grid_visualization_ids",
+                "costs",
+                "accessibility_indices",
+            ],
+            records=records,
+        )
+
+    async def read_snap_distance(self, db: AsyncSession) -> int:
+        """Maximum distance in meters between a POI and the edge it is snapped to."""
+        snap_distance = await db.execute(
+            text("SELECT basic.select_customization('snap_distance_poi_heatmap')::integer;")
+        )
+        return snap_distance.scalar()
+
+    async def read_sensitivities(self, db: AsyncSession) -> List[int]:
+        """Sensitivities of the accessibility indices (heatmap_sensitivities customization)."""
+        sensitivities = await db.execute(
+            text(
+                """SELECT ARRAY_AGG(s.sensitivity::integer) 
+                FROM jsonb_array_elements_text(basic.select_customization('heatmap_sensitivities')) s(sensitivity)"""
+            )
+        )
+        return sensitivities.scalar() or []
+
+    async def read_starting_vertices(self, db: AsyncSession) -> Tuple[ndarray, ndarray]:
+        """Ids of the starting vertices of the heatmap build in ascending order and their grid visualization cell."""
+        starting_vertices = await db.execute(text(HEATMAP_STARTING_VERTICES_SQL))
+        starting_vertices = np.array(starting_vertices.fetchall(), dtype=np.int64).reshape(-1, 2)
+        return starting_vertices[:, 0], starting_vertices[:, 1]
+
+    async def compute_reached_pois_reverse(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        pois: pd.DataFrame,
+        threads: int = settings.HEATMAP_THREADS,
+    ):
+        """
+        Compute the reached grid cells of POIs with a search from each POI on the reversed heatmap
+        network and write them to customer.reached_poi_heatmap.
+
+        The costs of the starting vertices of the grid calculation cells are the travel times from the
+        cells to the POI, so the travel times of the grid cells are not needed. The POIs (poi_uid,
+        data_upload_id, x, y) are routed in batches which share one network and are snapped to its
+        nearest edge.
+        """
+        if len(pois) == 0:
+            return
+        starting_ids, grid_visualization_ids = await self.read_starting_vertices(db)
+        sensitivities = await self.read_sensitivities(db)
+        snap_distance = await self.read_snap_distance(db)
+
+        for start in range(0, len(pois), REVERSE_SEARCH_BATCH_SIZE):
+            batch = pois.iloc[start : start + REVERSE_SEARCH_BATCH_SIZE]
+            x = batch["x"].to_numpy(dtype=np.float64)
+            y = batch["y"].to_numpy(dtype=np.float64)
+            edges_network, _, distance_limits, _ = await self.read_heatmap_network(
+                db, current_user, x.tolist(), y.tolist()
+            )
+
+            edge_index, fractions = snap_points(
+                edges_network.coordinates, edges_network.offsets, *lonlat_to_3857(x, y), snap_distance
+            )
+            snapped = np.flatnonzero(edge_index >= 0)
+            costs = vertex_costs(
+                edges_network,
+                edges_network.id[edge_index[snapped]],
+                fractions[snapped],
+                starting_ids,
+                max(distance_limits),
+                threads=threads,
+                reverse=True,
+            )
+
+            poi_uids = batch["poi_uid"].tolist()
+            data_upload_ids = [None if pd.isna(d) else int(d) for d in batch["data_upload_id"]]
+            records = [
+                (poi_uids[i], None, data_upload_ids[i], grid_ids, poi_costs, indices)
+                for i, grid_ids, poi_costs, indices in reached_poi_arrays(
+                    snapped[costs.seed],
+                    grid_visualization_ids[np.searchsorted(starting_ids, costs.vertex)],
+                    costs.cost,
+                    sensitivities,
+                )
+            ]
+            await self.write_reached_pois(db, records)
+
+    async def compute_nearest_poi_heatmap(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        threads: int = settings.HEATMAP_THREADS,
+    ):
+        """
+        Compute the travel time and uid of the nearest POI per category for the grid calculation cells
+        of temporal.heatmap_grid_helper and write them to customer.nearest_poi_heatmap.
+
+        The POIs around a cluster are snapped once to its network. Per category one search seeded from
+        all its POIs on the reversed network labels each starting vertex with the travel time to its
+        nearest POI, so the grid cells are not routed one by one.
+        """
+        await db.execute(text("TRUNCATE customer.nearest_poi_heatmap;"))
+        await db.execute(text("ALTER SEQUENCE customer.nearest_poi_heatmap_id_seq RESTART WITH 1;"))
+        await db.commit()
+
+        snap_distance = await self.read_snap_distance(db)
+        kmeans_classes = await db.execute(
+            text("SELECT DISTINCT cid FROM temporal.heatmap_grid_helper ORDER BY cid;")
+        )
+        kmeans_classes = [c[0] for c in kmeans_classes.fetchall()]
+
+        cnt = 0
+        cnt_sections = len(kmeans_classes)
+        for kmeans_class in kmeans_classes:
+            starting_time_section = datetime.now()
+            cnt += 1
+            starting_points = await db.execute(
+                text(CLUSTER_STARTING_POINTS_SQL), {"cid": kmeans_class}
+            )
+            starting_points = pd.DataFrame(
+                starting_points.fetchall(),
+                columns=["starting_id", "grid_calculation_id", "grid_visualization_id", "x", "y"],
+            )
+            pois = await db.execute(
+                text(NEAREST_POIS_SQL),
+                {"cid": kmeans_class, "user_id": current_user.id, "max_distance": 20 * 60 * 1.333},
+            )
+            pois = pd.DataFrame(pois.fetchall(), columns=["poi_uid", "category", "x", "y"])
+            if len(starting_points) == 0 or len(pois) == 0:
+                continue
+
+            edges_network, _, distance_limits, _ = await self.read_heatmap_network(
+                db, current_user, starting_points["x"].tolist(), starting_points["y"].tolist()
+            )
+            edge_index, fractions = snap_points(
+                edges_network.coordinates,
+                edges_network.offsets,
+                *lonlat_to_3857(pois["x"].to_numpy(dtype=np.float64), pois["y"].to_numpy(dtype=np.float64)),
+                snap_distance,
+            )
+            pois = pois.assign(edge_index=edge_index, fraction=fractions)
+            pois = pois[pois["edge_index"] >= 0]
+
+            starting_ids = starting_points["starting_id"].to_numpy(dtype=np.int64)
+            grid_calculation_ids = starting_points["grid_calculation_id"].to_numpy(dtype=np.int64)
+            grid_visualization_ids = starting_points["grid_visualization_id"].to_numpy(dtype=np.int64)
+            records = []
+            for category, category_pois in pois.groupby("category"):
+                costs = vertex_costs(
+                    edges_network,
+                    edges_network.id[category_pois["edge_index"].to_numpy()],
+                    category_pois["fraction"].to_numpy(dtype=np.float64),
+                    starting_ids,
+                    max(distance_limits),
+                    threads=threads,
+                    multi_source=True,
+                    reverse=True,
+                )
+                if len(costs.vertex) == 0:
+                    continue
+                positions = np.searchsorted(starting_ids, costs.vertex)
+                records.append(
+                    (
+                        category,
+                        grid_calculation_ids[positions].tolist(),
+                        grid_visualization_ids[positions].tolist(),
+                        np.rint(costs.cost).astype(np.int64).tolist(),
+                        category_pois["poi_uid"].to_numpy()[costs.seed].tolist(),
+                    )
+                )
+
+            connection = await db.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                "nearest_poi_heatmap",
+                schema_name="customer",
+                columns=[
+                    "category",
+                    "grid_calculation_ids",
+                    "grid_visualization_ids",
+                    "costs",
+                    "poi_uids",
+                ],
+                records=records,
+            )
+            await db.commit()
+
+            print(
+                f"INFO: You computed [bold magenta]{cnt}[/bold magenta] out of [bold magenta]{cnt_sections}[/bold magenta] sections in [bold magenta]{(datetime.now() - starting_time_section).total_seconds()} s[/bold magenta]."
+            )
+
+    async def compute_scenario_heatmap(
+        self,
+        db: AsyncSession,
+        current_user: models.User,
+        scenario_id: int,
+        threads: int = settings.HEATMAP_THREADS,
+    ):
+        """
+        Recompute the reached POIs of the heatmap on the network of a scenario.
+
+        Only the grid cells whose catchment reaches an edge changed by the scenario are rerouted, they
+        are found with the reached edges of the default heatmap or, if the travel times are not stored,
+        by their distance to the changed edges. The reached POIs of these cells are
+        stored as delta of the scenario in customer.reached_poi_heatmap_scenario and replace the
+        default values of the cells in the scenario and comparison heatmaps.
+        """
+        start_time = datetime.now()
+
+        scenario_edges = await db.execute(text(SCENARIO_EDGES_SQL), {"scenario_id": scenario_id})
+        scenario_edges = scenario_edges.fetchall()
+        edge_ids = [r[0] for r in scenario_edges]
+        removed_edge_ids = [r[0] for r in scenario_edges if r[1]]
+
+        # Grid cells whose catchment reaches one of the changed edges
+        if settings.HEATMAP_TRAVELTIME_STORE == "file":
+            matrix = traveltime_store.load()
+            row_index, _ = matrix.rows(np.array(edge_ids, dtype=np.int64))
+            grid_calculation_ids = np.unique(matrix.columns["grid_calculation_id"][row_index]).tolist()
+        elif settings.HEATMAP_TRAVELTIME_STORE == "database":
+            grid_calculation_ids = await db.execute(
+                text(
+                    """SELECT DISTINCT grid_calculation_id 
+                    FROM customer.reached_edge_heatmap_grid_calculation 
+                    WHERE reached_edge_heatmap_id = ANY(:edge_ids);"""
+                ),
+                {"edge_ids": edge_ids},
+            )
+            grid_calculation_ids = [r[0] for r in grid_calculation_ids.fetchall()]
+        else:
+            # Without stored travel times all grid cells within the walking distance are rerouted
+            grid_calculation_ids = await db.execute(
+                text(SCENARIO_GRID_CALCULATION_SQL),
+                {"edge_ids": edge_ids, "max_distance": 20 * 60 * 1.333},
+            )
+            grid_calculation_ids = [r[0] for r in grid_calculation_ids.fetchall()]
+
+        # The values of a grid visualization cell are averaged over its grid calculation cells, so all
+        # of them are rerouted. The starting points are routed in the clusters of the default heatmap.
+        starting_points = await db.execute(
+            text(SCENARIO_STARTING_POINTS_SQL), {"grid_calculation_ids": grid_calculation_ids}
+        )
+        starting_points = pd.DataFrame(
+            starting_points.fetchall(),
+            columns=["starting_id", "grid_calculation_id", "grid_visualization_id", "cid", "x", "y"],
+        )
+        grid_visualization_ids = await db.execute(
+            text(
+                """SELECT COALESCE(ARRAY_AGG(DISTINCT grid_visualization_id), '{}') 
+                FROM basic.grid_calculation 
+                WHERE id = ANY(:grid_calculation_ids);"""
+            ),
+            {"grid_calculation_ids": grid_calculation_ids},
+        )
+        grid_visualization_ids = sorted(grid_visualization_ids.scalar())
+
+        edges_traveltime = []
+        for _, cluster in starting_points.groupby("cid"):
+            network = await self.read_heatmap_network(
+                db,
+                current_user,
+                cluster["x"].tolist(),
+                cluster["y"].tolist(),
+                CalculationTypes.scenario,
+                scenario_id,
+            )
+            result = isochrone_cpp(network[0], network[1], network[2], threads=threads, cumulative=True)
+            edges_traveltime.append(
+                reached_edges_traveltime(
+                    result.network,
+                    dict(zip(cluster["starting_id"], cluster["grid_calculation_id"])),
+                )
+            )
+        if edges_traveltime:
+            edges_traveltime = pd.concat(edges_traveltime, ignore_index=True)
+        else:
+            edges_traveltime = pd.DataFrame(columns=REACHED_EDGE_COLUMNS)
+        matrix = TravelTimeMatrix.from_dataframe(edges_traveltime)
+        full_edge_ids = np.unique(
+            edges_traveltime.loc[
+                edges_traveltime["edge_type"].isnull() | (edges_traveltime["edge_type"] == "a"),
+                "reached_edge_heatmap_id",
+            ].to_numpy()
+        )
+
+        # Fully reached edges which are not reached in the default heatmap are written for the scenario
+        await db.execute(
+            delete(models.ReachedEdgeFullHeatmap).where(
+                models.ReachedEdgeFullHeatmap.scenario_id == scenario_id
+            )
+        )
+        await db.execute(
+            text(
+                """INSERT INTO customer.reached_edge_full_heatmap(edge_id, geom, scenario_id)
+                SELECT n.id, n.geom, CAST(:scenario_id AS integer) 
+                FROM 
+                (
+                    SELECT e.id, e.geom 
+                    FROM basic.edge e 
+                    WHERE e.id = ANY(:edge_ids)
+                    AND (e.scenario_id IS NULL OR e.scenario_id = :scenario_id)
+                    UNION ALL 
+                    SELECT a.id, a.geom 
+                    FROM temporal.heatmap_edges_artificial a 
+                    WHERE a.id = ANY(:edge_ids)
+                ) n
+                WHERE NOT EXISTS 
+                (
+                    SELECT 1 
+                    FROM customer.reached_edge_full_heatmap f 
+                    WHERE f.edge_id = n.id 
+                    AND f.scenario_id IS NULL
+                );"""
+            ),
+            {"scenario_id": scenario_id, "edge_ids": full_edge_ids.tolist()},
+        )
+
+        pois_edges = await db.execute(
+            text(SCENARIO_POIS_EDGES_SQL),
+            {
+                "scenario_id": scenario_id,
+                "user_id": current_user.id,
+                "grid_calculation_ids": starting_points["grid_calculation_id"].unique().tolist(),
+                "max_distance": 20 * 60 * 1.333,
+                "removed_edge_ids": removed_edge_ids,
+                "reached_edge_ids": matrix.edge_ids.tolist(),
+            },
+        )
+        pois_edges = pd.DataFrame(
+            pois_edges.fetchall(), columns=["poi_uid", "data_upload_id", "edge_id", "fraction"]
+        )
+        sensitivities = await self.read_sensitivities(db)
+
+        # Travel times from the rerouted grid cells to the POIs
+        poi_index, grid_calculation_id, cost = matrix.costs(
+            pois_edges["edge_id"].to_numpy(dtype=np.int64),
+            pois_edges["fraction"].to_numpy(dtype=np.float64),
+        )
+        grid_calculation = starting_points.drop_duplicates("grid_calculation_id").set_index(
+            "grid_calculation_id"
+        )["grid_visualization_id"]
+        poi_uids = pois_edges["poi_uid"].tolist()
+        data_upload_ids = [None if pd.isna(d) else int(d) for d in pois_edges["data_upload_id"]]
+        records = [
+            (poi_uids[i], scenario_id, data_upload_ids[i], grid_ids, costs, indices)
+            for i, grid_ids, costs, indices in reached_poi_arrays(
+                poi_index,
+                grid_calculation.loc[grid_calculation_id].to_numpy(),
+                cost,
+                sensitivities,
+            )
+        ]
+
+        # Replace the delta of the scenario in one transaction
+        await db.execute(
+            delete(models.ReachedPoiHeatmapScenario).where(
+                models.ReachedPoiHeatmapScenario.scenario_id == scenario_id
+            )
+        )
+        await db.execute(
+            delete(models.HeatmapGridScenario).where(
+                models.HeatmapGridScenario.scenario_id == scenario_id
+            )
+        )
+        await self.write_reached_pois(db, records, table="reached_poi_heatmap_scenario")
+        db.add(
+            models.HeatmapGridScenario(
+                scenario_id=scenario_id,
+                grid_visualization_ids=grid_visualization_ids,
+                grid_calculation_ids=starting_points["grid_calculation_id"].unique().tolist(),
+            )
+        )
+        await db.execute(
+            update(models.Scenario)
+            .where(models.Scenario.id == scenario_id)
+            .values(routing_heatmap_computed=True)
+        )
+        await db.commit()
+        heatmap_tile_cache.invalidate(scenario_id)
+
+        print(
+            f"INFO: Recomputing [bold magenta]{len(grid_visualization_ids)}[/bold magenta] grid cells of scenario [bold magenta]{scenario_id}[/bold magenta] took [bold magenta]{(datetime.now() - start_time).total_seconds()} s[/bold magenta]."
+        )
+
     async def compute_population_heatmap(self, db: AsyncSession):
         start_time = datetime.now()
         await db.execute(
@@ -630,6 +1566,21 @@ class CRUDHeatmap:
 
 heatmap = CRUDHeatmap()
 
+
+def compute_traveltime_worker(kmeans_class: int, user_id: int, threads: int) -> Optional[ndarray]:
+    """Compute the heatmap of a cluster in a build process with its own database connections."""
+
+    async def compute_traveltime_cluster():
+        try:
+            async with async_session() as db:
+                return await heatmap.compute_traveltime_cluster(
+                    db, models.User(id=user_id), kmeans_class, threads
+                )
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(compute_traveltime_cluster())
+
 # def main():
 
 #     from src.db.session import async_session, sync_session
@@ -643,7 +1594,7 @@ heatmap = CRUDHeatmap()
 # asyncio.get_event_loop().run_until_complete(CRUDHeatmap().prepare_starting_points(db=db, current_user=test_user))
 # asyncio.get_event_loop().run_until_complete(CRUDHeatmap().clean_tables(db=db))
 # asyncio.get_event_loop().run_until_complete(
-#          CRUDHeatmap().compute_traveltime(db=db, db_sync=db_sync, current_user=test_user)
+#          CRUDHeatmap().compute_traveltime(db=db, current_user=test_user, processes=4, resume=False)
 # )
 # asyncio.get_event_loop().run_until_complete(
 #          CRUDHeatmap().finalize_connectivity_heatmap(db=db)
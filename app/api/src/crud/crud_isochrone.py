@@ -6,23 +6,33 @@ import uuid
 import json
 from typing import Any
 
+import numpy as np
 import pandas as pd
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
 from geojson import FeatureCollection
 from geopandas import GeoDataFrame, GeoSeries
 from geopandas.io.sql import read_postgis
-from pandas.io.sql import read_sql
 from pyproj import Transformer
-from shapely.geometry import MultiPolygon, Point, Polygon
+from shapely.geometry import Point
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.sql import text
-from shapely.ops import unary_union
+from starlette.concurrency import run_in_threadpool
+from src.core.config import settings
+from src.core.isochrone_cache import IsochroneCacheEntry, isochrone_cache
+from src.core.network_cache import (
+    RoutingNetwork,
+    fetch_network,
+    lonlat_to_3857,
+    network_cache,
+)
 from src.crud.base import CRUDBase
 from src.db import models
+from src.db.copy import copy_dataframe
 from src.db.session import legacy_engine
+from src.exts.cpp.bind import cumulative_polygons
 from src.exts.cpp.bind import isochrone as isochrone_cpp
-from src.resources.enums import IsochroneExportType
+from src.resources.enums import CalculationTypes, IsochroneExportType
 from src.schemas.isochrone import (
     IsochroneMulti,
     IsochroneSingle,
@@ -30,7 +40,6 @@ from src.schemas.isochrone import (
 )
 from src.crud.base import CRUDBase
 from src.utils import delete_dir
-from src.resources.enums import IsochroneTypes
 import xlsxwriter
 
 class CRUDIsochroneCalculation(
@@ -55,24 +64,36 @@ class CRUDIsochrone:
     async def read_network(self, db, calculation_type, obj_in, obj_in_data):
 
         if calculation_type == IsochroneTypeEnum.single:
-            sql_text = f"""SELECT id, source, target, cost, reverse_cost, coordinates_3857 as geom, length_3857 AS length, starting_ids, starting_geoms
-            FROM basic.fetch_network_routing(ARRAY[:x],ARRAY[:y], :max_cutoff, :speed, :modus, :scenario_id, :routing_profile)
-            """
+            fetch_function = "basic.fetch_network_routing"
         elif calculation_type == IsochroneTypeEnum.multi:
-            sql_text = f"""SELECT id, source, target, cost, reverse_cost, coordinates_3857 as geom, length_3857 AS length, starting_ids, starting_geoms
-            FROM basic.fetch_network_routing_multi(:x,:y, :max_cutoff, :speed, :modus, :scenario_id, :routing_profile)
-            """
+            fetch_function = "basic.fetch_network_routing_multi"
         elif calculation_type == IsochroneTypeEnum.heatmap:
-            sql_text = f"""SELECT id, source, target, cost, reverse_cost, coordinates_3857 as geom, length_3857 AS length, starting_ids, starting_geoms
-            FROM basic.fetch_network_routing_heatmap(:x,:y, :max_cutoff, :speed, :modus, :scenario_id, :routing_profile)
-            """
+            fetch_function = "basic.fetch_network_routing_heatmap"
         else:
             raise Exception("Unknown calculation type")
 
-        read_network_sql = text(sql_text)
+        edges_network = None
+        if (
+            settings.NETWORK_CACHE_ENABLED
+            and calculation_type != IsochroneTypeEnum.heatmap
+            and obj_in.modus == CalculationTypes.default.value
+            and obj_in.study_area_id is not None
+        ):
+            edges_network, starting_id, starting_geoms = await self.read_network_from_cache(
+                db, obj_in, obj_in_data
+            )
 
-        edges_network = read_sql(read_network_sql, legacy_engine, params=obj_in_data)
-        starting_id = edges_network.iloc[0].starting_ids
+        if edges_network is None:
+            edges_network = await fetch_network(
+                db,
+                f"""SELECT id, source, target, cost, reverse_cost, geom_3857 AS geom, length_3857 AS length, starting_ids, starting_geoms
+                FROM {fetch_function}($1::float[], $2::float[], $3::float, $4::float, $5::text, $6::integer, $7::text)
+                """,
+                *self.network_query_args(obj_in),
+            )
+            starting_id = edges_network["starting_ids"][0]
+            starting_geoms = edges_network["starting_geoms"][0]
+            edges_network = RoutingNetwork.from_columns(edges_network)
 
         # There was an issue when removing the first row (which only contains the starting point) from the edges. So it was kept.
         distance_limits = list(
@@ -84,7 +105,7 @@ class CRUDIsochrone:
         if calculation_type == IsochroneTypeEnum.single:
             starting_point_geom = str(
                 GeoDataFrame(
-                    {"geometry": Point(edges_network.iloc[-1:]["geom"].values[0][0])},
+                    {"geometry": Point(edges_network.coordinates[edges_network.offsets[-2]])},
                     crs="EPSG:3857",
                     index=[0],
                 )
@@ -93,115 +114,199 @@ class CRUDIsochrone:
                 .iloc[0]
             )
         else:
-            starting_point_geom = str(edges_network["starting_geoms"].iloc[0])
-
-        edges_network = edges_network.drop(["starting_ids", "starting_geoms"], axis=1)
+            starting_point_geom = str(starting_geoms)
 
         if calculation_type == IsochroneTypeEnum.single or calculation_type == IsochroneTypeEnum.multi:
-            obj_starting_point = models.IsochroneCalculation(
-                calculation_type=calculation_type,
-                user_id=obj_in.user_id,
-                scenario_id=None if obj_in.scenario_id == 0 else obj_in.scenario_id,
-                starting_point=starting_point_geom,
-                routing_profile=obj_in.routing_profile,
-                speed=obj_in.speed,
-                modus=obj_in.modus,
-                parent_id=None,
+            obj_starting_point = await self.create_isochrone_calculation(
+                db, calculation_type, obj_in, starting_point_geom
             )
-
-            db.add(obj_starting_point)
-            await db.commit()
-            await db.refresh(obj_starting_point)
         else:
             obj_starting_point = None # Heatmap
 
         return edges_network, starting_id, distance_limits, obj_starting_point
 
-    def result_to_gdf(self, result, starting_id, isochrone_type: IsochroneTypes = IsochroneTypes.single, add_to_db=True):
-        # Prepare if a single isochrone
-        if isochrone_type == IsochroneTypes.single:
-            isochrones = {}
-            for isochrone_result in result.isochrone:
-                for step in sorted(isochrone_result.shape):
-                    if list(isochrones.keys()) == []:
-                        isochrones[step] = GeoSeries(Polygon(isochrone_result.shape[step]))
-                    else:
-                        isochrones[step] = GeoSeries(
-                            isochrones[previous_step].union(Polygon(isochrone_result.shape[step]))
-                        )
-                    previous_step = step
-
-            for step in isochrones:
-                isochrones[step] = isochrones[step].unary_union
-                
-        #Prepare if a Multi-Isochrone
-        elif isochrone_type == IsochroneTypes.multi:
-            isochrones = {}
-            steps = sorted(result.isochrone[0].shape.keys())
-
-            for isochrone_result in result.isochrone:
-                for step in steps:
-                    iso = isochrone_result.shape.get(step)
-                    if iso is not None and len(iso) >= 3:
-                        if step not in isochrones:
-                            isochrones[step] = [Polygon(isochrone_result.shape[step])]
-                        else:
-                            isochrones[step].append(Polygon(isochrone_result.shape[step]))
-
-            union_isochrones = {}
-            for step in isochrones:
-                if list(union_isochrones.keys()) == []:
-                    union_isochrones[step] = unary_union(isochrones[step])
-                else:
-                    union_isochrones[step] = unary_union([unary_union(isochrones[step]), union_isochrones[previous_step]])
-                previous_step = step 
-
-            isochrones = union_isochrones
-
-        isochrones_multipolygon = {}
-        for step in isochrones.keys():
-            if isochrones[step].type == "Polygon":
-                isochrones_multipolygon[step] = MultiPolygon([isochrones[step]])
-            elif isochrones[step].type == "MultiPolygon":
-                isochrones_multipolygon[step] = MultiPolygon(isochrones[step])
-            else:
-                raise Exception("Not correct geom type")
+    async def create_isochrone_calculation(self, db, calculation_type, obj_in, starting_point_geom):
+        obj_starting_point = models.IsochroneCalculation(
+            calculation_type=calculation_type,
+            user_id=obj_in.user_id,
+            scenario_id=None if obj_in.scenario_id == 0 else obj_in.scenario_id,
+            starting_point=starting_point_geom,
+            routing_profile=obj_in.routing_profile,
+            speed=obj_in.speed,
+            modus=obj_in.modus,
+            parent_id=None,
+        )
+
+        db.add(obj_starting_point)
+        await db.commit()
+        await db.refresh(obj_starting_point)
+        return obj_starting_point
+
+    @staticmethod
+    def network_query_args(obj_in) -> tuple:
+        """Arguments (x, y, max_cutoff, speed, modus, scenario_id, routing_profile) of the network queries."""
+        x = obj_in.x if isinstance(obj_in.x, list) else [obj_in.x]
+        y = obj_in.y if isinstance(obj_in.y, list) else [obj_in.y]
+        return (
+            [float(i) for i in x],
+            [float(i) for i in y],
+            float(obj_in.max_cutoff),
+            float(obj_in.speed),
+            obj_in.modus,
+            obj_in.scenario_id,
+            obj_in.routing_profile,
+        )
+
+    async def read_network_from_cache(self, db, obj_in, obj_in_data):
+        """Read the network from the network cache and splice in the artificial edges of the starting points.
+        Returns None for the network if the cached network does not cover the starting points."""
+        network = await network_cache.get(
+            db, obj_in.study_area_id, obj_in.routing_profile, obj_in.speed
+        )
+
+        # Bounding box of the network buffers around the starting points in EPSG:3857
+        x = np.atleast_1d(np.array(obj_in.x, dtype=np.float64))
+        y = np.atleast_1d(np.array(obj_in.y, dtype=np.float64))
+        x_3857, y_3857 = lonlat_to_3857(x, y)
+        radius = obj_in.max_cutoff * obj_in.speed / np.cos(np.radians(y))
+        if not network.covers(x_3857, y_3857, radius):
+            return None, None, None
+
+        artificial_edges = await fetch_network(
+            db,
+            """SELECT wid, id, source, target, cost, reverse_cost, geom_3857 AS geom, length_3857 AS length, starting_ids, starting_geoms
+            FROM basic.fetch_artificial_edges_routing($1::float[], $2::float[], $3::float, $4::float, $5::text, $6::integer, $7::text)
+            """,
+            *self.network_query_args(obj_in),
+        )
+        starting_id = artificial_edges["starting_ids"][0]
+        starting_geoms = artificial_edges["starting_geoms"][0]
+        # The first row only contains the starting points
+        replaced_edges = artificial_edges["wid"][1:]
+        artificial_edges = RoutingNetwork.from_columns(artificial_edges)
+        artificial_edges = artificial_edges.take(np.arange(1, len(artificial_edges)))
+
+        # Edges around the starting points without the edges that are replaced by artificial edges
+        indices = network.clip(
+            (x_3857 - radius).min(),
+            (y_3857 - radius).min(),
+            (x_3857 + radius).max(),
+            (y_3857 + radius).max(),
+        )
+        indices = indices[~np.isin(network.id[indices], replaced_edges)]
+        edges_network = network.take(indices).append(artificial_edges)
+        return edges_network, starting_id, starting_geoms
+
+    def result_to_gdf(self, result, starting_id):
+        # The engine returns the cumulative step polygons in EPSG:4326. For multi-isochrones there
+        # is one polygon per step and group of touching catchments, they are unioned per step.
+        steps, geometries = cumulative_polygons(result)
 
         isochrone_gdf = GeoDataFrame(
             {
-                "step": list(isochrones_multipolygon.keys()),
-                "geometry": GeoSeries(isochrones_multipolygon.values()).set_crs("EPSG:3857"),
-                "isochrone_calculation_id": [starting_id] * len(isochrones),
+                "step": steps,
+                "geometry": GeoSeries(geometries, crs="EPSG:4326"),
+                "isochrone_calculation_id": [starting_id] * len(steps),
             }
-        ).to_crs("EPSG:4326")
+        )
 
         isochrone_gdf.rename_geometry("geom", inplace=True)
-        
-        if add_to_db == True: 
-            isochrone_gdf.to_postgis(
-                name="isochrone_feature", con=legacy_engine, schema="customer", if_exists="append"
-            )
 
         return isochrone_gdf
 
+    async def save_isochrone_features(self, isochrone_gdf: GeoDataFrame):
+        """Write the isochrone features in a worker thread to not block the event loop."""
+
+        def copy_isochrone_features():
+            with legacy_engine.begin() as connection:
+                copy_dataframe(connection, isochrone_gdf, "isochrone_feature", schema="customer")
+
+        await run_in_threadpool(copy_isochrone_features)
+
     async def compute_isochrone(self, db: AsyncSession, *, obj_in, return_network=False):
         obj_in_data = jsonable_encoder(obj_in)
-        edges_network, starting_id, distance_limits, obj_starting_point = await self.read_network(
-            db, IsochroneTypeEnum.single.value, obj_in, obj_in_data
-        )
+
+        # Reuse the engine result of an identical request on the same network data
+        cache_key = None
+        cache_entry = None
+        opportunities_version = None
+        if settings.ISOCHRONE_CACHE_ENABLED:
+            data_version, opportunities_version = await isochrone_cache.data_version(
+                db, obj_in.modus
+            )
+            cache_key = isochrone_cache.key(obj_in, data_version)
+            cache_entry = isochrone_cache.get(cache_key)
+
+        if cache_entry is None:
+            edges_network, starting_id, distance_limits, obj_starting_point = await self.read_network(
+                db, IsochroneTypeEnum.single.value, obj_in, obj_in_data
+            )
+            result = isochrone_cpp(edges_network, starting_id, distance_limits, cumulative=True)
+            cache_entry = IsochroneCacheEntry(
+                result=result, starting_point=obj_starting_point.starting_point
+            )
+            if cache_key is not None:
+                isochrone_cache.put(cache_key, cache_entry)
+                # The reached network of a calculation is requested with the snapped starting point
+                x, y = cache_entry.starting_point.replace("POINT (", "").replace(")", "").split(" ")
+                isochrone_cache.put(
+                    isochrone_cache.key(obj_in, data_version, x=x, y=y), cache_entry
+                )
+        else:
+            obj_starting_point = await self.create_isochrone_calculation(
+                db, IsochroneTypeEnum.single.value, obj_in, cache_entry.starting_point
+            )
+            result = cache_entry.result
 
         obj_in_data["starting_point_id"] = obj_starting_point.id
 
         # Convert the isochrones result to a geodataframe and save isochrone_feature to postgis
-        result = isochrone_cpp(edges_network, starting_id, distance_limits)
         isochrone_gdf = self.result_to_gdf(result, obj_starting_point.id)
-
-        # Compute reached opportunities
-        sql = text(
-            """SELECT * FROM basic.thematic_data_sum(:user_id,:starting_point_id,:modus,:scenario_id,:active_upload_ids) ORDER BY isochrone_feature_step"""
+        await self.save_isochrone_features(isochrone_gdf)
+
+        # Compute reached opportunities. They only change with the active data uploads of the user and
+        # the opportunity data.
+        opportunities_key = (
+            obj_in.user_id,
+            tuple(sorted(obj_in.active_upload_ids or [])),
+            opportunities_version,
         )
-        result_opportunities = await db.execute(sql, obj_in_data)
-        result_opportunities = result_opportunities.all()
+        reached_opportunities = cache_entry.reached_opportunities.get(opportunities_key)
+        if reached_opportunities is None:
+            sql = text(
+                """SELECT * FROM basic.thematic_data_sum(:user_id,:starting_point_id,:modus,:scenario_id,:active_upload_ids) ORDER BY isochrone_feature_step"""
+            )
+            result_opportunities = await db.execute(sql, obj_in_data)
+            result_opportunities = result_opportunities.all()
+            # Reached opportunities of outdated opportunity data are not requested anymore
+            for key in [k for k in cache_entry.reached_opportunities if k[2] != opportunities_version]:
+                del cache_entry.reached_opportunities[key]
+            cache_entry.reached_opportunities[opportunities_key] = {
+                row[1]: row[2] for row in result_opportunities
+            }
+        else:
+            sql = text(
+                """UPDATE customer.isochrone_feature i
+                SET reached_opportunities = o.reached_opportunities::jsonb
+                FROM (
+                    SELECT UNNEST(CAST(:steps AS integer[])) AS step,
+                    UNNEST(CAST(:reached_opportunities AS text[])) AS reached_opportunities
+                ) o
+                WHERE i.isochrone_calculation_id = :starting_point_id
+                AND i.step = o.step
+                RETURNING i.id, i.step, i.reached_opportunities"""
+            )
+            result_opportunities = await db.execute(
+                sql,
+                {
+                    "starting_point_id": obj_starting_point.id,
+                    "steps": list(reached_opportunities.keys()),
+                    "reached_opportunities": [
+                        json.dumps(value) for value in reached_opportunities.values()
+                    ],
+                },
+            )
+            result_opportunities = result_opportunities.all()
         dict_opportunities = {}
         [dict_opportunities.update({row[1]: row[2]}) for row in result_opportunities]
         dict_ids = {}
@@ -218,23 +323,32 @@ class CRUDIsochrone:
         return_obj = {"isochrones": isochrone_gdf}
 
         if return_network == True:
-            features = []
+            network = result.network
             transformer = Transformer.from_crs(3857, 4326, always_xy=True)
-            for edge in result.network:
-                coords = []
-                for i in edge.shape:
-                    coords.append(transformer.transform(i[0], i[1]))
+            lon, lat = transformer.transform(network.coordinates[:, 0], network.coordinates[:, 1])
+            coordinates = np.column_stack((lon, lat)).tolist()
+            offsets = network.offsets.tolist()
+            edge_ids = network.edge.tolist()
+            start_costs = network.start_cost.tolist()
+            end_costs = network.end_cost.tolist()
+            start_percs = network.start_perc.tolist()
+            end_percs = network.end_perc.tolist()
+            features = []
+            for i in range(len(network)):
                 feature = {
-                    "geometry": {"type": "LineString", "coordinates": coords},
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": coordinates[offsets[i] : offsets[i + 1]],
+                    },
                     "type": "Feature",
                     "properties": {
-                        "edge_id": edge.edge,
+                        "edge_id": edge_ids[i],
                         "isochrone_calculation_id": obj_starting_point.id,
-                        "cost": max(edge.start_cost, edge.end_cost),
-                        "start_cost": edge.start_cost,
-                        "end_cost": edge.end_cost,
-                        "start_perc": edge.start_perc,
-                        "end_perc": edge.end_perc,
+                        "cost": max(start_costs[i], end_costs[i]),
+                        "start_cost": start_costs[i],
+                        "end_cost": end_costs[i],
+                        "start_perc": start_percs[i],
+                        "end_perc": end_percs[i],
                         "routing_profile": obj_in.routing_profile,
                         "scenario_id": obj_in.scenario_id,
                         "modus": obj_in.modus,
@@ -257,8 +371,11 @@ class CRUDIsochrone:
         )
         obj_in_data["starting_point_id"] = starting_id
 
-        result = isochrone_cpp(edges_network, starting_id, distance_limits)
-        isochrone_gdf = self.result_to_gdf(result, obj_starting_point.id, isochrone_type='multi')
+        result = isochrone_cpp(
+            edges_network, starting_id, distance_limits, multi_source=True, cumulative=True
+        )
+        isochrone_gdf = self.result_to_gdf(result, obj_starting_point.id)
+        await self.save_isochrone_features(isochrone_gdf)
 
         return isochrone_gdf
 
@@ -351,6 +468,7 @@ class CRUDIsochrone:
         obj_multi_isochrones = IsochroneMulti(
             user_id=obj_in.user_id,
             scenario_id=obj_in.scenario_id,
+            study_area_id=current_user.active_study_area_id,
             speed=speed,
             modus=obj_in.modus,
             n=obj_in.n,
@@ -426,7 +544,8 @@ class CRUDIsochrone:
             """
         )
 
-        gdf = read_postgis(
+        gdf = await run_in_threadpool(
+            read_postgis,
             sql,
             legacy_engine,
             geom_col="geom",
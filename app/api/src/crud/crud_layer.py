@@ -174,6 +174,72 @@ class CRUDLayer:
         feature = cursor.first()["st_asmvt"]
         return feature
 
+    async def tile_from_heatmap(
+        self,
+        db: AsyncSession,
+        tile: morecantile.Tile,
+        tms: morecantile.TileMatrixSet,
+        grid_visualization_ids: list,
+        values: list,
+        percentiles: list,
+        **kwargs: Any,
+    ) -> Any:
+        """Get Tile Data of a heatmap, the values are joined onto the grid cells of the tile."""
+        bbox = tms.xy_bounds(tile)
+        resolution = kwargs.get("resolution", str(settings.TILE_RESOLUTION))  # Tile's resolution
+        buffer = kwargs.get(
+            "buffer", str(settings.TILE_BUFFER)
+        )  # Size of extra data to add for a tile.
+
+        segSize = bbox.right - bbox.left
+        sql_query = f"""
+            WITH
+            bounds AS (
+                SELECT
+                    ST_Segmentize(
+                        ST_MakeEnvelope(
+                            :xmin,
+                            :ymin,
+                            :xmax,
+                            :ymax,
+                            {tms.crs.to_epsg()}
+                        ),
+                        :seg_size
+                    ) AS geom
+            ),
+            mvtgeom AS (
+                SELECT ST_AsMVTGeom(
+                    ST_Transform(g.geom, {tms.crs.to_epsg()}),
+                    bounds.geom,
+                    :tile_resolution,
+                    :tile_buffer
+                ) AS geom, h.grid_visualization_id, h.value, h.percentile
+                FROM UNNEST(
+                    CAST(:grid_visualization_ids AS bigint[]),
+                    CAST(:values AS float8[]),
+                    CAST(:percentiles AS integer[])
+                ) AS h(grid_visualization_id, value, percentile),
+                basic.grid_visualization g, bounds
+                WHERE g.id = h.grid_visualization_id
+            )
+            SELECT ST_AsMVT(mvtgeom.*) FROM mvtgeom
+        """
+        input_data = {
+            "xmin": bbox.left,
+            "ymin": bbox.bottom,
+            "xmax": bbox.right,
+            "ymax": bbox.top,
+            "seg_size": segSize,
+            "tile_resolution": int(resolution),
+            "tile_buffer": int(buffer),
+            "grid_visualization_ids": grid_visualization_ids,
+            "values": values,
+            "percentiles": percentiles,
+        }
+        cursor = await db.execute(text(sql_query), input_data)
+        feature = cursor.first()["st_asmvt"]
+        return feature
+
     async def tile_from_function(
         self,
         db: AsyncSession,
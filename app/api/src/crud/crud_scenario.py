@@ -9,9 +9,11 @@ from shapely import wkt
 from shapely.ops import transform
 from sqlalchemy import and_, func
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy.sql import delete, select
+from sqlalchemy.sql import delete, select, update
 
 from src import schemas
+from src.core.heatmap_tiles import heatmap_tile_cache
+from src.core.isochrone_cache import isochrone_cache
 from src.crud.base import CRUDBase
 from src.db import models
 
@@ -26,11 +28,28 @@ scenario_layer_models = {
     "poi_modified": models.PoiModified,
 }
 
+# Layers whose features change the reached POIs of the heatmap computed on the scenario network
+heatmap_scenario_layers = [
+    schemas.ScenarioLayersNoPoisEnum.way_modified.value,
+    schemas.ScenarioLayersNoPoisEnum.poi_modified.value,
+]
+
 # TODO: Check if geometries are within study area
 # TODO: Check geometry CRS
 
 
 class CRUDScenario(CRUDBase[models.Scenario, schemas.ScenarioCreate, schemas.ScenarioUpdate]):
+    async def reset_routing_heatmap(self, db: AsyncSession, scenario_id: int, layer_name: str):
+        """Mark the heatmap of the scenario network as outdated if the layer changes it."""
+        if layer_name not in heatmap_scenario_layers:
+            return
+        await db.execute(
+            update(models.Scenario)
+            .where(models.Scenario.id == scenario_id)
+            .values(routing_heatmap_computed=False)
+        )
+        await db.commit()
+
     async def read_scenario_features(
         self,
         db: AsyncSession,
@@ -101,6 +120,9 @@ class CRUDScenario(CRUDBase[models.Scenario, schemas.ScenarioCreate, schemas.Sce
         layer = scenario_layer_models[layer_name.value]
         await db.execute(delete(layer).where(layer.scenario_id == scenario_id))
         await db.commit()
+        await self.reset_routing_heatmap(db, scenario_id, layer_name.value)
+        isochrone_cache.invalidate(scenario_id)
+        heatmap_tile_cache.invalidate(scenario_id)
         return {"msg": "Features deleted successfully"}
 
     async def delete_scenario_feature(
@@ -122,6 +144,9 @@ class CRUDScenario(CRUDBase[models.Scenario, schemas.ScenarioCreate, schemas.Sce
                 func.basic.population_modification(scenario_id)
             )
             await db.commit()
+        await self.reset_routing_heatmap(db, scenario_id, layer_name.value)
+        isochrone_cache.invalidate(scenario_id)
+        heatmap_tile_cache.invalidate(scenario_id)
         return {"msg": "Features deleted successfully"}
 
     async def create_scenario_features(
@@ -204,6 +229,9 @@ class CRUDScenario(CRUDBase[models.Scenario, schemas.ScenarioCreate, schemas.Sce
             )
             await db.commit()
 
+        await self.reset_routing_heatmap(db, scenario_id, layer_name.value)
+        isochrone_cache.invalidate(scenario_id)
+        heatmap_tile_cache.invalidate(scenario_id)
         for feature in features_in_db:
             await db.refresh(feature)
         return features_in_db
@@ -273,6 +301,9 @@ class CRUDScenario(CRUDBase[models.Scenario, schemas.ScenarioCreate, schemas.Sce
             )
             await db.commit()
 
+        await self.reset_routing_heatmap(db, scenario_id, layer_name.value)
+        isochrone_cache.invalidate(scenario_id)
+        heatmap_tile_cache.invalidate(scenario_id)
         for feature in features_in_db:
             await db.refresh(feature)
         
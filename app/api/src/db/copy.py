@@ -0,0 +1,172 @@
+import io
+import json
+import math
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from geopandas import GeoSeries
+from shapely import wkb
+from sqlalchemy.sql import text
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + np.zeros(2, dtype=">i4").tobytes()
+COPY_TRAILER = np.array([-1], dtype=">i2").tobytes()
+
+# Binary representation of the fixed size column types
+FIXED_SIZE_TYPES = {
+    "int2": ">i2",
+    "int4": ">i4",
+    "int8": ">i8",
+    "float4": ">f4",
+    "float8": ">f8",
+    "bool": "?",
+}
+TEXT_TYPES = {"text", "varchar", "bpchar"}
+
+
+class CopyStream(io.RawIOBase):
+    """File-like object reading the chunks of a binary COPY as they are encoded."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while len(self._buffer) == 0:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def column_types(connection, table_name: str) -> dict:
+    """Names of the PostgreSQL types of the columns of a table."""
+    types = connection.execute(
+        text(
+            """SELECT a.attname, t.typname
+            FROM pg_attribute a, pg_type t
+            WHERE a.attrelid = CAST(:table_name AS regclass)
+            AND a.atttypid = t.oid
+            AND a.attnum > 0
+            AND NOT a.attisdropped"""
+        ),
+        {"table_name": table_name},
+    )
+    return dict(types.fetchall())
+
+
+def encode_json(value) -> Optional[bytes]:
+    """Json text of a value, None for NULL. Strings are sent as they are, other values are serialized."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return (value if isinstance(value, str) else json.dumps(value)).encode()
+
+
+def encode_values(series: pd.Series, type_name: str) -> List[Optional[bytes]]:
+    """Binary representation of the values of a column with a variable size type, None for NULL."""
+    if type_name == "geometry":
+        srid = series.crs.to_epsg() if isinstance(series, GeoSeries) and series.crs else None
+        return [None if g is None or g.is_empty else wkb.dumps(g, srid=srid) for g in series]
+    if type_name == "bytea":
+        return [None if pd.isna(v) else bytes(v) for v in series]
+    if type_name == "jsonb":
+        # jsonb is sent as version 1 followed by the json text
+        values = [encode_json(v) for v in series]
+        return [None if v is None else b"\x01" + v for v in values]
+    if type_name == "json":
+        return [encode_json(v) for v in series]
+    if type_name in TEXT_TYPES:
+        return [None if pd.isna(v) else str(v).encode() for v in series]
+    raise ValueError(f"Binary COPY of the type {type_name} is not supported.")
+
+
+def encode_chunk(df: pd.DataFrame, types: List[str]) -> bytes:
+    """
+    Encode the rows of a dataframe as tuples of a binary COPY.
+
+    Every tuple is the number of fields followed by the byte length (-1 for NULL) and the value of
+    each field. The tuples are written column by column into one buffer.
+    """
+    n = len(df)
+    fields = []
+    sizes = np.full(n, 2, dtype=np.int64)
+    for name, type_name in zip(df.columns, types):
+        series = df[name]
+        if type_name in FIXED_SIZE_TYPES:
+            dtype = np.dtype(FIXED_SIZE_TYPES[type_name])
+            null = series.isna().to_numpy()
+            values = series.to_numpy(dtype=dtype.newbyteorder("="), na_value=0).astype(dtype)
+            data = values.view(np.uint8).reshape(n, dtype.itemsize)[~null]
+            widths = np.where(null, 0, dtype.itemsize)
+        else:
+            values = encode_values(series, type_name)
+            null = np.fromiter((v is None for v in values), dtype=bool, count=n)
+            data = np.frombuffer(b"".join(v for v in values if v is not None), dtype=np.uint8)
+            widths = np.fromiter((len(v) if v is not None else 0 for v in values), dtype=np.int64, count=n)
+        fields.append((null, widths, data))
+        sizes += 4 + widths
+
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(sizes[:-1], out=starts[1:])
+    buffer = np.empty(int(sizes.sum()), dtype=np.uint8)
+    buffer[starts[:, None] + np.arange(2)] = np.frombuffer(
+        np.array([len(fields)], dtype=">i2").tobytes(), dtype=np.uint8
+    )
+    position = starts + 2
+    for null, widths, data in fields:
+        lengths = np.where(null, -1, widths).astype(">i4").view(np.uint8).reshape(n, 4)
+        buffer[position[:, None] + np.arange(4)] = lengths
+        position = position + 4
+        # Scatter the values of the non NULL fields to their positions
+        value_positions = np.repeat(position - np.cumsum(widths) + widths, widths) + np.arange(data.size)
+        buffer[value_positions] = data.ravel()
+        position = position + widths
+    return buffer.tobytes()
+
+
+def copy_dataframe(
+    connection,
+    df: pd.DataFrame,
+    table: str,
+    schema: Optional[str] = None,
+    chunksize: int = 100000,
+):
+    """
+    Bulk load a (Geo)DataFrame into an existing table with a binary COPY.
+
+    The rows are encoded in chunks while they are streamed to the database, so only one chunk is held
+    in memory besides the dataframe. Missing values (NaN, None, pd.NA of nullable Int64 columns) are
+    written as NULL. Geometries are sent as EWKB with the SRID of the GeoSeries.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection of the legacy (psycopg2) engine
+    df : Dataframe whose columns are named like the columns of the table
+    table : Name of the table
+    schema : Schema of the table
+    chunksize : Number of rows encoded at once
+    """
+    table_name = "{}.{}".format(schema, table) if schema else table
+    types = column_types(connection, table_name)
+    missing = [c for c in df.columns if c not in types]
+    if missing:
+        raise ValueError(f"Columns {missing} do not exist in {table_name}.")
+    column_type_names = [types[c] for c in df.columns]
+
+    def chunks() -> Iterator[bytes]:
+        yield COPY_HEADER
+        for start in range(0, len(df), chunksize):
+            yield encode_chunk(df.iloc[start : start + chunksize], column_type_names)
+        yield COPY_TRAILER
+
+    columns = ", ".join(['"{}"'.format(c) for c in df.columns])
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT BINARY)".format(table_name, columns)
+    with connection.connection.cursor() as cur:
+        cur.copy_expert(sql=sql, file=CopyStream(chunks()))
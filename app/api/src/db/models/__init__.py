@@ -4,12 +4,16 @@ from .aoi import Aoi, AoiBase, AoiModified, AoiUser
 from .building import Building, BuildingBase, BuildingModified
 from .customization import Customization, UserCustomization
 from .data_upload import DataUpload
+from .data_version import DataVersion
 from .edge import Edge, EdgeBase, WayModified
 from .grid import GridCalculation, GridVisualization
 from .heatmap import (
+    HeatmapGridScenario,
+    NearestPoiHeatmap,
     ReachedEdgeFullHeatmap,
     ReachedEdgeHeatmapGridCalculation,
     ReachedPoiHeatmap,
+    ReachedPoiHeatmapScenario,
 )
 from .isochrone import IsochroneCalculation, IsochroneFeature
 from .node import Node
@@ -0,0 +1,16 @@
+from sqlmodel import BigInteger, Column, Field, SQLModel, Text, text
+
+
+class DataVersion(SQLModel, table=True):
+    """
+    Version counter of a group of tables. The counters are bumped by triggers on the tables
+    (basic.trigger_data_version), so the in-process caches can check if their data is outdated.
+    """
+
+    __tablename__ = "data_version"
+    __table_args__ = {"schema": "basic"}
+
+    name: str = Field(sa_column=Column(Text, primary_key=True))
+    version: int = Field(
+        sa_column=Column(BigInteger, nullable=False, server_default=text("0"))
+    )
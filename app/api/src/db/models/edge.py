@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional
 
 from geoalchemy2 import Geometry
-from sqlalchemy import SmallInteger
+from sqlalchemy import Computed, LargeBinary, SmallInteger
 from sqlalchemy.orm import backref
 from sqlmodel import (
     JSON,
@@ -83,6 +83,12 @@ class Edge(EdgeBase, table=True):
     length_m: float = Field(sa_column=Column(Float(53), nullable=False))
     length_3857: float = Field(sa_column=Column(Float(53), nullable=False))
     coordinates_3857: Optional[dict] = Field(sa_column=Column(JSON, nullable=False))
+    # Geometry in EPSG:3857 as little endian WKB, the format the routing network is transferred in
+    geom_3857: Optional[bytes] = Field(
+        sa_column=Column(
+            LargeBinary, Computed("ST_AsBinary(ST_Transform(geom, 3857), 'NDR')", persisted=True)
+        )
+    )
     source: int = Field(index=True, nullable=False, foreign_key="basic.node.id")
     target: int = Field(index=True, nullable=False, foreign_key="basic.node.id")
     edge_id: Optional[int] = Field(index=True, default=None, foreign_key="basic.edge.id")
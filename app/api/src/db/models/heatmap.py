@@ -107,4 +107,82 @@ class ReachedPoiHeatmap(SQLModel, table=True):
     )
     accessibility_indices: list = Field(
         sa_column=Column(ARRAY(Integer()), nullable=False)
-    )
\ No newline at end of file
+    )
+
+class ReachedPoiHeatmapScenario(SQLModel, table=True):
+    """Reached POIs of the grid cells whose catchment is changed by the network of a scenario."""
+
+    __tablename__ = "reached_poi_heatmap_scenario"
+    __table_args__ = {"schema": "customer"}
+
+    id: Optional[int] = Field(sa_column=Column(Integer, primary_key=True, autoincrement=True))
+    costs: int = Field(
+        sa_column=Column(ARRAY(Integer()), nullable=False)
+    )
+    grid_visualization_ids: int = Field(
+        sa_column=Column(
+            ARRAY(BigInteger()),
+            nullable=False,
+        ),
+    )
+    poi_uid: str = Field(
+        sa_column=Column(Text, nullable=False), index=True
+    )
+    scenario_id: int = Field(
+        sa_column=Column(
+            Integer, ForeignKey("customer.scenario.id", ondelete="CASCADE"), nullable=False, index=True
+        ),
+    )
+    data_upload_id: Optional[int] = Field(
+        sa_column=Column(
+            Integer, ForeignKey("customer.data_upload.id", ondelete="CASCADE"), index=True
+        ),
+    )
+    accessibility_indices: list = Field(
+        sa_column=Column(ARRAY(Integer()), nullable=False)
+    )
+
+
+class HeatmapGridScenario(SQLModel, table=True):
+    """Grid cells of the heatmap which are recomputed on the network of a scenario."""
+
+    __tablename__ = "heatmap_grid_scenario"
+    __table_args__ = {"schema": "customer"}
+
+    id: Optional[int] = Field(sa_column=Column(Integer, primary_key=True, autoincrement=True))
+    scenario_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("customer.scenario.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+    )
+    grid_visualization_ids: list = Field(
+        sa_column=Column(ARRAY(BigInteger()), nullable=False)
+    )
+    grid_calculation_ids: list = Field(
+        sa_column=Column(ARRAY(BigInteger()), nullable=False)
+    )
+
+
+class NearestPoiHeatmap(SQLModel, table=True):
+    """Travel time and uid of the nearest POI of a category per grid calculation cell, one row per category and cluster."""
+
+    __tablename__ = "nearest_poi_heatmap"
+    __table_args__ = {"schema": "customer"}
+
+    id: Optional[int] = Field(sa_column=Column(Integer, primary_key=True, autoincrement=True))
+    category: str = Field(sa_column=Column(Text, nullable=False, index=True))
+    grid_calculation_ids: list = Field(
+        sa_column=Column(ARRAY(BigInteger()), nullable=False)
+    )
+    grid_visualization_ids: list = Field(
+        sa_column=Column(ARRAY(BigInteger()), nullable=False)
+    )
+    costs: list = Field(
+        sa_column=Column(ARRAY(Integer()), nullable=False)
+    )
+    poi_uids: list = Field(
+        sa_column=Column(ARRAY(Text()), nullable=False)
+    )
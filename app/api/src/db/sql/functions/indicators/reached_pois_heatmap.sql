@@ -46,6 +46,7 @@ BEGIN
 			SELECT ST_LineLocatePoint(e.geom,p.geom) fraction, e.edge_id
 			FROM customer.reached_edge_full_heatmap e 
 			WHERE e.geom && ST_Buffer(p.geom::geography, snap_distance)::geometry
+			AND e.scenario_id IS NULL
 			ORDER BY ST_CLOSESTPOINT(e.geom, p.geom) <-> p.geom 
 			LIMIT 1 
 		) AS f
@@ -68,6 +69,7 @@ BEGIN
 			SELECT ST_LineLocatePoint(e.geom,p.geom) fraction, e.edge_id
 			FROM customer.reached_edge_full_heatmap e 
 			WHERE e.geom && ST_Buffer(p.geom::geography, snap_distance)::geometry
+			AND e.scenario_id IS NULL
 			ORDER BY ST_CLOSESTPOINT(e.geom, p.geom) <-> p.geom 
 			LIMIT 1 
 		) AS f
@@ -88,6 +90,7 @@ BEGIN
 			SELECT ST_LineLocatePoint(e.geom,p.geom) fraction, e.edge_id
 			FROM customer.reached_edge_full_heatmap e 
 			WHERE e.geom && ST_Buffer(p.geom::geography, snap_distance)::geometry
+			AND e.scenario_id IS NULL
 			ORDER BY ST_CLOSESTPOINT(e.geom, p.geom) <-> p.geom 
 			LIMIT 1 
 		) AS f;
@@ -95,56 +98,7 @@ BEGIN
 		RAISE EXCEPTION 'Please specify a valid table name.';
 	END IF;
 	
-	CREATE INDEX ON pois_edges_full (edge_id);	
-	INSERT INTO customer.reached_poi_heatmap(poi_uid, scenario_id, data_upload_id, grid_visualization_ids, costs, accessibility_indices)
-	WITH pois_with_cost AS 
-	(
-		SELECT f.poi_uid, f.scenario_id, c.grid_visualization_id, c.COST, f.data_upload_id 
-		FROM pois_edges_full f
-		CROSS JOIN LATERAL 
-		(
-			SELECT e.grid_visualization_id, avg(e.cost) AS COST 
-			FROM 
-			(
-				SELECT c.grid_visualization_id,
-				CASE WHEN r.start_cost < r.end_cost THEN (r.start_cost + f.fraction * (r.end_cost-r.start_cost))
-				ELSE (r.end_cost + (1-f.fraction) * (r.start_cost - r.end_cost)) END AS COST
-				FROM customer.reached_edge_heatmap_grid_calculation r, basic.grid_calculation c 
-				WHERE f.edge_id = r.reached_edge_heatmap_id 
-				AND (r.edge_type IS NULL or r.edge_type = 'a')
-				AND r.grid_calculation_id = c.id
-				UNION ALL 
-				SELECT c.grid_visualization_id, CASE WHEN start_cost < end_cost THEN (start_cost + fraction * (end_cost-start_cost))
-				ELSE (end_cost + (1-fraction) * (start_cost - end_cost)) END AS COST
-				FROM customer.reached_edge_heatmap_grid_calculation r, basic.grid_calculation c 
-				WHERE f.edge_id = r.reached_edge_heatmap_id 
-				AND edge_type IN ('p', 'ap')
-				AND f.fraction BETWEEN least(r.start_perc,r.end_perc) AND greatest(r.start_perc,r.end_perc)		
-				AND r.grid_calculation_id = c.id
-			) e	
-			GROUP BY e.grid_visualization_id 
-		) AS c 
-	),
-	first_merge AS
-	(
-		SELECT poi_uid, scenario_id, data_upload_id, array_agg(grid_visualization_id) AS grid_visualization_ids , array_agg(cost) AS costs   
-		FROM pois_with_cost 
-		GROUP BY poi_uid, scenario_id, data_upload_id  
-	)
-	SELECT f.poi_uid, f.scenario_id::integer, f.data_upload_id::integer, f.grid_visualization_ids, f.costs, a.accessibility_indices
-	FROM first_merge f
-	CROSS JOIN LATERAL 
-	(
-		SELECT ARRAY_AGG(accessibility_indices) AS accessibility_indices 
-		FROM 
-		(
-			SELECT array_AGG((pow(exp(1.0)::real,(p.cost::real * p.cost::real) / -s.sensitivity) * (10000))::integer) AS accessibility_indices, s.sensitivity  
-			FROM (SELECT sensitivity::REAL FROM jsonb_array_elements(basic.select_customization('heatmap_sensitivities')) sensitivity) s, 
-			(SELECT UNNEST(f.costs) cost) p
-			GROUP BY sensitivity 
-			ORDER BY sensitivity 
-		) s
-	) AS a;
+	PERFORM basic.reached_pois_heatmap_costs();
 	
 END;
 $function$ LANGUAGE plpgsql
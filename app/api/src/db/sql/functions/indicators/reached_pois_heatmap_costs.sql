@@ -0,0 +1,63 @@
+CREATE OR REPLACE FUNCTION basic.reached_pois_heatmap_costs()
+RETURNS VOID
+AS $function$
+BEGIN 
+	
+	CREATE INDEX ON pois_edges_full (edge_id);	
+	INSERT INTO customer.reached_poi_heatmap(poi_uid, scenario_id, data_upload_id, grid_visualization_ids, costs, accessibility_indices)
+	WITH pois_with_cost AS 
+	(
+		SELECT f.poi_uid, f.scenario_id, c.grid_visualization_id, c.COST, f.data_upload_id 
+		FROM pois_edges_full f
+		CROSS JOIN LATERAL 
+		(
+			SELECT e.grid_visualization_id, avg(e.cost) AS COST 
+			FROM 
+			(
+				SELECT c.grid_visualization_id,
+				CASE WHEN r.start_cost < r.end_cost THEN (r.start_cost + f.fraction * (r.end_cost-r.start_cost))
+				ELSE (r.end_cost + (1-f.fraction) * (r.start_cost - r.end_cost)) END AS COST
+				FROM customer.reached_edge_heatmap_grid_calculation r, basic.grid_calculation c 
+				WHERE f.edge_id = r.reached_edge_heatmap_id 
+				AND (r.edge_type IS NULL or r.edge_type = 'a')
+				AND r.grid_calculation_id = c.id
+				UNION ALL 
+				/*The percentages are stored times 10000, the cost is interpolated between start_perc and end_perc*/
+				SELECT c.grid_visualization_id, r.start_cost + CASE WHEN r.end_perc = r.start_perc THEN 0 
+				ELSE (f.fraction * 10000 - r.start_perc) / (r.end_perc - r.start_perc) END * (r.end_cost - r.start_cost) AS COST
+				FROM customer.reached_edge_heatmap_grid_calculation r, basic.grid_calculation c 
+				WHERE f.edge_id = r.reached_edge_heatmap_id 
+				AND edge_type IN ('p', 'ap')
+				AND f.fraction * 10000 BETWEEN least(r.start_perc,r.end_perc) AND greatest(r.start_perc,r.end_perc)		
+				AND r.grid_calculation_id = c.id
+			) e	
+			GROUP BY e.grid_visualization_id 
+		) AS c 
+	),
+	first_merge AS
+	(
+		SELECT poi_uid, scenario_id, data_upload_id, array_agg(grid_visualization_id) AS grid_visualization_ids , array_agg(cost) AS costs   
+		FROM pois_with_cost 
+		GROUP BY poi_uid, scenario_id, data_upload_id  
+	)
+	SELECT f.poi_uid, f.scenario_id::integer, f.data_upload_id::integer, f.grid_visualization_ids, f.costs, a.accessibility_indices
+	FROM first_merge f
+	CROSS JOIN LATERAL 
+	(
+		SELECT ARRAY_AGG(accessibility_indices) AS accessibility_indices 
+		FROM 
+		(
+			SELECT array_AGG((pow(exp(1.0)::real,(p.cost::real * p.cost::real) / -s.sensitivity) * (10000))::integer) AS accessibility_indices, s.sensitivity  
+			FROM (SELECT sensitivity::REAL FROM jsonb_array_elements(basic.select_customization('heatmap_sensitivities')) sensitivity) s, 
+			(SELECT UNNEST(f.costs) cost) p
+			GROUP BY sensitivity 
+			ORDER BY sensitivity 
+		) s
+	) AS a;
+	
+END;
+$function$ LANGUAGE plpgsql
+
+/*Travel times and accessibility indices of the POIs snapped to the fully reached edges (temp table pois_edges_full 
+with poi_uid, fraction, edge_id, scenario_id, data_upload_id) are aggregated per grid visualization cell 
+and written to customer.reached_poi_heatmap*/
@@ -0,0 +1,24 @@
+CREATE OR REPLACE FUNCTION basic.fetch_artificial_edges_routing(x float[], y float[], max_cutoff float, speed float, modus text, scenario_id integer, routing_profile text)
+ RETURNS TABLE(wid integer, id integer, SOURCE integer, target integer, length_3857 float, cost float, reverse_cost float, geom_3857 bytea, starting_ids integer[], starting_geoms text[])
+ LANGUAGE plpgsql
+AS $function$
+BEGIN 
+	
+	PERFORM basic.create_multiple_artificial_edges(x, y, max_cutoff, speed, modus, scenario_id, routing_profile);
+	
+	/*Fetch only the artificial edges, the rest of the network is served by the network cache*/
+	RETURN query 
+	SELECT NULL::integer, NULL::integer, NULL::integer, NULL::integer, NULL::float, NULL::float, NULL::float, NULL::bytea, 
+	(SELECT array_agg(s.id) FROM starting_vertices s), (SELECT array_agg(ST_ASTEXT(s.geom)) FROM starting_vertices s)
+	UNION ALL 
+	SELECT a.wid, a.id, a.SOURCE, a.target, ST_LENGTH(ST_TRANSFORM(a.geom, 3857)) AS length_3857, a.cost, a.reverse_cost, 
+	ST_AsBinary(ST_Transform(a.geom,3857), 'NDR'), NULL AS starting_ids, NULL AS starting_geoms
+	FROM final_artificial_edges a; 
+
+END;
+$function$;
+
+/*Fetches the artificial edges for the starting points together with the edges (wid) they are replacing 
+SELECT * 
+FROM basic.fetch_artificial_edges_routing(ARRAY[11.543274],ARRAY[48.195524], 1200., 1.33, 'default', 0, 'walking_standard')
+*/
@@ -0,0 +1,22 @@
+CREATE OR REPLACE FUNCTION basic.fetch_network_routing_study_area(study_area_id integer, buffer_distance float, speed float, routing_profile text)
+ RETURNS SETOF type_fetch_edges_routing
+ LANGUAGE plpgsql
+AS $function$
+DECLARE 
+	extent_network geometry;
+BEGIN 
+
+	SELECT ST_Envelope(ST_Buffer(s.geom::geography, buffer_distance)::geometry)
+	INTO extent_network
+	FROM basic.study_area s 
+	WHERE s.id = study_area_id; 
+
+	RETURN query EXECUTE basic.query_edges_routing(ST_ASTEXT(extent_network),'default',0,speed,routing_profile,True);
+
+END;
+$function$;
+
+/*Fetches the default routing network of the buffered extent of a study area. It is used to fill the in-process network cache.
+SELECT * 
+FROM basic.fetch_network_routing_study_area(91620000, 10000., 1.33, 'walking_standard')
+*/
@@ -15,7 +15,7 @@ DECLARE
 	sql_select_ways text;
 	sql_cost TEXT;
 	time_loss_intersections jsonb := '{}'::jsonb;
-	geom_column TEXT = 'geom';
+	sql_geom_column TEXT = 'geom';
 BEGIN 
 	IF modus_input = 'default' THEN 
 		scenario_id_input = 0;
@@ -65,13 +65,14 @@ BEGIN
 		OR wheelchair_classified = ''unclassified'')';
 	END IF;
 	
+	/*The routing network is transferred as little endian WKB in EPSG:3857, which is precomputed in basic.edge*/
 	IF coordinates_only = TRUE THEN
-		geom_column = 'coordinates_3857'; 
+		sql_geom_column = 'geom_3857'; 
 	END IF; 
 
 
 	sql_select_ways = 
-		'SELECT id::integer, source, target, length_3857,'||sql_cost||',death_end,'||quote_ident(geom_column)||', NULL AS starting_ids, NULL AS starting_geoms
+		'SELECT id::integer, source, target, length_3857,'||sql_cost||',death_end,'||sql_geom_column||', NULL AS starting_ids, NULL AS starting_geoms
 		FROM basic.edge
 		WHERE class_id NOT IN ('||excluded_class_id||')
     	AND ('||quote_ident(category)||' NOT IN ('||filter_categories||') 
@@ -0,0 +1,154 @@
+CREATE OR REPLACE FUNCTION basic.trigger_data_version() 
+RETURNS TRIGGER AS $trigger_data_version$
+BEGIN
+	INSERT INTO basic.data_version AS d (name, version)
+	VALUES (TG_ARGV[0], 1)
+	ON CONFLICT (name) DO UPDATE SET version = d.version + 1; 
+	RETURN NULL;
+END;
+$trigger_data_version$ LANGUAGE plpgsql;
+
+/*Only changes of the default data (scenario_id IS NULL) bump the version, the rows of the scenarios 
+are written to the same tables.*/
+CREATE OR REPLACE FUNCTION basic.trigger_data_version_default() 
+RETURNS TRIGGER AS $trigger_data_version_default$
+BEGIN
+	IF EXISTS (SELECT 1 FROM changed_rows WHERE scenario_id IS NULL) THEN 
+		INSERT INTO basic.data_version AS d (name, version)
+		VALUES (TG_ARGV[0], 1)
+		ON CONFLICT (name) DO UPDATE SET version = d.version + 1; 
+	END IF; 
+	RETURN NULL;
+END;
+$trigger_data_version_default$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_data_version_insert ON basic.edge; 
+CREATE TRIGGER trigger_data_version_insert AFTER INSERT ON basic.edge
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('network');
+
+DROP TRIGGER IF EXISTS trigger_data_version_update ON basic.edge; 
+CREATE TRIGGER trigger_data_version_update AFTER UPDATE ON basic.edge
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('network');
+
+DROP TRIGGER IF EXISTS trigger_data_version_delete ON basic.edge; 
+CREATE TRIGGER trigger_data_version_delete AFTER DELETE ON basic.edge
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('network');
+
+DROP TRIGGER IF EXISTS trigger_data_version_truncate ON basic.edge; 
+CREATE TRIGGER trigger_data_version_truncate AFTER TRUNCATE ON basic.edge
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('network');
+
+/*The scenario and opportunity tables bump the version of their group on every change:
+	scenario: customer.way_modified, customer.poi_modified, customer.building_modified, customer.population_modified, customer.aoi_modified
+	opportunities: basic.poi, customer.poi_user, basic.population, basic.aoi, customer.aoi_user, customer.data_upload, 
+		basic.opportunity_group, basic.opportunity_default_config, basic.opportunity_study_area_config, customer.opportunity_user_config
+*/
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.way_modified; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.way_modified
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.poi_modified; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.poi_modified
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.building_modified; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.building_modified
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.population_modified; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.population_modified
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.aoi_modified; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.aoi_modified
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.poi; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.poi
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.poi_user; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.poi_user
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.population; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.population
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.aoi; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.aoi
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.aoi_user; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.aoi_user
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.data_upload; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.data_upload
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.opportunity_group; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.opportunity_group
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.opportunity_default_config; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.opportunity_default_config
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.opportunity_study_area_config; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.opportunity_study_area_config
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.opportunity_user_config; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.opportunity_user_config
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('opportunities');
+
+/*Reached POIs of the default heatmap (scenario_id IS NULL)*/
+DROP TRIGGER IF EXISTS trigger_data_version_insert ON customer.reached_poi_heatmap; 
+CREATE TRIGGER trigger_data_version_insert AFTER INSERT ON customer.reached_poi_heatmap
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('reached_poi_heatmap');
+
+DROP TRIGGER IF EXISTS trigger_data_version_update ON customer.reached_poi_heatmap; 
+CREATE TRIGGER trigger_data_version_update AFTER UPDATE ON customer.reached_poi_heatmap
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('reached_poi_heatmap');
+
+DROP TRIGGER IF EXISTS trigger_data_version_delete ON customer.reached_poi_heatmap; 
+CREATE TRIGGER trigger_data_version_delete AFTER DELETE ON customer.reached_poi_heatmap
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version_default('reached_poi_heatmap');
+
+DROP TRIGGER IF EXISTS trigger_data_version_truncate ON customer.reached_poi_heatmap; 
+CREATE TRIGGER trigger_data_version_truncate AFTER TRUNCATE ON customer.reached_poi_heatmap
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('reached_poi_heatmap');
+
+/*Visualization grid*/
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.grid_visualization; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.grid_visualization
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('grid');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON basic.study_area_grid_visualization; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON basic.study_area_grid_visualization
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('grid');
+
+/*Heatmaps of the scenarios and nearest POIs*/
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.reached_poi_heatmap_scenario; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.reached_poi_heatmap_scenario
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('heatmap_scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.heatmap_grid_scenario; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.heatmap_grid_scenario
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('heatmap_scenario');
+
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.nearest_poi_heatmap; 
+CREATE TRIGGER trigger_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer.nearest_poi_heatmap
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('nearest_poi_heatmap');
+
+/*Resets of the heatmap of a scenario, other processes drop the delta of the scenario*/
+DROP TRIGGER IF EXISTS trigger_data_version ON customer.scenario; 
+CREATE TRIGGER trigger_data_version AFTER UPDATE OF routing_heatmap_computed OR DELETE ON customer.scenario
+FOR EACH STATEMENT EXECUTE PROCEDURE basic.trigger_data_version('scenario');
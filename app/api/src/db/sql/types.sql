@@ -8,7 +8,7 @@ CREATE TYPE type_fetch_edges_routing AS
 	cost float,
 	reverse_cost float,
 	death_end integer,
-	coordinates_3857 json,
+	geom_3857 bytea,
 	starting_ids integer[],
 	starting_geoms text[] 
 );
\ No newline at end of file
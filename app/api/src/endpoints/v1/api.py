@@ -43,3 +43,9 @@ layer_tiles = layers.VectorTilerFactory(
 )
 
 api_router.include_router(layer_tiles.router, prefix=layer_tiles_prefix, tags=["Layers"])
+
+# HEATMAP: Vector tile endpoints.
+heatmap_tiles_prefix = "/heatmap/tiles"
+heatmap_tiles = layers.HeatmapTilerFactory(router_prefix=heatmap_tiles_prefix)
+
+api_router.include_router(heatmap_tiles.router, prefix=heatmap_tiles_prefix, tags=["Heatmap"])
@@ -1,20 +1,30 @@
 import json
 from typing import Any, Optional, List
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy import text, func
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
 from src import crud, schemas
+from src.core.accessibility_heatmap import accessibility_heatmap
+from src.core.config import settings
+from src.core.heatmap_grid import heatmap_grid_cache
+from src.crud.crud_heatmap import (
+    ACCESSIBILITY_HEATMAP_SQL,
+    CONNECTIVITY_HEATMAP_SQL,
+    POPULATION_HEATMAP_SQL,
+)
 from src.db import models
 from src.db.models.config_validation import HeatmapConfiguration, check_dict_schema
 from src.endpoints import deps
 from src.resources.enums import (
     AccessibilityHeatmapTypes,
     CalculationTypes,
-    ReturnType,
+    HeatmapReturnType,
+    HeatmapTypes,
+    MimeTypes,
     SQLReturnTypes,
 )
 from src.schemas.heatmap import request_examples
@@ -23,32 +33,60 @@ from src.utils import return_geojson_or_geobuf
 router = APIRouter()
 
 
+def heatmap_values_response(grid_visualization_ids, values, percentiles) -> JSONResponse:
+    """
+    Values of a heatmap without geometry. The values are joined with the grid of the study area
+    (/heatmap/grid) by grid_visualization_id on the client.
+    """
+    return JSONResponse(
+        {
+            "grid_visualization_id": list(grid_visualization_ids),
+            "value": list(values),
+            "percentile": list(percentiles),
+        }
+    )
+
+
+@router.get("/grid")
+async def read_heatmap_grid(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+    if_none_match: Optional[str] = Header(default=None),
+) -> Any:
+    """
+    Retrieve the geometry of the heatmap grid of the active study area as geobuf.
+    The grid is cached and served with an ETag, so clients only download it when it changed.
+    """
+    grid = await heatmap_grid_cache.get(db, current_user.active_study_area_id)
+    headers = {"ETag": grid.etag, "Cache-Control": "no-cache"}
+    if if_none_match == grid.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(grid.geobuf, media_type=MimeTypes.geobuf.value, headers=headers)
+
+
 @router.get("/connectivity", response_class=JSONResponse)
 async def read_connectivity_heatmap(
     *,
     db: AsyncSession = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
-    return_type: ReturnType = Query(
-        description="Return type of the response", default=ReturnType.geojson
+    return_type: HeatmapReturnType = Query(
+        description="Return type of the response", default=HeatmapReturnType.geojson
     ),
 ) -> Any:
     """
     Retrieve the connectivity heatmap.
     """
 
+    if return_type == HeatmapReturnType.values:
+        return heatmap_values_response(
+            *await crud.heatmap.read_heatmap_values(db, current_user, HeatmapTypes.connectivity)
+        )
+
+    query = CONNECTIVITY_HEATMAP_SQL
+    query_params = {"active_study_area_id": current_user.active_study_area_id}
     template_sql = SQLReturnTypes[return_type.value].value
-    heatmap = await db.execute(
-        text(
-            template_sql
-            % """
-            SELECT g.id AS grid_visualization_id, g.percentile_area_isochrone, g.area_isochrone, 'default' AS modus, g.geom  
-            FROM basic.grid_visualization g, basic.study_area_grid_visualization s 
-            WHERE g.id = s.grid_visualization_id
-            AND s.study_area_id = :active_study_area_id
-            """
-        ),
-        {"active_study_area_id": current_user.active_study_area_id},
-    )
+    heatmap = await db.execute(text(template_sql % query), query_params)
     heatmap = heatmap.fetchall()[0][0]
     return return_geojson_or_geobuf(heatmap, return_type.value)
 
@@ -64,8 +102,8 @@ async def read_population_heatmap(
         default=0,
         example=1,
     ),
-    return_type: ReturnType = Query(
-        description="Return type of the response", default=ReturnType.geojson
+    return_type: HeatmapReturnType = Query(
+        description="Return type of the response", default=HeatmapReturnType.geojson
     ),
 ) -> Any:
     """
@@ -75,20 +113,21 @@ async def read_population_heatmap(
         db=db, current_user=current_user, scenario_id=scenario_id
     )
 
+    if return_type == HeatmapReturnType.values:
+        return heatmap_values_response(
+            *await crud.heatmap.read_heatmap_values(
+                db, current_user, HeatmapTypes.population, modus, scenario_id
+            )
+        )
+
+    query = POPULATION_HEATMAP_SQL
+    query_params = {
+        "active_study_area_id": current_user.active_study_area_id,
+        "modus": modus.value,
+        "scenario_id": scenario_id,
+    }
     template_sql = SQLReturnTypes[return_type.value].value
-    heatmap = await db.execute(
-        text(
-            template_sql
-            % """
-            SELECT * FROM basic.heatmap_population(:active_study_area_id, :modus, :scenario_id)
-            """
-        ),
-        {
-            "active_study_area_id": current_user.active_study_area_id,
-            "modus": modus.value,
-            "scenario_id": scenario_id,
-        },
-    )
+    heatmap = await db.execute(text(template_sql % query), query_params)
     heatmap = heatmap.fetchall()[0][0]
     return return_geojson_or_geobuf(heatmap, return_type.value)
 
@@ -110,12 +149,13 @@ async def read_local_accessibility_heatmap(
         description="The configuration per POI category to create the dynamic heatmap.",
         example=request_examples["heatmap_configuration"],
     ),
-    return_type: ReturnType = Query(
-        description="Return type of the response", default=ReturnType.geojson
+    return_type: HeatmapReturnType = Query(
+        description="Return type of the response", default=HeatmapReturnType.geojson
     ),
 ) -> Any:
     """
-    Retrieve the local accessibility heatmap.
+    Retrieve the local accessibility heatmap. The nearest POI heatmap only uses the categories
+    of the configuration.
     """
     scenario_id = await deps.check_user_owns_scenario(
         db=db, current_user=current_user, scenario_id=scenario_id
@@ -124,6 +164,19 @@ async def read_local_accessibility_heatmap(
     if check_dict_schema(HeatmapConfiguration, json.loads(heatmap_configuration)) == False:
         raise HTTPException(status_code=400, detail="Heatmap configuration is not valid.")
 
+    if return_type == HeatmapReturnType.values:
+        return heatmap_values_response(
+            *await crud.heatmap.read_heatmap_values(
+                db,
+                current_user,
+                HeatmapTypes.local_accessibility,
+                modus,
+                scenario_id,
+                heatmap_type,
+                heatmap_configuration,
+            )
+        )
+
     active_data_uploads_study_area = await db.execute(
             func.basic.active_data_uploads_study_area(current_user.id)
     )
@@ -131,26 +184,73 @@ async def read_local_accessibility_heatmap(
     if active_data_uploads_study_area == None:
         active_data_uploads_study_area = []
         
-    query_params = {
-        "heatmap_configuration": heatmap_configuration,
-        "user_id": current_user.id,
-        "active_study_area_id": current_user.active_study_area_id,
-        "modus": modus.value,
-        "scenario_id": scenario_id,
-        "data_upload_ids": active_data_uploads_study_area,
-    }
-    template_sql = SQLReturnTypes[return_type.value].value
+    if heatmap_type == AccessibilityHeatmapTypes.nearest_poi:
+        if modus != CalculationTypes.default:
+            raise HTTPException(
+                status_code=400,
+                detail="The nearest POI heatmap is only available for the default modus.",
+            )
+        values = await accessibility_heatmap.nearest_poi(db, list(json.loads(heatmap_configuration)))
+        query = """
+                SELECT g.id AS grid_visualization_id, COALESCE(h.percentile_nearest_poi, 0) AS percentile_nearest_poi,
+                h.nearest_poi_cost, h.nearest_poi_uid, CAST(:modus AS text) AS modus, g.geom
+                FROM basic.grid_visualization g, basic.study_area_grid_visualization s
+                LEFT JOIN UNNEST(CAST(:grid_visualization_ids AS bigint[]), CAST(:percentiles AS integer[]),
+                CAST(:costs AS integer[]), CAST(:poi_uids AS text[]))
+                AS h(grid_visualization_id, percentile_nearest_poi, nearest_poi_cost, nearest_poi_uid)
+                ON s.grid_visualization_id = h.grid_visualization_id
+                WHERE g.id = s.grid_visualization_id
+                AND s.study_area_id = :active_study_area_id
+                """
+        query_params = {
+            "modus": modus.value,
+            "active_study_area_id": current_user.active_study_area_id,
+            "grid_visualization_ids": values["grid_visualization_id"].tolist(),
+            "percentiles": values["percentile_nearest_poi"].tolist(),
+            "costs": values["nearest_poi_cost"].tolist(),
+            "poi_uids": values["nearest_poi_uid"].tolist(),
+        }
+    elif (
+        settings.HEATMAP_ACCESSIBILITY_ENGINE_ENABLED
+        and heatmap_type == AccessibilityHeatmapTypes.local_accessibility
+    ):
+        values = await accessibility_heatmap.compute(
+            db,
+            json.loads(heatmap_configuration),
+            current_user.id,
+            current_user.active_study_area_id,
+            modus.value,
+            scenario_id,
+            active_data_uploads_study_area,
+        )
+        # Only the values are computed in-process, the geometries of the grid are joined in the database
+        query = """
+                SELECT g.id AS grid_visualization_id, COALESCE(h.percentile_accessibility, 0) AS percentile_accessibility,
+                COALESCE(h.accessibility_index, 0)::bigint AS accessibility_index, CAST(:modus AS text) AS modus, g.geom
+                FROM basic.grid_visualization g
+                LEFT JOIN UNNEST(CAST(:grid_visualization_ids AS bigint[]), CAST(:percentiles AS integer[]), CAST(:accessibility_indices AS bigint[]))
+                AS h(grid_visualization_id, percentile_accessibility, accessibility_index)
+                ON g.id = h.grid_visualization_id
+                """
+        query_params = {
+            "modus": modus.value,
+            "grid_visualization_ids": values["grid_visualization_id"].tolist(),
+            "percentiles": values["percentile_accessibility"].tolist(),
+            "accessibility_indices": values["accessibility_index"].tolist(),
+        }
+    else:
+        query = ACCESSIBILITY_HEATMAP_SQL.format(heatmap_type=heatmap_type.value)
+        query_params = {
+            "heatmap_configuration": heatmap_configuration,
+            "user_id": current_user.id,
+            "active_study_area_id": current_user.active_study_area_id,
+            "modus": modus.value,
+            "scenario_id": scenario_id,
+            "data_upload_ids": active_data_uploads_study_area,
+        }
 
-    heatmap = await db.execute(
-        text(
-            template_sql
-            % f"""
-            SELECT * 
-            FROM basic.{heatmap_type.value}((:heatmap_configuration)::jsonb, :user_id, :active_study_area_id, :modus, :scenario_id, :data_upload_ids)
-            """
-        ),
-        query_params,
-    )
+    template_sql = SQLReturnTypes[return_type.value].value
+    heatmap = await db.execute(text(template_sql % query), query_params)
     heatmap = heatmap.fetchall()[0][0]
     return return_geojson_or_geobuf(heatmap, return_type.value)
 
@@ -172,3 +272,26 @@ async def compute_reached_pois_user(
     for data_upload_id in id:
         await crud.heatmap.compute_reached_pois_user(db, current_user, data_upload_id)
     return {"msg": "Successfully computed heatmap for uploaded pois."}
+
+
+@router.get("/compute/scenario", response_class=JSONResponse)
+async def compute_scenario_heatmap(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+    scenario_id: int = Query(
+        description="The scenario id to recompute the heatmap on the scenario network",
+        example=1,
+    ),
+) -> Any:
+    """
+    Recompute the heatmap on the network of a scenario. Only the grid cells whose catchment
+    reaches an edge changed by the scenario are rerouted.
+    """
+    scenario_id = await deps.check_user_owns_scenario(
+        db=db, current_user=current_user, scenario_id=scenario_id
+    )
+    if scenario_id == 0:
+        raise HTTPException(status_code=400, detail="Scenario not found")
+    await crud.heatmap.compute_scenario_heatmap(db, current_user, scenario_id)
+    return {"msg": "Successfully computed heatmap for the scenario."}
@@ -44,6 +44,7 @@ async def calculate_single_isochrone(
     )
     isochrone_in.active_upload_ids = current_user.active_data_upload_ids
     isochrone_in.user_id = current_user.id
+    isochrone_in.study_area_id = current_user.active_study_area_id
     isochrone = await crud.isochrone.calculate_single_isochrone(db=db, obj_in=isochrone_in)
     return json.loads(isochrone.to_json())
 
@@ -86,6 +87,7 @@ async def calculate_reached_network(
         x=x,
         y=y,
         user_id=current_user.id,
+        study_area_id=current_user.active_study_area_id,
         routing_profile=isochrone_calc_obj.routing_profile,
         active_upload_ids=current_user.active_data_upload_ids,
         scenario_id=isochrone_calc_obj.scenario_id,
@@ -114,6 +116,7 @@ async def calculate_multi_isochrone(
     )
     isochrone_in.active_upload_ids = current_user.active_data_upload_ids
     isochrone_in.user_id = current_user.id
+    isochrone_in.study_area_id = current_user.active_study_area_id
     isochrone = await crud.isochrone.calculate_multi_isochrones(db=db, obj_in=isochrone_in)
     return json.loads(isochrone.to_json())
 
@@ -156,6 +159,7 @@ async def poi_multi_isochrones(
     )
     isochrone_in.active_upload_ids = current_user.active_data_upload_ids
     isochrone_in.user_id = current_user.id
+    isochrone_in.study_area_id = current_user.active_study_area_id
     if isochrone_in.modus == CalculationTypes.default.value or isochrone_in.modus == CalculationTypes.scenario.value:
         gdf = await crud.isochrone.calculate_pois_multi_isochrones(db=db, current_user=current_user, obj_in=isochrone_in)
     elif isochrone_in.modus == CalculationTypes.comparison.value: 
@@ -21,6 +21,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import json
 import re
 from dataclasses import dataclass, field
 from enum import Enum
@@ -37,11 +38,20 @@ from starlette.routing import NoMatchFound
 from starlette.templating import Jinja2Templates
 
 from src.core.config import settings
+from src.core.heatmap_grid import heatmap_grid_cache
+from src.core.heatmap_tiles import heatmap_tile_cache, select_values
+from src.crud.crud_heatmap import heatmap as crud_heatmap
 from src.crud.crud_layer import layer as crud_layer
 from src.db import models
+from src.db.models.config_validation import HeatmapConfiguration, check_dict_schema
 from src.endpoints import deps
 from src.resources import tms as custom_tms
-from src.resources.enums import MimeTypes
+from src.resources.enums import (
+    AccessibilityHeatmapTypes,
+    CalculationTypes,
+    HeatmapTypes,
+    MimeTypes,
+)
 from src.schemas.layer import (
     TileMatrixSetList,
     VectorTileFunction,
@@ -410,3 +420,113 @@ class VectorTilerFactory:
                 context={"endpoint": tile_url, "request": request, "bounds": layer.bounds},
                 media_type="text/html",
             )
+
+
+@dataclass
+class HeatmapTilerFactory:
+    """
+    Vector tiles of the heatmaps.
+
+    The values of a heatmap are computed once per configuration, scenario and data version and
+    joined onto the cells of basic.grid_visualization per tile. Tiles are cached in-process.
+    """
+
+    # FastAPI router
+    router: APIRouter = field(default_factory=APIRouter)
+
+    # Enum of supported TMS
+    supported_tms: Type[TileMatrixSetNames] = TileMatrixSetNames
+    # TileMatrixSet dependency
+    tms_dependency: Callable[..., TileMatrixSet] = TileMatrixSetParams
+
+    # Router Prefix is needed to find the path for routes when prefixed
+    router_prefix: str = ""
+
+    def __post_init__(self):
+        """Post Init: register route and configure specific options."""
+        self.register_tiles()
+        self.router_prefix = settings.API_V1_STR + self.router_prefix
+
+    def register_tiles(self):
+        """Register /tiles endpoints."""
+
+        @self.router.get(r"/{heatmap}/{z}/{x}/{y}.pbf", **TILE_RESPONSE_PARAMS)
+        @self.router.get(r"/{TileMatrixSetId}/{heatmap}/{z}/{x}/{y}.pbf", **TILE_RESPONSE_PARAMS)
+        async def heatmap_tile(
+            *,
+            db: AsyncSession = Depends(deps.get_db),
+            tile: Tile = Depends(TileParams),
+            tms: TileMatrixSet = Depends(self.tms_dependency),
+            heatmap: HeatmapTypes = Path(..., description="Heatmap"),
+            modus: CalculationTypes = Query(default=CalculationTypes.default),
+            scenario_id: Optional[int] = Query(
+                description="The scenario id to calculate the heatmap in case the modus is 'scenario' or 'comparison'",
+                default=0,
+            ),
+            heatmap_type: AccessibilityHeatmapTypes = Query(
+                description="Type of the local accessibility heatmap",
+                default=AccessibilityHeatmapTypes.local_accessibility,
+            ),
+            heatmap_configuration: Optional[str] = Query(
+                description="The configuration per POI category of the local accessibility heatmap.",
+                default=None,
+            ),
+            current_user: models.User = Depends(deps.get_current_active_user),
+        ):
+            """Return heatmap vector tile."""
+            if heatmap == HeatmapTypes.local_accessibility:
+                if heatmap_configuration is None or not check_dict_schema(
+                    HeatmapConfiguration, json.loads(heatmap_configuration)
+                ):
+                    raise HTTPException(status_code=400, detail="Heatmap configuration is not valid.")
+            else:
+                heatmap_configuration = None
+            scenario_id = await deps.check_user_owns_scenario(
+                db=db, current_user=current_user, scenario_id=scenario_id
+            )
+
+            key = await heatmap_tile_cache.key(
+                db,
+                heatmap,
+                current_user.active_study_area_id,
+                current_user.id,
+                modus,
+                scenario_id,
+                heatmap_type.value,
+                heatmap_configuration,
+            )
+            tile_key = key + (tms.identifier, tile.z, tile.x, tile.y)
+            content = heatmap_tile_cache.get_tile(tile_key)
+            if content is None:
+                values = heatmap_tile_cache.get_values(key)
+                if values is None:
+                    values = await crud_heatmap.read_heatmap_values(
+                        db,
+                        current_user,
+                        heatmap,
+                        modus,
+                        scenario_id,
+                        heatmap_type,
+                        heatmap_configuration,
+                    )
+                    heatmap_tile_cache.put_values(key, values)
+
+                # Grid cells inside the tile and its buffer
+                grid = await heatmap_grid_cache.get(db, current_user.active_study_area_id)
+                bounds = tms.bounds(tile)
+                buffer = settings.TILE_BUFFER / settings.TILE_RESOLUTION
+                buffer_x = (bounds.right - bounds.left) * buffer
+                buffer_y = (bounds.top - bounds.bottom) * buffer
+                cells = grid.cells(
+                    bounds.left - buffer_x,
+                    bounds.bottom - buffer_y,
+                    bounds.right + buffer_x,
+                    bounds.top + buffer_y,
+                )
+                content = await crud_layer.tile_from_heatmap(
+                    db, tile, tms, *select_values(values, cells)
+                )
+                content = bytes(content or b"")
+                heatmap_tile_cache.put_tile(tile_key, content)
+
+            return Response(content, media_type=MimeTypes.pbf.value)
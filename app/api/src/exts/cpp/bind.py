@@ -1,6 +1,7 @@
 import cppimport
-from numpy import any, array, double, int32, int64
-from pandas.core.frame import DataFrame
+from numpy import any, array, ascontiguousarray, double, int32, int64
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.ops import unary_union
 
 isochrone_cpp = cppimport.imp("src.exts.cpp.src.isochrone")
 
@@ -8,56 +9,154 @@ import time
 
 
 def isochrone(
-    network: DataFrame, start_vertices: array, distance_limits: array, only_minimum_cover=True
+    network,
+    start_vertices: array,
+    distance_limits: array,
+    only_minimum_cover=True,
+    threads: int = 1,
+    multi_source: bool = False,
+    cumulative: bool = False,
 ) -> array:
     """
     Calculate the isochrone of a network.
 
     Parameters
     ----------
-    network : Pandas DataFrame
-        The network graph to be used.
+    network : RoutingNetwork
+        The network graph to be used. The edge geometries are passed as one flat
+        float64 coordinate buffer of shape (n, 2) and int64 offsets per edge.
     start_vertices : array(int64)
         The starting vertex.
     distance_limits : array(double)
         The distance limits.
     only_minimum_cover : bool (optional, default: True)
         If True, only the minimum cover is returned.
+    threads : int (optional, default: 1)
+        Number of threads the start vertices are spread over. 0 uses all cores. The
+        GIL is released during the computation.
+    multi_source : bool (optional, default: False)
+        If True, all start vertices are seeded in one search and the union of their
+        isochrones is returned as one shape per group of touching catchments and
+        distance limit.
+    cumulative : bool (optional, default: False)
+        If True, the isochrone shapes are returned as cumulative step polygons in
+        EPSG:4326 (closed exterior rings in the polygon attribute) instead of the
+        shapes per step in EPSG:3857.
 
     Returns
     -------
     isochrone_gdp : GeoDataFrame
         The isochrone paths.
     """
-    network.astype(
-        {
-            "id": int64,
-            "source": int64,
-            "target": int64,
-            "cost": double,
-            "reverse_cost": double,
-            "length": double,
-        }
-    )
     start_vertices = array(start_vertices).astype(int64)
     distance_limits = array(distance_limits).astype(double)
     isochroneclass = isochrone_cpp.Isochrone()
-    # TODO: Find a way to bypass the type conversion.
     result = isochroneclass.calculate(
-        network["id"],
-        network["source"],
-        network["target"],
-        network["cost"],
-        network["reverse_cost"],
-        network["length"],
-        network["geom"],
+        ascontiguousarray(network.id, dtype=int64),
+        ascontiguousarray(network.source, dtype=int64),
+        ascontiguousarray(network.target, dtype=int64),
+        ascontiguousarray(network.cost, dtype=double),
+        ascontiguousarray(network.reverse_cost, dtype=double),
+        ascontiguousarray(network.length, dtype=double),
+        ascontiguousarray(network.coordinates, dtype=double),
+        ascontiguousarray(network.offsets, dtype=int64),
         start_vertices,
         distance_limits,
         only_minimum_cover,
+        threads,
+        multi_source,
+        cumulative,
     )
 
     return result
 
 
-# 1. (self: src.exts.cpp.src.isochrone.Isochrone, arg0: numpy.ndarray[numpy.int64], arg1: numpy.ndarray[numpy.int64], arg2: numpy.ndarray[numpy.int64], arg3: numpy.ndarray[numpy.float64], arg4: numpy.ndarray[numpy.float64], arg5: numpy.ndarray[numpy.float64], arg6: List[List[List[float[2]]]], arg7: numpy.ndarray[numpy.int64],
-# arg8: numpy.ndarray[numpy.float64], arg9: bool) -> src.exts.cpp.src.isochrone.Result
+def cumulative_polygons(result):
+    """
+    Nested step polygons of an isochrone result computed with cumulative=True.
+
+    The engine builds the concave hull of every step independently, so a hull does not always
+    cover the hull of the previous step. The polygons of a step (one per group of touching
+    catchments) are unioned with each other and with the polygon of the previous step.
+
+    Returns
+    -------
+    steps : list
+        The steps in ascending order.
+    polygons : list(MultiPolygon)
+        The polygon of each step in EPSG:4326.
+    """
+    isochrones = {}
+    for isochrone_result in result.isochrone:
+        for step, polygon in isochrone_result.polygon.items():
+            if len(polygon) >= 4:
+                isochrones.setdefault(step, []).append(Polygon(polygon))
+    steps = sorted(isochrones)
+
+    polygons = []
+    for step in steps:
+        polygon = unary_union(isochrones[step] + polygons[-1:])
+        if isinstance(polygon, Polygon):
+            polygon = MultiPolygon([polygon])
+        polygons.append(polygon)
+    return steps, polygons
+
+
+def vertex_costs(
+    network,
+    seed_edges: array,
+    seed_fractions: array,
+    target_vertices: array,
+    max_cost: float,
+    threads: int = 1,
+    multi_source: bool = False,
+    reverse: bool = False,
+):
+    """
+    Calculate the travel costs between points on the edges of a network (seeds) and its vertices.
+
+    Parameters
+    ----------
+    network : RoutingNetwork
+        The network graph to be used, the edge geometries are not read.
+    seed_edges : array(int64)
+        Edge ids of the seeds. Seeds on edges which are not part of the network are skipped.
+    seed_fractions : array(double)
+        Position of the seeds on their edge as fraction of the edge length from the source.
+    target_vertices : array(int64)
+        The vertices whose costs are returned.
+    max_cost : double
+        The cost limit of the search.
+    threads : int (optional, default: 1)
+        Number of threads the seeds are spread over. 0 uses all cores. The GIL is released
+        during the computation.
+    multi_source : bool (optional, default: False)
+        If True, all seeds are searched at once and every reached target vertex is returned
+        once with the cost of its nearest seed.
+    reverse : bool (optional, default: False)
+        If True, the costs from the target vertices to the seeds are returned.
+
+    Returns
+    -------
+    vertex_costs : VertexCosts
+        The columns seed (index of the seed), vertex and cost of the reached target vertices.
+    """
+    isochroneclass = isochrone_cpp.Isochrone()
+    return isochroneclass.vertex_costs(
+        ascontiguousarray(network.id, dtype=int64),
+        ascontiguousarray(network.source, dtype=int64),
+        ascontiguousarray(network.target, dtype=int64),
+        ascontiguousarray(network.cost, dtype=double),
+        ascontiguousarray(network.reverse_cost, dtype=double),
+        ascontiguousarray(seed_edges, dtype=int64),
+        ascontiguousarray(seed_fractions, dtype=double),
+        ascontiguousarray(target_vertices, dtype=int64),
+        max_cost,
+        threads,
+        multi_source,
+        reverse,
+    )
+
+
+# 1. (self: src.exts.cpp.src.isochrone.Isochrone, arg0: numpy.ndarray[numpy.int64], arg1: numpy.ndarray[numpy.int64], arg2: numpy.ndarray[numpy.int64], arg3: numpy.ndarray[numpy.float64], arg4: numpy.ndarray[numpy.float64], arg5: numpy.ndarray[numpy.float64], arg6: numpy.ndarray[numpy.float64], arg7: numpy.ndarray[numpy.int64], arg8: numpy.ndarray[numpy.int64],
+# arg9: numpy.ndarray[numpy.float64], arg10: bool, arg11: int, arg12: bool, arg13: bool) -> src.exts.cpp.src.isochrone.Result
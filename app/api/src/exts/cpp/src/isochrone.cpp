@@ -31,12 +31,22 @@ Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #include <exception>
 #include "concaveman.h"
 #include <map>
+#include <queue>
+#include <functional>
+#include <atomic>
+#include <iterator>
+#include <mutex>
+#include <thread>
+#include <numeric>
+#include <tuple>
 
 
 #ifdef DEBUG
 #include <fstream>
 #include <regex>
 #include <iterator>
+#include <chrono>
+#include <random>
 #endif
 
 #ifndef DEBUG
@@ -50,6 +60,9 @@ namespace py = pybind11;
 // ***************************************** ISOCHRONE COMPUTATION *****************************************************
 // ---------------------------------------------------------------------------------------------------------------------
 
+// Radius of the web mercator (EPSG:3857) sphere
+const double EARTH_RADIUS = 6378137.0;
+
 typedef struct
 {
   int64_t id;
@@ -58,7 +71,9 @@ typedef struct
   double cost;
   double reverse_cost;
   double length;
-  std::vector<std::array<double, 2>> geometry;
+  // Index range [geom_start, geom_end) of the edge geometry in the shared coordinate buffer
+  int64_t geom_start;
+  int64_t geom_end;
 } Edge;
 
 typedef struct
@@ -69,75 +84,262 @@ typedef struct
   double end_perc;
   double start_cost;
   double end_cost;
-  std::vector<std::array<double, 2>> geometry;
 } IsochroneNetworkEdge;
 
+// Reached network stored column-wise. The geometry of edge i is
+// coordinates[offsets[i]:offsets[i + 1]]. The columns are exposed to Python as NumPy views.
+struct IsochroneNetwork
+{
+  std::vector<int64_t> start_id;
+  std::vector<int64_t> edge;
+  std::vector<double> start_perc;
+  std::vector<double> end_perc;
+  std::vector<double> start_cost;
+  std::vector<double> end_cost;
+  std::vector<std::array<double, 2>> coordinates;
+  std::vector<int64_t> offsets = {0};
+
+  size_t size() const
+  {
+    return edge.size();
+  }
+
+  void push_back(const IsochroneNetworkEdge &r, const std::array<double, 2> *geometry, size_t geometry_size)
+  {
+    start_id.push_back(r.start_id);
+    edge.push_back(r.edge);
+    start_perc.push_back(r.start_perc);
+    end_perc.push_back(r.end_perc);
+    start_cost.push_back(r.start_cost);
+    end_cost.push_back(r.end_cost);
+    coordinates.insert(coordinates.end(), geometry, geometry + geometry_size);
+    offsets.push_back(coordinates.size());
+  }
+
+  void reserve(size_t total_edges, size_t total_coordinates)
+  {
+    start_id.reserve(total_edges);
+    edge.reserve(total_edges);
+    start_perc.reserve(total_edges);
+    end_perc.reserve(total_edges);
+    start_cost.reserve(total_edges);
+    end_cost.reserve(total_edges);
+    offsets.reserve(total_edges + 1);
+    coordinates.reserve(total_coordinates);
+  }
+
+  void append(const IsochroneNetwork &other)
+  {
+    start_id.insert(start_id.end(), other.start_id.begin(), other.start_id.end());
+    edge.insert(edge.end(), other.edge.begin(), other.edge.end());
+    start_perc.insert(start_perc.end(), other.start_perc.begin(), other.start_perc.end());
+    end_perc.insert(end_perc.end(), other.end_perc.begin(), other.end_perc.end());
+    start_cost.insert(start_cost.end(), other.start_cost.begin(), other.start_cost.end());
+    end_cost.insert(end_cost.end(), other.end_cost.begin(), other.end_cost.end());
+    int64_t shift = coordinates.size();
+    for (size_t i = 1; i < other.offsets.size(); ++i)
+    {
+      offsets.push_back(other.offsets[i] + shift);
+    }
+    coordinates.insert(coordinates.end(), other.coordinates.begin(), other.coordinates.end());
+  }
+
+  void push_unmapped(int64_t start_v)
+  {
+    // -2 tags the unmapped starting vertex and won't use the reverse_mapping
+    // because mapping does not exist. -2 is changed to -1 later.
+    IsochroneNetworkEdge r;
+    r.start_id = start_v;
+    r.edge = -1;
+    r.start_perc = 0.0;
+    r.end_perc = 0.0;
+    r.start_cost = 0.0;
+    r.end_cost = 0.0;
+    const std::array<double, 2> geometry[2] = {{0, 0}, {0, 0}};
+    push_back(r, geometry, 2);
+  }
+};
+
 typedef struct
 {
   int64_t start_id;
   std::unordered_map<int32_t, std::vector<std::array<double, 2>>> shape; // steps, geometry
+  // steps, closed exterior ring of the cumulative step polygon in EPSG:4326
+  std::unordered_map<int32_t, std::vector<std::array<double, 2>>> polygon;
+  // steps, area of the cumulative step polygon in EPSG:3857 units
+  std::unordered_map<int32_t, double> area;
 } IsochroneStartPoint;
 
 typedef struct
 {
   std::vector<IsochroneStartPoint> isochrone;
-  std::vector<IsochroneNetworkEdge> network;
+  IsochroneNetwork network;
 } Result;
 
-// Adjacency list for the isochrone network (for each node, the edges that are connected to it)
-std::vector<std::vector<const Edge *>>
-construct_adjacency_list(size_t n, const Edge *edges,
-                         size_t total_edges)
+// Travel costs between points on edges (seeds) and vertices of the network. seed is the index of
+// the seed in the passed seeds, vertex the id of the reached vertex.
+struct VertexCosts
 {
-  std::vector<std::vector<const Edge *>> adj(n);
+  std::vector<int64_t> seed;
+  std::vector<int64_t> vertex;
+  std::vector<double> cost;
+
+  size_t size() const
+  {
+    return vertex.size();
+  }
+
+  void push_back(int64_t seed_index, int64_t vertex_id, double vertex_cost)
+  {
+    seed.push_back(seed_index);
+    vertex.push_back(vertex_id);
+    cost.push_back(vertex_cost);
+  }
+
+  void append(const VertexCosts &other)
+  {
+    seed.insert(seed.end(), other.seed.begin(), other.seed.end());
+    vertex.insert(vertex.end(), other.vertex.begin(), other.vertex.end());
+    cost.insert(cost.end(), other.cost.begin(), other.cost.end());
+  }
+};
+
+// Compressed sparse row (CSR) adjacency of the isochrone network. The outgoing arcs of node u are
+// stored at [offsets[u], offsets[u + 1]) in targets and costs. The indices of all edges touching
+// node u, independent of their direction, are stored at [incident_offsets[u], incident_offsets[u + 1])
+// in incident_edges.
+typedef struct
+{
+  std::vector<int64_t> offsets;
+  std::vector<int64_t> targets;
+  std::vector<double> costs;
+  std::vector<int64_t> incident_offsets;
+  std::vector<int64_t> incident_edges;
+} Graph;
+
+Graph construct_graph(size_t n, const Edge *edges, size_t total_edges)
+{
+  Graph graph;
+  // Count the outgoing arcs per node
+  graph.offsets.assign(n + 1, 0);
   for (size_t i = 0; i < total_edges; ++i)
   {
     if (edges[i].cost >= 0.)
     {
-      adj[edges[i].source].push_back(&edges[i]);
+      ++graph.offsets[edges[i].source + 1];
     }
     if (edges[i].reverse_cost >= 0.)
     {
-      adj[edges[i].target].push_back(&edges[i]);
+      ++graph.offsets[edges[i].target + 1];
     }
   }
-  return adj;
+  for (size_t i = 0; i < n; ++i)
+  {
+    graph.offsets[i + 1] += graph.offsets[i];
+  }
+  // Fill the arcs, keeping the order of the edges per node
+  graph.targets.resize(graph.offsets[n]);
+  graph.costs.resize(graph.offsets[n]);
+  std::vector<int64_t> position(graph.offsets.begin(), graph.offsets.end() - 1);
+  for (size_t i = 0; i < total_edges; ++i)
+  {
+    if (edges[i].cost >= 0.)
+    {
+      int64_t p = position[edges[i].source]++;
+      graph.targets[p] = edges[i].target;
+      graph.costs[p] = edges[i].cost;
+    }
+    if (edges[i].reverse_cost >= 0.)
+    {
+      int64_t p = position[edges[i].target]++;
+      graph.targets[p] = edges[i].source;
+      graph.costs[p] = edges[i].reverse_cost;
+    }
+  }
+  // Edges incident to each node, used to emit only the edges around the reached nodes
+  graph.incident_offsets.assign(n + 1, 0);
+  for (size_t i = 0; i < total_edges; ++i)
+  {
+    ++graph.incident_offsets[edges[i].source + 1];
+    if (edges[i].target != edges[i].source)
+    {
+      ++graph.incident_offsets[edges[i].target + 1];
+    }
+  }
+  for (size_t i = 0; i < n; ++i)
+  {
+    graph.incident_offsets[i + 1] += graph.incident_offsets[i];
+  }
+  graph.incident_edges.resize(graph.incident_offsets[n]);
+  position.assign(graph.incident_offsets.begin(), graph.incident_offsets.end() - 1);
+  for (size_t i = 0; i < total_edges; ++i)
+  {
+    graph.incident_edges[position[edges[i].source]++] = i;
+    if (edges[i].target != edges[i].source)
+    {
+      graph.incident_edges[position[edges[i].target]++] = i;
+    }
+  }
+  return graph;
 }
 
-// Dijkstra's algorithm one-to-all shortest path search
+// Dijkstra's algorithm one-to-all shortest path search. A binary heap with lazy deletion is used
+// as priority queue: instead of a decrease-key, the node is pushed again and outdated entries are
+// skipped when they are popped.
+// If reached is passed, the buffers are expected to be reset except for the nodes reached by the
+// previous search. Only these are reset and the nodes reached by this search are collected, so the
+// cost of a search does not depend on the size of the network.
 
 void dijkstra(int64_t start_vertex, double driving_distance,
-              const std::vector<std::vector<const Edge *>> &adj,
+              const Graph &graph,
               std::vector<int64_t> *predecessors,
-              std::vector<double> *distances)
+              std::vector<double> *distances,
+              std::vector<int64_t> *reached = nullptr)
 {
-  size_t n = adj.size();
-  distances->assign(n, std::numeric_limits<double>::infinity());
-  predecessors->assign(n, -1);
-  typedef std::tuple<double, int64_t> pq_el; // <agg_cost at node, node id>
-  std::set<pq_el> q;                         // priority queue
-  q.insert({0., start_vertex});
+  size_t n = graph.offsets.size() - 1;
+  if (reached == nullptr)
+  {
+    distances->assign(n, std::numeric_limits<double>::infinity());
+    predecessors->assign(n, -1);
+  }
+  else
+  {
+    for (int64_t node_id : *reached)
+    {
+      (*distances)[node_id] = std::numeric_limits<double>::infinity();
+      (*predecessors)[node_id] = -1;
+    }
+    reached->clear();
+  }
+  typedef std::pair<double, int64_t> pq_el; // <agg_cost at node, node id>
+  std::priority_queue<pq_el, std::vector<pq_el>, std::greater<pq_el>> q;
+  q.emplace(0., start_vertex);
   while (!q.empty())
   {
-    double dist;
-    int64_t node_id;
-    std::tie(dist, node_id) = *q.begin();
+    double dist = q.top().first;
+    int64_t node_id = q.top().second;
     if (dist >= driving_distance)
     {
       break;
     }
-    q.erase(q.begin());
-    for (auto &&e : adj[node_id])
+    q.pop();
+    if (dist > (*distances)[node_id])
     {
-      int64_t target = e->target == node_id ? e->source : e->target;
-      double cost = e->target == node_id ? e->reverse_cost : e->cost;
-      double agg_cost = dist + cost;
+      continue; // outdated entry
+    }
+    for (int64_t a = graph.offsets[node_id]; a < graph.offsets[node_id + 1]; ++a)
+    {
+      int64_t target = graph.targets[a];
+      double agg_cost = dist + graph.costs[a];
       if ((*distances)[target] > agg_cost)
       {
-        q.erase({(*distances)[target], target});
+        if (reached != nullptr && std::isinf((*distances)[target]))
+        {
+          reached->push_back(target);
+        }
         (*distances)[target] = agg_cost;
         (*predecessors)[target] = node_id;
-        q.emplace((*distances)[target], target);
+        q.emplace(agg_cost, target);
       }
     }
   }
@@ -253,7 +455,7 @@ ConvexhullResult convexhull(std::vector<std::array<double, 2>> &P)
 // LINE SUBSTRING ALGORITHM
 // ---------------------------------------------------------------------------------------------------------------------
 
-std::vector<std::array<double, 2>> line_substring(const double &start_perc, const double &end_perc, const std::vector<std::array<double, 2>> &geometry, const double &total_length)
+std::vector<std::array<double, 2>> line_substring(const double &start_perc, const double &end_perc, const std::array<double, 2> *geometry, const size_t &size, const double &total_length)
 {
   std::vector<std::array<double, 2>> line_substring;
   // Start percentage must be smaller than end percentage.
@@ -265,7 +467,6 @@ std::vector<std::array<double, 2>> line_substring(const double &start_perc, cons
   }
   double start_dist = start_perc_ * total_length;
   double end_dist = end_perc_ * total_length;
-  auto size = geometry.size();
 
   bool start_reached = false;
   double accumulated_dist = 0.;
@@ -341,9 +542,9 @@ void reverse_isochrone_path(IsochroneNetworkEdge &isochrone_path)
   std::swap(isochrone_path.start_cost, isochrone_path.end_cost);
 }
 
-void append_edge_result(const int64_t &start_v, const int64_t &edge_id, const double &cost_at_node, const double &edge_cost, const double &edge_length, const std::vector<std::array<double, 2>> &geometry,
+void append_edge_result(const int64_t &start_v, const int64_t &edge_id, const double &cost_at_node, const double &edge_cost, const double &edge_length, const std::array<double, 2> *geometry, const size_t &geometry_size,
                         const std::vector<double> &distance_limits,
-                        std::vector<IsochroneNetworkEdge> *isochrone_network, std::unordered_map<double, std::vector<std::array<double, 2>>> &coordinates, const bool &is_reverse)
+                        IsochroneNetwork *isochrone_network, std::unordered_map<double, std::vector<std::array<double, 2>>> &coordinates, const bool &is_reverse)
 {
   double current_cost = cost_at_node;
   double travel_cost = edge_cost;
@@ -367,13 +568,12 @@ void append_edge_result(const int64_t &start_v, const int64_t &edge_id, const do
       r.end_perc = 1.;
       r.start_cost = current_cost;
       r.end_cost = cost_at_target;
-      r.geometry = geometry;
       if (is_reverse)
       {
         reverse_isochrone_path(r);
       }
-      isochrone_network->push_back(r);
-      std::copy(r.geometry.begin(), r.geometry.end(), std::back_inserter(coordinates[dl]));
+      isochrone_network->push_back(r, geometry, geometry_size);
+      std::copy(geometry, geometry + geometry_size, std::back_inserter(coordinates[dl]));
       break;
     }
     // Partial Edge: (cost_at_target is bigger than the limit, partial edge)
@@ -389,239 +589,1043 @@ void append_edge_result(const int64_t &start_v, const int64_t &edge_id, const do
     {
       reverse_isochrone_path(r);
     }
-    r.geometry = line_substring(r.start_perc, r.end_perc, geometry, edge_length);
-    isochrone_network->push_back(r);
-    std::copy(r.geometry.begin(), r.geometry.end(), std::back_inserter(coordinates[dl]));
+    std::vector<std::array<double, 2>> partial_geometry = line_substring(r.start_perc, r.end_perc, geometry, geometry_size, edge_length);
+    isochrone_network->push_back(r, partial_geometry.data(), partial_geometry.size());
+    std::copy(partial_geometry.begin(), partial_geometry.end(), std::back_inserter(coordinates[dl]));
     // A ---------- B
     // 5    7    9  10
   }
 }
 
-Result compute_isochrone(Edge *data_edges, size_t total_edges,
-                         std::vector<int64_t> start_vertices,
-                         std::vector<double> distance_limits,
-                         bool only_minimum_cover)
+// Area of a closed ring (shoelace formula) in the units of the coordinates.
+double ring_area(const std::vector<std::array<double, 2>> &ring)
 {
-  Result result;
-  std::sort(distance_limits.begin(), distance_limits.end());
-  // Using max distance limit for a single dijkstra call. After that we will
-  // postprocess the results and mark the visited edges.
-  double max_dist_cutoff = *distance_limits.rbegin();
-  // Extracting vertices and mapping the ids from 0 to N-1. Remapping is done
-  // so that data structures used can be simpler (arrays instead of maps).
-  // modifying data_edges source/target fields.
-  std::unordered_map<int64_t, int64_t> mapping = remap_edges(data_edges, total_edges);
-
-  std::unordered_map<int64_t, int64_t> mapping_reversed;
+  double area = 0.;
+  for (size_t i = 1; i < ring.size(); ++i)
+  {
+    area += ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1];
+  }
+  return std::abs(area) / 2.;
+}
 
-  for (auto i=mapping.begin(); i!=mapping.end(); ++i)
-    mapping_reversed[i->second] = i->first;
+// Concave hull around the points (EPSG:3857) as closed ring in EPSG:4326. The area of the hull is
+// stored in EPSG:3857 units if requested.
+std::vector<std::array<double, 2>> polygon_wgs84(std::vector<std::array<double, 2>> &points,
+                                                 double *area = nullptr)
+{
+  ConvexhullResult hull = convexhull(points);
+  std::vector<std::array<double, 2>> ring = concaveman<double, 16>(points, hull.indices);
+  if (!ring.empty() && ring.front() != ring.back())
+  {
+    ring.push_back(ring.front());
+  }
+  if (area)
+  {
+    *area = ring_area(ring);
+  }
+  for (auto &p : ring)
+  {
+    p[0] = p[0] / EARTH_RADIUS * 180. / M_PI;
+    p[1] = (2. * std::atan(std::exp(p[1] / EARTH_RADIUS)) - M_PI / 2.) * 180. / M_PI;
+  }
+  return ring;
+}
 
-  // coordinates for the network edges for each distance limit to be used in constructing the isochrone shape
+// Per thread buffers which are reused for every start vertex processed by the thread. Only the
+// entries touched by a search are reset before the next one.
+struct StartVertexBuffers
+{
+  std::vector<double> distances;
+  std::vector<int64_t> predecessors;
+  std::vector<int64_t> reached;
+  std::vector<int64_t> reached_edges;
+  std::vector<bool> edge_visited;
   std::unordered_map<double, std::vector<std::array<double, 2>>> coordinates;
-  size_t nodes_count = mapping.size();
-  std::vector<IsochroneNetworkEdge> isochrone_network;
-  std::vector<IsochroneStartPoint> isochrone_start_point;
-  for (auto &dl : distance_limits)
+  std::vector<std::array<double, 2>> cumulative_points;
+
+  StartVertexBuffers(size_t nodes_count, size_t total_edges, const std::vector<double> &distance_limits)
+      : distances(nodes_count, std::numeric_limits<double>::infinity()), predecessors(nodes_count, -1),
+        edge_visited(total_edges, false)
   {
-    coordinates.emplace(dl, std::vector<std::array<double, 2>>());
+    for (auto &dl : distance_limits)
+    {
+      coordinates.emplace(dl, std::vector<std::array<double, 2>>());
+    }
+  }
+};
+
+// Isochrone network edges and shape of a single start vertex. Every thread works on its own
+// distance, predecessor and coordinate buffers, the network and the graph are only read.
+void compute_start_vertex(int64_t start_v, const Edge *data_edges, size_t total_edges,
+                          const std::array<double, 2> *coordinate_buffer, const Graph &graph,
+                          const std::unordered_map<int64_t, int64_t> &mapping,
+                          const std::vector<int64_t> &mapping_reversed,
+                          const std::vector<double> &distance_limits, bool only_minimum_cover,
+                          bool cumulative, StartVertexBuffers &buffers,
+                          IsochroneNetwork &isochrone_network,
+                          std::vector<IsochroneStartPoint> &isochrone_start_point)
+{
+  double max_dist_cutoff = *distance_limits.rbegin();
+  auto it = mapping.find(start_v);
+  // If start_v did not appear in edges then it has no particular mapping
+  if (it == mapping.end())
+  {
+    isochrone_network.push_unmapped(start_v);
+    return;
   }
-  auto adj =
-      construct_adjacency_list(mapping.size(), data_edges, total_edges);
-  // Storing the result of dijkstra call and reusing the memory for each vertex.
-  std::vector<double> distances(nodes_count);
-  std::vector<int64_t> predecessors(nodes_count);
-  for (int64_t start_v : start_vertices)
+  // Calling the dijkstra algorithm and storing the results in predecessors
+  // and distances.
+
+  std::vector<double> &distances = buffers.distances;
+  std::vector<int64_t> &predecessors = buffers.predecessors;
+  auto &coordinates = buffers.coordinates;
+  dijkstra(it->second,
+           /* driving_distance */ max_dist_cutoff, graph, &predecessors,
+           &distances, &buffers.reached);
+  // Collecting the edges incident to the reached nodes. They are sorted to append the results in
+  // the order of the network edges.
+  std::vector<int64_t> &reached_edges = buffers.reached_edges;
+  reached_edges.clear();
+  for (int64_t node_id : buffers.reached)
   {
-    auto it = mapping.find(start_v);
-    // If start_v did not appear in edges then it has no particular mapping
-    if (it == mapping.end())
+    for (int64_t a = graph.incident_offsets[node_id]; a < graph.incident_offsets[node_id + 1]; ++a)
+    {
+      int64_t edge_index = graph.incident_edges[a];
+      if (!buffers.edge_visited[edge_index])
+      {
+        buffers.edge_visited[edge_index] = true;
+        reached_edges.push_back(edge_index);
+      }
+    }
+  }
+  std::sort(reached_edges.begin(), reached_edges.end());
+  // Appending the row results.
+  for (int64_t edge_index : reached_edges)
+  {
+    buffers.edge_visited[edge_index] = false;
+    const Edge &e = *(data_edges + edge_index);
+    const std::array<double, 2> *geometry = coordinate_buffer + e.geom_start;
+    size_t geometry_size = e.geom_end - e.geom_start;
+    double scost = distances[e.source];
+    double tcost = distances[e.target];
+    bool s_reached = !(std::isinf(scost) || scost > max_dist_cutoff);
+    bool t_reached = !(std::isinf(tcost) || tcost > max_dist_cutoff);
+    if (!s_reached && !t_reached)
     {
-      IsochroneNetworkEdge r;
-      r.start_id = start_v;
-      // -2 tags the unmapped starting vertex and won't use the reverse_mapping
-      // because mapping does not exist. -2 is changed to -1 later.
-      r.edge = -1;
-      r.start_perc = 0.0;
-      r.end_perc = 0.0;
-      r.geometry = {{0, 0}, {0, 0}};
-      isochrone_network.push_back(r);
       continue;
     }
-    // Calling the dijkstra algorithm and storing the results in predecessors
-    // and distances.
+    bool skip_st = false;
+    bool skip_ts = false;
+    if (only_minimum_cover)
+    {
+      double st_dist = scost + e.cost;
+      double ts_dist = tcost + e.reverse_cost;
+      bool st_fully_covered = st_dist <= max_dist_cutoff;
+      bool ts_fully_covered = ts_dist <= max_dist_cutoff;
+      skip_ts = st_fully_covered && ts_fully_covered && st_dist < ts_dist;
+      skip_st = st_fully_covered && ts_fully_covered && ts_dist < st_dist;
+    }
 
-    dijkstra(it->second,
-             /* driving_distance */ max_dist_cutoff, adj, &predecessors,
-             &distances);
-    // Appending the row results.
-    for (size_t i = 0; i < total_edges; ++i)
+    if (start_v == mapping_reversed[e.source])
     {
-      const Edge &e = *(data_edges + i);
-      double scost = distances[e.source];
-      double tcost = distances[e.target];
-      bool s_reached = !(std::isinf(scost) || scost > max_dist_cutoff);
-      bool t_reached = !(std::isinf(tcost) || tcost > max_dist_cutoff);
-      if (!s_reached && !t_reached)
-      {
-        continue;
-      }
-      bool skip_st = false;
-      bool skip_ts = false;
-      if (only_minimum_cover)
-      {
-        double st_dist = scost + e.cost;
-        double ts_dist = tcost + e.reverse_cost;
-        bool st_fully_covered = st_dist <= max_dist_cutoff;
-        bool ts_fully_covered = ts_dist <= max_dist_cutoff;
-        skip_ts = st_fully_covered && ts_fully_covered && st_dist < ts_dist;
-        skip_st = st_fully_covered && ts_fully_covered && ts_dist < st_dist;
-      }
+      append_edge_result(start_v, e.id, 0, e.cost, e.length, geometry, geometry_size, distance_limits, &isochrone_network, coordinates, true);
+    }
+    if (start_v == mapping_reversed[e.target])
+    {
+      append_edge_result(start_v, e.id, 0, e.reverse_cost, e.length, geometry, geometry_size, distance_limits, &isochrone_network, coordinates, true);
+    }
+    if (!skip_ts && t_reached && predecessors[e.target] != e.source)
+    {
+      append_edge_result(start_v, e.id, tcost, e.reverse_cost, e.length, geometry, geometry_size, distance_limits, &isochrone_network, coordinates, true);
+    }
+    if (!skip_st && s_reached && predecessors[e.source] != e.target)
+    {
+      append_edge_result(start_v, e.id, scost, e.cost, e.length, geometry, geometry_size, distance_limits, &isochrone_network, coordinates, false);
+    }
+  }
+  // Calculating the isochrone shape for the current starting vertex.
 
-      if (start_v == mapping_reversed.find(e.source)->second)
-      {
-        append_edge_result(start_v, e.id, 0, e.cost, e.length, e.geometry, distance_limits, &isochrone_network, coordinates, true);
-      }
-      if (start_v == mapping_reversed.find(e.target)->second)
+  IsochroneStartPoint isp;
+  isp.start_id = start_v;
+  if (cumulative)
+  {
+    // One polygon per step around the points of the step and all smaller steps
+    auto &cumulative_points = buffers.cumulative_points;
+    cumulative_points.clear();
+    for (auto &dl : distance_limits)
+    {
+      std::copy(coordinates[dl].begin(), coordinates[dl].end(), std::back_inserter(cumulative_points));
+      coordinates[dl].clear();
+      if (cumulative_points.size() > 3)
       {
-        append_edge_result(start_v, e.id, 0, e.reverse_cost, e.length, e.geometry, distance_limits, &isochrone_network, coordinates, true);
+        double area;
+        isp.polygon.emplace(dl, polygon_wgs84(cumulative_points, &area));
+        isp.area.emplace(dl, area);
       }
-      if (!skip_ts && t_reached && predecessors[e.target] != e.source)
+    }
+    isochrone_start_point.push_back(isp);
+    return;
+  }
+  for (auto &dl : distance_limits)
+  {
+
+    if (coordinates[dl].size() > 1)
+    {
+      auto &points_ = coordinates[dl];
+      std::vector<std::array<double, 2>> isochrone_path;
+      if (points_.size() > 3)
       {
-        append_edge_result(start_v, e.id, tcost, e.reverse_cost, e.length, e.geometry, distance_limits, &isochrone_network, coordinates, true);
+        ConvexhullResult hull = convexhull(points_);
+        isochrone_path = concaveman<double, 16>(points_, hull.indices);
       }
-      if (!skip_st && s_reached && predecessors[e.source] != e.target)
+      else
       {
-        append_edge_result(start_v, e.id, scost, e.cost, e.length, e.geometry, distance_limits, &isochrone_network, coordinates, false);
+        isochrone_path = {{0, 0}};
       }
+      coordinates[dl].clear();
+      isp.shape.emplace(dl, isochrone_path);
     }
-    // Calculating the isochrone shape for the current starting vertex.
+  }
+  isochrone_start_point.push_back(isp);
+}
 
-    IsochroneStartPoint isp;
-    isp.start_id = start_v;
-    for (auto &dl : distance_limits)
+// Dijkstra search from several start vertices at once, each of them seeded with cost 0. The index
+// of the start vertex a node is reached from is stored in labels.
+void dijkstra_multi_source(const std::vector<int64_t> &start_vertices, double driving_distance,
+                           const Graph &graph,
+                           std::vector<int64_t> *predecessors,
+                           std::vector<double> *distances,
+                           std::vector<int64_t> *labels,
+                           std::vector<int64_t> *reached)
+{
+  size_t n = graph.offsets.size() - 1;
+  distances->assign(n, std::numeric_limits<double>::infinity());
+  predecessors->assign(n, -1);
+  labels->assign(n, -1);
+  reached->clear();
+  typedef std::pair<double, int64_t> pq_el; // <agg_cost at node, node id>
+  std::priority_queue<pq_el, std::vector<pq_el>, std::greater<pq_el>> q;
+  for (size_t i = 0; i < start_vertices.size(); ++i)
+  {
+    int64_t start_vertex = start_vertices[i];
+    if (start_vertex < 0 || (*labels)[start_vertex] != -1)
     {
-
-      if (coordinates[dl].size() > 1)
+      continue;
+    }
+    (*distances)[start_vertex] = 0.;
+    (*labels)[start_vertex] = i;
+    reached->push_back(start_vertex);
+    q.emplace(0., start_vertex);
+  }
+  while (!q.empty())
+  {
+    double dist = q.top().first;
+    int64_t node_id = q.top().second;
+    if (dist >= driving_distance)
+    {
+      break;
+    }
+    q.pop();
+    if (dist > (*distances)[node_id])
+    {
+      continue; // outdated entry
+    }
+    for (int64_t a = graph.offsets[node_id]; a < graph.offsets[node_id + 1]; ++a)
+    {
+      int64_t target = graph.targets[a];
+      double agg_cost = dist + graph.costs[a];
+      if ((*distances)[target] > agg_cost)
       {
-        auto &points_ = coordinates[dl];
-        std::vector<std::array<double, 2>> isochrone_path;
-        if (points_.size() > 3)
-        {
-          ConvexhullResult hull = convexhull(points_);
-          isochrone_path = concaveman<double, 16>(points_, hull.indices);
-        }
-        else
+        if (std::isinf((*distances)[target]))
         {
-          isochrone_path = {{0, 0}};
+          reached->push_back(target);
         }
-        coordinates[dl].clear();
-        isp.shape.emplace(dl, isochrone_path);
+        (*distances)[target] = agg_cost;
+        (*predecessors)[target] = node_id;
+        (*labels)[target] = (*labels)[node_id];
+        q.emplace(agg_cost, target);
       }
     }
-    isochrone_start_point.push_back(isp);
   }
-
-  result.isochrone = isochrone_start_point;
-  result.network = isochrone_network;
-  return result;
 }
 
-#ifdef DEBUG
-std::vector<std::string> split(const std::string &input, const std::string &regex = " ")
+int64_t find_group(std::vector<int64_t> &groups, int64_t i)
 {
-  std::regex re(regex);
-  std::sregex_token_iterator first{input.begin(), input.end(), re, -1}, last; // the '-1' is what makes the regex split (-1 := what was not matched)
-  std::vector<std::string> tokens{first, last};
-  return tokens;
+  while (groups[i] != i)
+  {
+    groups[i] = groups[groups[i]];
+    i = groups[i];
+  }
+  return i;
 }
 
-std::vector<Edge>
-read_file(std::string name_file)
+// Computes the union of the isochrones of all start vertices with one Dijkstra search. The
+// catchments of start vertices which touch within a distance limit are merged into one group and one
+// shape is computed per group and distance limit. The shapes are returned as one start point per
+// group and distance limit, using the first start vertex of the group as start_id. The network edges
+// keep the start vertex they are reached from. With cumulative, the polygons of the groups contain the
+// points of all smaller distance limits as well.
+Result compute_multi_source_isochrone(Edge *data_edges, size_t total_edges,
+                                      const std::array<double, 2> *coordinate_buffer,
+                                      std::vector<int64_t> start_vertices,
+                                      std::vector<double> distance_limits,
+                                      bool only_minimum_cover,
+                                      bool cumulative = false)
 {
-  std::vector<Edge> data_edges;
-  Edge edge;
-  std::ifstream myfile;
-  std::string line;
-  myfile.open(name_file, std::ios::in);
+  Result result;
+  std::sort(distance_limits.begin(), distance_limits.end());
+  double max_dist_cutoff = *distance_limits.rbegin();
+  std::unordered_map<int64_t, int64_t> mapping = remap_edges(data_edges, total_edges);
+  size_t nodes_count = mapping.size();
+  Graph graph = construct_graph(nodes_count, data_edges, total_edges);
 
-  int lineCount = 0;
-  std::getline(myfile, line); // ignore header line
-  while (std::getline(myfile, line) && !line.empty())
+  std::vector<int64_t> mapped_start_vertices(start_vertices.size(), -1);
+  for (size_t i = 0; i < start_vertices.size(); ++i)
   {
-    std::vector<std::string> segmented = split(line, "(\\,\\[\\[)");
-    std::vector<std::string> props = split(segmented[0], "(\\,)");
-    edge.id = std::stoll(props[0]);
-    edge.source = std::stoll(props[1]);
-    edge.target = std::stoll(props[2]);
-    edge.cost = std::stod(props[3]);
-    edge.reverse_cost = std::stod(props[4]);
-    edge.length = std::stod(props[5]);
-    // Remove last brackets ]] and split geometry coordinate pairs.
-    segmented[1].erase(segmented[1].length() - 2);
-    std::vector<std::string> coords = split(segmented[1], "(\\]\\,\\[)");
-
-    // Loop through coords
-    std::vector<std::array<double, 2>> geometry;
-    for (auto coord : coords)
+    auto it = mapping.find(start_vertices[i]);
+    if (it == mapping.end())
     {
-      std::array<double, 2> xy;
-      std::vector<std::string> xy_str = split(coord, "(\\,)");
-      xy[0] = std::stod(xy_str[0]);
-      xy[1] = std::stod(xy_str[1]);
-      geometry.push_back(xy);
+      result.network.push_unmapped(start_vertices[i]);
+      continue;
     }
-    edge.geometry = geometry;
-    data_edges.push_back(edge);
-    lineCount++;
+    mapped_start_vertices[i] = it->second;
   }
 
-  myfile.close();
-  return data_edges;
-}
-
-int main()
-{
-  std::cout << "Main function...(Testing)!";
-  std::vector<std::array<double, 2>> points_ = {{0, 0}, {0.25, 0.15}, {1, 0}, {1, 1}};
-  auto convex_hull = convexhull(points_);
-  auto concave_points = concaveman<double, 16>({{0, 0}, {0.25, 0.15}, {1, 0}, {1, 1}}, {0, 2, 3}, 2, 0);
+  std::vector<double> distances;
+  std::vector<int64_t> predecessors, labels, reached;
+  dijkstra_multi_source(mapped_start_vertices, max_dist_cutoff, graph, &predecessors, &distances, &labels,
+                        &reached);
 
-  // demo network file location
-  std::string network_file = "../data/test_network.csv";
-  std::vector<Edge> data_edges_vector = read_file(network_file);
-  static const int64_t total_edges = data_edges_vector.size();
-  Edge *data_edges = new Edge[total_edges];
-  for (int64_t i = 0; i < total_edges; ++i)
+  std::vector<bool> edge_visited(total_edges, false);
+  std::vector<int64_t> reached_edges;
+  for (int64_t node_id : reached)
   {
-    data_edges[i] = data_edges_vector[i];
+    for (int64_t a = graph.incident_offsets[node_id]; a < graph.incident_offsets[node_id + 1]; ++a)
+    {
+      int64_t edge_index = graph.incident_edges[a];
+      if (!edge_visited[edge_index])
+      {
+        edge_visited[edge_index] = true;
+        reached_edges.push_back(edge_index);
+      }
+    }
   }
-  data_edges_vector.clear();
-  std::vector<double> distance_limits = {60};
-  std::vector<int64_t> start_vertices{2147483647};
-  bool only_minimum_cover = false;
-  auto results = compute_isochrone(data_edges, total_edges, start_vertices,
-                                   distance_limits, only_minimum_cover);
+  std::sort(reached_edges.begin(), reached_edges.end());
 
-  return 0;
-}
-#endif
+  // Points of the edges per distance limit and the start vertex they are reached from
+  std::unordered_map<double, std::vector<std::array<double, 2>>> coordinates;
+  std::unordered_map<double, std::vector<int64_t>> point_labels;
+  for (auto &dl : distance_limits)
+  {
+    coordinates.emplace(dl, std::vector<std::array<double, 2>>());
+    point_labels.emplace(dl, std::vector<int64_t>());
+  }
+  auto label_points = [&](int64_t label)
+  {
+    for (auto &dl : distance_limits)
+    {
+      point_labels[dl].resize(coordinates[dl].size(), label);
+    }
+  };
+  // Edges connecting the catchments of two start vertices: <cost at which they touch, label, label>
+  std::vector<std::tuple<double, int64_t, int64_t>> touching;
+
+  for (int64_t edge_index : reached_edges)
+  {
+    const Edge &e = *(data_edges + edge_index);
+    const std::array<double, 2> *geometry = coordinate_buffer + e.geom_start;
+    size_t geometry_size = e.geom_end - e.geom_start;
+    double scost = distances[e.source];
+    double tcost = distances[e.target];
+    bool s_reached = !(std::isinf(scost) || scost > max_dist_cutoff);
+    bool t_reached = !(std::isinf(tcost) || tcost > max_dist_cutoff);
+    if (!s_reached && !t_reached)
+    {
+      continue;
+    }
+    if (s_reached && t_reached && labels[e.source] != labels[e.target])
+    {
+      touching.emplace_back(std::max(scost, tcost), labels[e.source], labels[e.target]);
+    }
+    bool skip_st = false;
+    bool skip_ts = false;
+    if (only_minimum_cover)
+    {
+      double st_dist = scost + e.cost;
+      double ts_dist = tcost + e.reverse_cost;
+      bool st_fully_covered = st_dist <= max_dist_cutoff;
+      bool ts_fully_covered = ts_dist <= max_dist_cutoff;
+      skip_ts = st_fully_covered && ts_fully_covered && st_dist < ts_dist;
+      skip_st = st_fully_covered && ts_fully_covered && ts_dist < st_dist;
+    }
+    if (!skip_ts && t_reached && predecessors[e.target] != e.source)
+    {
+      append_edge_result(start_vertices[labels[e.target]], e.id, tcost, e.reverse_cost, e.length, geometry, geometry_size, distance_limits, &result.network, coordinates, true);
+      label_points(labels[e.target]);
+    }
+    if (!skip_st && s_reached && predecessors[e.source] != e.target)
+    {
+      append_edge_result(start_vertices[labels[e.source]], e.id, scost, e.cost, e.length, geometry, geometry_size, distance_limits, &result.network, coordinates, false);
+      label_points(labels[e.source]);
+    }
+  }
+
+  // Merging the touching catchments with a union-find and computing one shape per group
+  std::sort(touching.begin(), touching.end());
+  std::vector<int64_t> groups(start_vertices.size());
+  std::iota(groups.begin(), groups.end(), 0);
+  size_t next_touching = 0;
+  std::map<int64_t, std::vector<std::array<double, 2>>> cumulative_group_points;
+  for (auto &dl : distance_limits)
+  {
+    for (; next_touching < touching.size() && std::get<0>(touching[next_touching]) < dl; ++next_touching)
+    {
+      int64_t a = find_group(groups, std::get<1>(touching[next_touching]));
+      int64_t b = find_group(groups, std::get<2>(touching[next_touching]));
+      groups[std::max(a, b)] = std::min(a, b);
+    }
+    std::map<int64_t, std::vector<std::array<double, 2>>> group_points;
+    if (cumulative)
+    {
+      // Carrying the points of the smaller distance limits over to the merged groups
+      for (auto &group : cumulative_group_points)
+      {
+        auto &merged = group_points[find_group(groups, group.first)];
+        std::move(group.second.begin(), group.second.end(), std::back_inserter(merged));
+      }
+    }
+    auto &points = coordinates[dl];
+    auto &labels_dl = point_labels[dl];
+    for (size_t i = 0; i < points.size(); ++i)
+    {
+      group_points[find_group(groups, labels_dl[i])].push_back(points[i]);
+    }
+    if (cumulative)
+    {
+      for (auto &group : group_points)
+      {
+        if (group.second.size() > 3)
+        {
+          IsochroneStartPoint isp;
+          isp.start_id = start_vertices[group.first];
+          double area;
+          isp.polygon.emplace(dl, polygon_wgs84(group.second, &area));
+          isp.area.emplace(dl, area);
+          result.isochrone.push_back(isp);
+        }
+      }
+      cumulative_group_points = std::move(group_points);
+      continue;
+    }
+    for (auto &group : group_points)
+    {
+      auto &points_ = group.second;
+      if (points_.size() <= 1)
+      {
+        continue;
+      }
+      std::vector<std::array<double, 2>> isochrone_path;
+      if (points_.size() > 3)
+      {
+        ConvexhullResult hull = convexhull(points_);
+        isochrone_path = concaveman<double, 16>(points_, hull.indices);
+      }
+      else
+      {
+        isochrone_path = {{0, 0}};
+      }
+      IsochroneStartPoint isp;
+      isp.start_id = start_vertices[group.first];
+      isp.shape.emplace(dl, isochrone_path);
+      result.isochrone.push_back(isp);
+    }
+  }
+  return result;
+}
+
+// Computes the isochrones of all start vertices. With threads > 1 the start vertices are spread
+// over a pool of threads, threads <= 0 uses all available cores. The results are merged in the
+// order of the start vertices, so the output does not depend on the number of threads.
+Result compute_isochrone(Edge *data_edges, size_t total_edges,
+                         const std::array<double, 2> *coordinate_buffer,
+                         std::vector<int64_t> start_vertices,
+                         std::vector<double> distance_limits,
+                         bool only_minimum_cover,
+                         int threads = 1,
+                         bool cumulative = false)
+{
+  Result result;
+  std::sort(distance_limits.begin(), distance_limits.end());
+  // Extracting vertices and mapping the ids from 0 to N-1. Remapping is done
+  // so that data structures used can be simpler (arrays instead of maps).
+  // modifying data_edges source/target fields.
+  std::unordered_map<int64_t, int64_t> mapping = remap_edges(data_edges, total_edges);
+
+  size_t nodes_count = mapping.size();
+  std::vector<int64_t> mapping_reversed(nodes_count);
+
+  for (auto i=mapping.begin(); i!=mapping.end(); ++i)
+    mapping_reversed[i->second] = i->first;
+
+  Graph graph = construct_graph(nodes_count, data_edges, total_edges);
+
+  size_t total_start_vertices = start_vertices.size();
+  if (threads <= 0)
+  {
+    threads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  threads = std::min<size_t>(threads, std::max<size_t>(1, total_start_vertices));
+
+  if (threads == 1)
+  {
+    // Storing the result of dijkstra call and reusing the memory for each vertex.
+    StartVertexBuffers buffers(nodes_count, total_edges, distance_limits);
+    for (int64_t start_v : start_vertices)
+    {
+      compute_start_vertex(start_v, data_edges, total_edges, coordinate_buffer, graph, mapping, mapping_reversed,
+                           distance_limits, only_minimum_cover, cumulative, buffers, result.network,
+                           result.isochrone);
+    }
+    return result;
+  }
+
+  // The results of every start vertex are kept apart and merged in order afterwards.
+  std::vector<IsochroneNetwork> networks(total_start_vertices);
+  std::vector<std::vector<IsochroneStartPoint>> start_points(total_start_vertices);
+  std::atomic<size_t> next_start_vertex(0);
+  std::exception_ptr error = nullptr;
+  std::mutex error_mutex;
+
+  auto worker = [&]()
+  {
+    try
+    {
+      StartVertexBuffers buffers(nodes_count, total_edges, distance_limits);
+      for (size_t i = next_start_vertex++; i < total_start_vertices; i = next_start_vertex++)
+      {
+        compute_start_vertex(start_vertices[i], data_edges, total_edges, coordinate_buffer, graph, mapping,
+                             mapping_reversed, distance_limits, only_minimum_cover, cumulative, buffers,
+                             networks[i], start_points[i]);
+      }
+    }
+    catch (...)
+    {
+      std::lock_guard<std::mutex> lock(error_mutex);
+      if (!error)
+      {
+        error = std::current_exception();
+      }
+      next_start_vertex = total_start_vertices;
+    }
+  };
+
+  std::vector<std::thread> pool;
+  pool.reserve(threads);
+  for (int t = 0; t < threads; ++t)
+  {
+    pool.emplace_back(worker);
+  }
+  for (auto &thread : pool)
+  {
+    thread.join();
+  }
+  if (error)
+  {
+    std::rethrow_exception(error);
+  }
+
+  size_t total_network_edges = 0;
+  size_t total_network_coordinates = 0;
+  for (auto &network : networks)
+  {
+    total_network_edges += network.size();
+    total_network_coordinates += network.coordinates.size();
+  }
+  result.network.reserve(total_network_edges, total_network_coordinates);
+  result.isochrone.reserve(total_start_vertices);
+  for (size_t i = 0; i < total_start_vertices; ++i)
+  {
+    result.network.append(networks[i]);
+    std::move(start_points[i].begin(), start_points[i].end(), std::back_inserter(result.isochrone));
+    networks[i] = IsochroneNetwork();
+  }
+  return result;
+}
+
+// Dijkstra search seeded with several nodes, each at its own cost <node, cost, label>. The label of
+// the seed a node is reached from is stored in labels. As in dijkstra, only the nodes reached by the
+// previous search are reset, the buffers have to be initialized once with the size of the graph.
+void dijkstra_seeded(const std::vector<std::tuple<int64_t, double, int64_t>> &seeds, double driving_distance,
+                     const Graph &graph,
+                     std::vector<double> *distances,
+                     std::vector<int64_t> *labels,
+                     std::vector<int64_t> *reached)
+{
+  for (int64_t node_id : *reached)
+  {
+    (*distances)[node_id] = std::numeric_limits<double>::infinity();
+    (*labels)[node_id] = -1;
+  }
+  reached->clear();
+  typedef std::pair<double, int64_t> pq_el; // <agg_cost at node, node id>
+  std::priority_queue<pq_el, std::vector<pq_el>, std::greater<pq_el>> q;
+  for (auto &seed : seeds)
+  {
+    int64_t node_id = std::get<0>(seed);
+    double cost = std::get<1>(seed);
+    if ((*distances)[node_id] <= cost)
+    {
+      continue;
+    }
+    if (std::isinf((*distances)[node_id]))
+    {
+      reached->push_back(node_id);
+    }
+    (*distances)[node_id] = cost;
+    (*labels)[node_id] = std::get<2>(seed);
+    q.emplace(cost, node_id);
+  }
+  while (!q.empty())
+  {
+    double dist = q.top().first;
+    int64_t node_id = q.top().second;
+    if (dist >= driving_distance)
+    {
+      break;
+    }
+    q.pop();
+    if (dist > (*distances)[node_id])
+    {
+      continue; // outdated entry
+    }
+    for (int64_t a = graph.offsets[node_id]; a < graph.offsets[node_id + 1]; ++a)
+    {
+      int64_t target = graph.targets[a];
+      double agg_cost = dist + graph.costs[a];
+      if ((*distances)[target] > agg_cost)
+      {
+        if (std::isinf((*distances)[target]))
+        {
+          reached->push_back(target);
+        }
+        (*distances)[target] = agg_cost;
+        (*labels)[target] = (*labels)[node_id];
+        q.emplace(agg_cost, target);
+      }
+    }
+  }
+}
+
+// Computes the travel costs between points on edges (seeds) and the target vertices within max_cost.
+// A seed is given by the id of its edge and the fraction of the edge length from the source, it
+// enters the graph at both ends of the edge with the cost of the part of the edge to travel. With
+// reverse, the costs are computed on the reversed graph, so they are the costs from the vertices to
+// the seeds. Without multi_source, every seed is searched on its own and all reached target vertices
+// are returned per seed, spread over the threads. With multi_source, all seeds are searched at once
+// and every reached target vertex is returned once with the cost and the index of its nearest seed.
+VertexCosts compute_vertex_costs(Edge *data_edges, size_t total_edges,
+                                 const std::vector<int64_t> &seed_edges,
+                                 const std::vector<double> &seed_fractions,
+                                 const std::vector<int64_t> &target_vertices,
+                                 double max_cost,
+                                 int threads = 1,
+                                 bool multi_source = false,
+                                 bool reverse = false)
+{
+  if (reverse)
+  {
+    for (size_t i = 0; i < total_edges; ++i)
+    {
+      std::swap(data_edges[i].cost, data_edges[i].reverse_cost);
+    }
+  }
+  std::unordered_map<int64_t, int64_t> mapping = remap_edges(data_edges, total_edges);
+  size_t nodes_count = mapping.size();
+  Graph graph = construct_graph(nodes_count, data_edges, total_edges);
+
+  std::unordered_map<int64_t, size_t> edge_index;
+  for (size_t i = 0; i < total_edges; ++i)
+  {
+    edge_index[data_edges[i].id] = i;
+  }
+  // Position of the target vertices per node, -1 for nodes which are no target
+  std::vector<int64_t> target_position(nodes_count, -1);
+  for (size_t i = 0; i < target_vertices.size(); ++i)
+  {
+    auto it = mapping.find(target_vertices[i]);
+    if (it != mapping.end())
+    {
+      target_position[it->second] = i;
+    }
+  }
+  // Entry nodes of the seeds <node, cost, seed index>, seeds on unknown edges are skipped
+  std::vector<std::vector<std::tuple<int64_t, double, int64_t>>> seeds(seed_edges.size());
+  for (size_t i = 0; i < seed_edges.size(); ++i)
+  {
+    auto it = edge_index.find(seed_edges[i]);
+    double fraction = seed_fractions[i];
+    if (it == edge_index.end() || !(fraction >= 0. && fraction <= 1.))
+    {
+      continue;
+    }
+    const Edge &e = data_edges[it->second];
+    if (e.reverse_cost >= 0.)
+    {
+      seeds[i].emplace_back(e.source, fraction * e.reverse_cost, i);
+    }
+    if (e.cost >= 0.)
+    {
+      seeds[i].emplace_back(e.target, (1. - fraction) * e.cost, i);
+    }
+  }
+
+  VertexCosts result;
+  if (multi_source)
+  {
+    std::vector<std::tuple<int64_t, double, int64_t>> all_seeds;
+    for (auto &s : seeds)
+    {
+      all_seeds.insert(all_seeds.end(), s.begin(), s.end());
+    }
+    std::vector<double> distances(nodes_count, std::numeric_limits<double>::infinity());
+    std::vector<int64_t> labels(nodes_count, -1);
+    std::vector<int64_t> reached;
+    dijkstra_seeded(all_seeds, max_cost, graph, &distances, &labels, &reached);
+    for (size_t i = 0; i < target_vertices.size(); ++i)
+    {
+      auto it = mapping.find(target_vertices[i]);
+      if (it != mapping.end() && distances[it->second] <= max_cost)
+      {
+        result.push_back(labels[it->second], target_vertices[i], distances[it->second]);
+      }
+    }
+    return result;
+  }
+
+  size_t total_seeds = seeds.size();
+  if (threads <= 0)
+  {
+    threads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  threads = std::min<size_t>(threads, std::max<size_t>(1, total_seeds));
+
+  // The results of every seed are kept apart and merged in order afterwards.
+  std::vector<VertexCosts> seed_costs(total_seeds);
+  std::atomic<size_t> next_seed(0);
+  std::exception_ptr error = nullptr;
+  std::mutex error_mutex;
+
+  auto worker = [&]()
+  {
+    try
+    {
+      std::vector<double> distances(nodes_count, std::numeric_limits<double>::infinity());
+      std::vector<int64_t> labels(nodes_count, -1);
+      std::vector<int64_t> reached;
+      for (size_t i = next_seed++; i < total_seeds; i = next_seed++)
+      {
+        dijkstra_seeded(seeds[i], max_cost, graph, &distances, &labels, &reached);
+        for (int64_t node_id : reached)
+        {
+          int64_t position = target_position[node_id];
+          if (position >= 0 && distances[node_id] <= max_cost)
+          {
+            seed_costs[i].push_back(i, target_vertices[position], distances[node_id]);
+          }
+        }
+      }
+    }
+    catch (...)
+    {
+      std::lock_guard<std::mutex> lock(error_mutex);
+      if (!error)
+      {
+        error = std::current_exception();
+      }
+      next_seed = total_seeds;
+    }
+  };
+
+  std::vector<std::thread> pool;
+  pool.reserve(threads);
+  for (int t = 0; t < threads; ++t)
+  {
+    pool.emplace_back(worker);
+  }
+  for (auto &thread : pool)
+  {
+    thread.join();
+  }
+  if (error)
+  {
+    std::rethrow_exception(error);
+  }
+  for (auto &costs : seed_costs)
+  {
+    result.append(costs);
+  }
+  return result;
+}
+
+#ifdef DEBUG
+std::vector<std::string> split(const std::string &input, const std::string &regex = " ")
+{
+  std::regex re(regex);
+  std::sregex_token_iterator first{input.begin(), input.end(), re, -1}, last; // the '-1' is what makes the regex split (-1 := what was not matched)
+  std::vector<std::string> tokens{first, last};
+  return tokens;
+}
+
+std::vector<Edge>
+read_file(std::string name_file, std::vector<std::array<double, 2>> &coordinates)
+{
+  std::vector<Edge> data_edges;
+  Edge edge;
+  std::ifstream myfile;
+  std::string line;
+  myfile.open(name_file, std::ios::in);
+
+  int lineCount = 0;
+  std::getline(myfile, line); // ignore header line
+  while (std::getline(myfile, line) && !line.empty())
+  {
+    std::vector<std::string> segmented = split(line, "(\\,\\[\\[)");
+    std::vector<std::string> props = split(segmented[0], "(\\,)");
+    edge.id = std::stoll(props[0]);
+    edge.source = std::stoll(props[1]);
+    edge.target = std::stoll(props[2]);
+    edge.cost = std::stod(props[3]);
+    edge.reverse_cost = std::stod(props[4]);
+    edge.length = std::stod(props[5]);
+    // Remove last brackets ]] and split geometry coordinate pairs.
+    segmented[1].erase(segmented[1].length() - 2);
+    std::vector<std::string> coords = split(segmented[1], "(\\]\\,\\[)");
+
+    // Loop through coords and append them to the shared coordinate buffer
+    edge.geom_start = coordinates.size();
+    for (auto coord : coords)
+    {
+      std::array<double, 2> xy;
+      std::vector<std::string> xy_str = split(coord, "(\\,)");
+      xy[0] = std::stod(xy_str[0]);
+      xy[1] = std::stod(xy_str[1]);
+      coordinates.push_back(xy);
+    }
+    edge.geom_end = coordinates.size();
+    data_edges.push_back(edge);
+    lineCount++;
+  }
+
+  myfile.close();
+  return data_edges;
+}
+
+// ---------------------------------------------------------------------------------------------------------------------
+// BENCHMARK
+// ---------------------------------------------------------------------------------------------------------------------
+// Build and run from this directory with:
+// g++ -O3 -std=c++17 -DDEBUG -pthread isochrone.cpp -o isochrone && ./isochrone
+
+// Reference implementation with pointer adjacency lists and a std::set as priority queue (decrease-key
+// by erase/insert). It is only kept to benchmark and validate the CSR/binary heap search.
+std::vector<std::vector<const Edge *>>
+construct_adjacency_list(size_t n, const Edge *edges,
+                         size_t total_edges)
+{
+  std::vector<std::vector<const Edge *>> adj(n);
+  for (size_t i = 0; i < total_edges; ++i)
+  {
+    if (edges[i].cost >= 0.)
+    {
+      adj[edges[i].source].push_back(&edges[i]);
+    }
+    if (edges[i].reverse_cost >= 0.)
+    {
+      adj[edges[i].target].push_back(&edges[i]);
+    }
+  }
+  return adj;
+}
+
+void dijkstra_set(int64_t start_vertex, double driving_distance,
+                  const std::vector<std::vector<const Edge *>> &adj,
+                  std::vector<int64_t> *predecessors,
+                  std::vector<double> *distances)
+{
+  size_t n = adj.size();
+  distances->assign(n, std::numeric_limits<double>::infinity());
+  predecessors->assign(n, -1);
+  typedef std::tuple<double, int64_t> pq_el;
+  std::set<pq_el> q;
+  q.insert({0., start_vertex});
+  while (!q.empty())
+  {
+    double dist;
+    int64_t node_id;
+    std::tie(dist, node_id) = *q.begin();
+    if (dist >= driving_distance)
+    {
+      break;
+    }
+    q.erase(q.begin());
+    for (auto &&e : adj[node_id])
+    {
+      int64_t target = e->target == node_id ? e->source : e->target;
+      double cost = e->target == node_id ? e->reverse_cost : e->cost;
+      double agg_cost = dist + cost;
+      if ((*distances)[target] > agg_cost)
+      {
+        q.erase({(*distances)[target], target});
+        (*distances)[target] = agg_cost;
+        (*predecessors)[target] = node_id;
+        q.emplace((*distances)[target], target);
+      }
+    }
+  }
+}
+
+// Synthetic grid network (side x side nodes, 100 m apart) with random costs between 5 and 60 seconds per edge.
+std::vector<Edge> synthetic_grid(int64_t side, std::vector<std::array<double, 2>> &coordinates)
+{
+  std::vector<Edge> edges;
+  coordinates.clear();
+  std::mt19937 generator(42);
+  std::uniform_real_distribution<double> cost(5., 60.);
+  int64_t id = 0;
+  auto add_edge = [&](int64_t source, int64_t target)
+  {
+    double c = cost(generator);
+    int64_t geom_start = coordinates.size();
+    coordinates.push_back({(source % side) * 100., (source / side) * 100.});
+    coordinates.push_back({(target % side) * 100., (target / side) * 100.});
+    edges.push_back({id++, source, target, c, c, 100., geom_start, geom_start + 2});
+  };
+  for (int64_t row = 0; row < side; ++row)
+  {
+    for (int64_t col = 0; col < side; ++col)
+    {
+      int64_t node = row * side + col;
+      if (col + 1 < side)
+      {
+        add_edge(node, node + 1);
+      }
+      if (row + 1 < side)
+      {
+        add_edge(node, node + side);
+      }
+    }
+  }
+  return edges;
+}
+
+void benchmark_dijkstra(const std::string &name, std::vector<Edge> edges, size_t total_starts, double driving_distance)
+{
+  auto mapping = remap_edges(edges.data(), edges.size());
+  size_t n = mapping.size();
+  std::vector<int64_t> starts(total_starts);
+  for (size_t i = 0; i < total_starts; ++i)
+  {
+    starts[i] = (i * 7919) % n;
+  }
+  std::vector<double> distances_set(n), distances_heap(n);
+  std::vector<int64_t> predecessors_set(n), predecessors_heap(n);
+
+  auto time_set = std::chrono::high_resolution_clock::now();
+  auto adj = construct_adjacency_list(n, edges.data(), edges.size());
+  for (auto start : starts)
+  {
+    dijkstra_set(start, driving_distance, adj, &predecessors_set, &distances_set);
+  }
+  double duration_set = std::chrono::duration<double, std::milli>(std::chrono::high_resolution_clock::now() - time_set).count();
+
+  auto time_heap = std::chrono::high_resolution_clock::now();
+  Graph graph = construct_graph(n, edges.data(), edges.size());
+  for (auto start : starts)
+  {
+    dijkstra(start, driving_distance, graph, &predecessors_heap, &distances_heap);
+  }
+  double duration_heap = std::chrono::duration<double, std::milli>(std::chrono::high_resolution_clock::now() - time_heap).count();
+
+  // Both searches have to return the same result for the last start vertex
+  bool equal = distances_set == distances_heap && predecessors_set == predecessors_heap;
+  std::cout << name << ": " << edges.size() << " edges, " << n << " nodes, " << total_starts << " searches\n"
+            << "  std::set + adjacency list: " << duration_set << " ms\n"
+            << "  binary heap + CSR:         " << duration_heap << " ms (x" << duration_set / duration_heap << ")\n"
+            << "  results equal: " << (equal ? "yes" : "NO") << "\n";
+}
+
+int main()
+{
+  std::cout << "Main function...(Testing)!\n";
+  std::vector<std::array<double, 2>> points_ = {{0, 0}, {0.25, 0.15}, {1, 0}, {1, 1}};
+  auto convex_hull = convexhull(points_);
+  auto concave_points = concaveman<double, 16>({{0, 0}, {0.25, 0.15}, {1, 0}, {1, 1}}, {0, 2, 3}, 2, 0);
+
+  // demo network file location
+  std::string network_file = "../data/network_munich_small.csv";
+  std::vector<std::array<double, 2>> coordinates;
+  std::vector<Edge> data_edges = read_file(network_file, coordinates);
+  std::vector<Edge> data_edges_copy = data_edges;
+  std::vector<double> distance_limits = {60, 120, 180};
+  std::vector<int64_t> start_vertices{data_edges[0].source};
+  bool only_minimum_cover = false;
+  auto results = compute_isochrone(data_edges.data(), data_edges.size(), coordinates.data(), start_vertices,
+                                   distance_limits, only_minimum_cover);
+  std::cout << "Isochrone network edges: " << results.network.size() << "\n";
+
+  std::vector<std::array<double, 2>> grid_coordinates;
+  benchmark_dijkstra("network_munich_small.csv", data_edges_copy, 10000, 180.);
+  benchmark_dijkstra("synthetic grid 300x300", synthetic_grid(300, grid_coordinates), 1000, 1200.);
+  benchmark_dijkstra("synthetic grid 1000x1000", synthetic_grid(1000, grid_coordinates), 100, 1200.);
+
+  // Multi-source isochrones, serial and with all cores
+  std::vector<Edge> grid = synthetic_grid(300, grid_coordinates);
+  std::vector<int64_t> grid_starts;
+  for (int64_t i = 0; i < 64; ++i)
+  {
+    grid_starts.push_back((i * 7919) % (300 * 300));
+  }
+  for (int threads : {1, 0})
+  {
+    std::vector<Edge> grid_copy = grid;
+    auto time_start = std::chrono::high_resolution_clock::now();
+    auto grid_result = compute_isochrone(grid_copy.data(), grid_copy.size(), grid_coordinates.data(), grid_starts,
+                                         {300, 600, 900}, true, threads);
+    double duration = std::chrono::duration<double, std::milli>(std::chrono::high_resolution_clock::now() - time_start).count();
+    std::cerr << "compute_isochrone, " << grid_starts.size() << " start vertices, threads " << threads << ": "
+              << duration << " ms, " << grid_result.network.size() << " network edges\n";
+  }
+  return 0;
+}
+#endif
 
 // ---------------------------------------------------------------------------------------------------------------------
 // pybind11 bindings
 // ---------------------------------------------------------------------------------------------------------------------
 #ifndef DEBUG
 
+// NumPy view on a column of the result, the owner object keeps the memory alive.
+template <typename T>
+py::array_t<T> column_view(py::object owner, const std::vector<T> &column)
+{
+  return py::array_t<T>({column.size()}, {sizeof(T)}, column.data(), owner);
+}
+
 struct Isochrone
 {
   // Calculate isochrone for a given set of start vertices.
   Result calculate(
       py::array_t<int64_t> &edge_ids_, py::array_t<int64_t> &sources_,
       py::array_t<int64_t> &targets_, py::array_t<double> &costs_,
-      py::array_t<double> &reverse_costs_, py::array_t<double> &length_, std::vector<std::vector<std::array<double, 2>>> &geometry,
+      py::array_t<double> &reverse_costs_, py::array_t<double> &length_,
+      py::array_t<double, py::array::c_style | py::array::forcecast> &coordinates_,
+      py::array_t<int64_t> &offsets_,
       py::array_t<int64_t> start_vertices_,
       py::array_t<double> distance_limits_,
-      bool only_minimum_cover_)
+      bool only_minimum_cover_,
+      int threads_,
+      bool multi_source_,
+      bool cumulative_)
   {
     auto total_edges = edge_ids_.shape(0);
 
@@ -631,6 +1635,40 @@ struct Isochrone
     auto costs_c = costs_.unchecked<1>();
     auto reverse_costs_c = reverse_costs_.unchecked<1>();
     auto length_c = length_.unchecked<1>();
+    auto offsets_c = offsets_.unchecked<1>();
+
+    // The coordinates are read in place from the (n, 2) float64 buffer without copying.
+    if (coordinates_.ndim() != 2 || coordinates_.shape(1) != 2)
+    {
+      throw std::invalid_argument("coordinates must have the shape (n, 2)");
+    }
+    if (sources_.shape(0) != total_edges || targets_.shape(0) != total_edges || costs_.shape(0) != total_edges ||
+        reverse_costs_.shape(0) != total_edges || length_.shape(0) != total_edges)
+    {
+      throw std::invalid_argument("edge columns must have the same length");
+    }
+    if (offsets_.shape(0) != total_edges + 1)
+    {
+      throw std::invalid_argument("offsets must have one element more than edges");
+    }
+    // The geometries are read by the worker threads without bounds checks, so the offsets are
+    // validated once before the GIL is released.
+    if (offsets_c(0) != 0)
+    {
+      throw std::invalid_argument("offsets must start at 0");
+    }
+    for (int64_t i = 0; i < total_edges; ++i)
+    {
+      if (offsets_c(i + 1) < offsets_c(i))
+      {
+        throw std::invalid_argument("offsets must be non-decreasing");
+      }
+    }
+    if (offsets_c(total_edges) > coordinates_.shape(0))
+    {
+      throw std::invalid_argument("offsets exceed the number of coordinates");
+    }
+    auto coordinates = reinterpret_cast<const std::array<double, 2> *>(coordinates_.data());
 
     auto start_vertices_c = start_vertices_.unchecked<1>();
     auto total_start_vertices = start_vertices_.shape(0);
@@ -639,7 +1677,7 @@ struct Isochrone
     auto total_distance_limits = distance_limits_.shape(0);
 
     bool only_minimum_cover = only_minimum_cover_;
-    Edge *data_edges = new Edge[total_edges];
+    std::vector<Edge> data_edges(total_edges);
 
     for (int64_t i = 0; i < total_edges; ++i)
     {
@@ -649,7 +1687,8 @@ struct Isochrone
       data_edges[i].cost = costs_c(i);
       data_edges[i].reverse_cost = reverse_costs_c(i);
       data_edges[i].length = length_c(i);
-      data_edges[i].geometry = geometry[i];
+      data_edges[i].geom_start = offsets_c(i);
+      data_edges[i].geom_end = offsets_c(i + 1);
     }
 
     std::vector<int64_t> start_vertices(total_start_vertices);
@@ -662,10 +1701,75 @@ struct Isochrone
     {
       distance_limits[i] = distance_limits_c[i];
     }
-    auto isochrone_points = compute_isochrone(data_edges, total_edges, start_vertices,
-                                              distance_limits, only_minimum_cover);
+    // The computation only works on the copied edges and the coordinate buffer, which is kept
+    // alive by the caller, so other Python threads can run in the meantime.
+    py::gil_scoped_release release;
+    if (multi_source_)
+    {
+      return compute_multi_source_isochrone(data_edges.data(), total_edges, coordinates, start_vertices,
+                                            distance_limits, only_minimum_cover, cumulative_);
+    }
+    auto isochrone_points = compute_isochrone(data_edges.data(), total_edges, coordinates, start_vertices,
+                                              distance_limits, only_minimum_cover, threads_, cumulative_);
     return isochrone_points;
   }
+
+  // Calculate the travel costs between points on edges and vertices of the network.
+  VertexCosts vertex_costs(
+      py::array_t<int64_t> &edge_ids_, py::array_t<int64_t> &sources_,
+      py::array_t<int64_t> &targets_, py::array_t<double> &costs_,
+      py::array_t<double> &reverse_costs_,
+      py::array_t<int64_t> seed_edges_,
+      py::array_t<double> seed_fractions_,
+      py::array_t<int64_t> target_vertices_,
+      double max_cost_,
+      int threads_,
+      bool multi_source_,
+      bool reverse_)
+  {
+    auto total_edges = edge_ids_.shape(0);
+    if (seed_fractions_.shape(0) != seed_edges_.shape(0))
+    {
+      throw std::invalid_argument("seed_fractions must have the length of seed_edges");
+    }
+
+    auto edge_ids_c = edge_ids_.unchecked<1>();
+    auto sources_c = sources_.unchecked<1>();
+    auto targets_c = targets_.unchecked<1>();
+    auto costs_c = costs_.unchecked<1>();
+    auto reverse_costs_c = reverse_costs_.unchecked<1>();
+    std::vector<Edge> data_edges(total_edges);
+    for (int64_t i = 0; i < total_edges; ++i)
+    {
+      data_edges[i].id = edge_ids_c(i);
+      data_edges[i].source = sources_c(i);
+      data_edges[i].target = targets_c(i);
+      data_edges[i].cost = costs_c(i);
+      data_edges[i].reverse_cost = reverse_costs_c(i);
+      data_edges[i].length = 0.;
+      data_edges[i].geom_start = 0;
+      data_edges[i].geom_end = 0;
+    }
+
+    auto seed_edges_c = seed_edges_.unchecked<1>();
+    auto seed_fractions_c = seed_fractions_.unchecked<1>();
+    std::vector<int64_t> seed_edges(seed_edges_.shape(0));
+    std::vector<double> seed_fractions(seed_edges_.shape(0));
+    for (size_t i = 0; i < seed_edges.size(); ++i)
+    {
+      seed_edges[i] = seed_edges_c(i);
+      seed_fractions[i] = seed_fractions_c(i);
+    }
+    auto target_vertices_c = target_vertices_.unchecked<1>();
+    std::vector<int64_t> target_vertices(target_vertices_.shape(0));
+    for (size_t i = 0; i < target_vertices.size(); ++i)
+    {
+      target_vertices[i] = target_vertices_c(i);
+    }
+    py::gil_scoped_release release;
+    return compute_vertex_costs(data_edges.data(), total_edges, seed_edges, seed_fractions, target_vertices,
+                                max_cost_, threads_, multi_source_, reverse_);
+  }
 };
 
 PYBIND11_MODULE(isochrone, m)
@@ -674,30 +1778,60 @@ PYBIND11_MODULE(isochrone, m)
   // m.def("isochrone", &isochrone, "Isochrone Calculation");
   py::class_<IsochroneStartPoint>(m, "IsochroneShape")
       .def_readwrite("start_id", &IsochroneStartPoint::start_id)
-      .def_readwrite("shape", &IsochroneStartPoint::shape);
-
-  py::class_<IsochroneNetworkEdge>(m, "IsochroneNetworkEdge")
-      .def_readwrite("start_id", &IsochroneNetworkEdge::start_id)
-      .def_readwrite("edge", &IsochroneNetworkEdge::edge)
-      .def_readwrite("start_perc", &IsochroneNetworkEdge::start_perc)
-      .def_readwrite("end_perc", &IsochroneNetworkEdge::end_perc)
-      .def_readwrite("start_cost", &IsochroneNetworkEdge::start_cost)
-      .def_readwrite("end_cost", &IsochroneNetworkEdge::end_cost)
-      .def_readwrite("shape", &IsochroneNetworkEdge::geometry);
+      .def_readwrite("shape", &IsochroneStartPoint::shape)
+      .def_readwrite("polygon", &IsochroneStartPoint::polygon)
+      .def_readwrite("area", &IsochroneStartPoint::area);
+
+  // The columns are returned as NumPy views on the C++ vectors, kept alive by the network object.
+  py::class_<IsochroneNetwork>(m, "IsochroneNetwork")
+      .def("__len__", &IsochroneNetwork::size)
+      .def_property_readonly("start_id", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().start_id); })
+      .def_property_readonly("edge", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().edge); })
+      .def_property_readonly("start_perc", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().start_perc); })
+      .def_property_readonly("end_perc", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().end_perc); })
+      .def_property_readonly("start_cost", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().start_cost); })
+      .def_property_readonly("end_cost", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().end_cost); })
+      .def_property_readonly("offsets", [](py::object self)
+                             { return column_view(self, self.cast<IsochroneNetwork &>().offsets); })
+      .def_property_readonly("coordinates", [](py::object self)
+                             {
+                               auto &coordinates = self.cast<IsochroneNetwork &>().coordinates;
+                               return py::array_t<double>({coordinates.size(), (size_t)2},
+                                                          {sizeof(std::array<double, 2>), sizeof(double)},
+                                                          reinterpret_cast<const double *>(coordinates.data()), self);
+                             });
+
+  py::class_<VertexCosts>(m, "VertexCosts")
+      .def("__len__", &VertexCosts::size)
+      .def_property_readonly("seed", [](py::object self)
+                             { return column_view(self, self.cast<VertexCosts &>().seed); })
+      .def_property_readonly("vertex", [](py::object self)
+                             { return column_view(self, self.cast<VertexCosts &>().vertex); })
+      .def_property_readonly("cost", [](py::object self)
+                             { return column_view(self, self.cast<VertexCosts &>().cost); });
 
   py::class_<Result>(m, "Result")
       .def_readwrite("isochrone", &Result::isochrone)
-      .def_readwrite("network", &Result::network);
+      .def_readonly("network", &Result::network);
 
   // bindings to Isochrone class
   py::class_<Isochrone>(m, "Isochrone")
       .def(py::init<>())
-      .def("calculate", &Isochrone::calculate);
+      .def("calculate", &Isochrone::calculate)
+      .def("vertex_costs", &Isochrone::vertex_costs);
 }
 
 /*
 <%
 setup_pybind11(cfg)
+cfg['extra_compile_args'] = ['-pthread']
+cfg['extra_link_args'] = ['-pthread']
 %>
 */
 #endif
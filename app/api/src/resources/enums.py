@@ -11,6 +11,15 @@ class ReturnType(str, Enum):
     db_geobuf = "db_geobuf"
 
 
+class HeatmapReturnType(str, Enum):
+    """Return types of the heatmaps, values returns the values per grid cell without geometry"""
+
+    geojson = "geojson"
+    geobuf = "geobuf"
+    db_geobuf = "db_geobuf"
+    values = "values"
+
+
 class ReturnWithoutDbGeobufEnum(str, Enum):
     """Enumeration for return types without db geobuf."""
 
@@ -25,11 +34,20 @@ class VectorType(str, Enum):
     mvt = "mvt"
 
 
+class HeatmapTypes(str, Enum):
+    """Heatmaps served as values and vector tiles."""
+
+    connectivity = "connectivity"
+    population = "population"
+    local_accessibility = "local-accessibility"
+
+
 class AccessibilityHeatmapTypes(str, Enum):
     """Heatmap Type Enums."""
 
     local_accessibility = "heatmap_local_accessibility"
     local_accessibility_population = "heatmap_accessibility_population"
+    nearest_poi = "heatmap_nearest_poi"
 
 
 class MaxUploadFileSize(int, Enum):
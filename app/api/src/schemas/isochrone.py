@@ -40,6 +40,7 @@ class IsochroneTypeEnum(str, Enum):
 class IsochroneBase(BaseModel):
     user_id: Optional[int]
     scenario_id: Optional[int] = 0
+    study_area_id: Optional[int]
     minutes: int
     speed: float
     modus: str
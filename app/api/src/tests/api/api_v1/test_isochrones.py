@@ -128,6 +128,39 @@ async def test_calculate_isochrone_single_scenario(
         assert scenario_area > default_area
 
 
+async def test_calculate_isochrone_single_twice(
+    client: AsyncClient, superuser_token_headers: Dict[str, str]
+) -> None:
+    # The second request is served from the isochrone cache and has to return the same isochrones
+    data = request_examples["single_isochrone"]["default"]["value"]
+    data.update(isochrone_points[1])
+    responses = []
+    for _ in range(2):
+        r = await client.post(
+            f"{settings.API_V1_STR}/isochrones/single",
+            headers=superuser_token_headers,
+            json=data,
+        )
+        assert 200 <= r.status_code < 300
+        responses.append(r.json())
+
+    first, second = [
+        {
+            feature["properties"]["step"]: (
+                shape(feature["geometry"]),
+                feature["properties"]["reached_opportunities"],
+            )
+            for feature in response["features"]
+        }
+        for response in responses
+    ]
+    assert len(first) > 0
+    assert first.keys() == second.keys()
+    for step, (geometry, reached_opportunities) in first.items():
+        assert geometry.equals(second[step][0])
+        assert reached_opportunities == second[step][1]
+
+
 async def test_calculate_isochrone_single_walking_wheelchair(
     client: AsyncClient, superuser_token_headers: Dict[str, str]
 ) -> None:
@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from src.core.accessibility_heatmap import (
+    PoiAccessibility,
+    accessibility_indices,
+    ntile,
+)
+
+SENSITIVITIES = [150000, 300000]
+MULTIPLE_ENTRANCES = {
+    "supermarket": False,
+    "bakery": False,
+    "subway": True,
+    "park": True,
+}
+CONFIGURATION = {
+    "supermarket": {"sensitivity": 150000, "weight": 1},
+    "bakery": {"sensitivity": 300000, "weight": 2},
+    "subway": {"sensitivity": 300000, "weight": 3},
+    "park": {"sensitivity": 150000, "weight": 1},
+}
+
+
+def random_records(seed: int, n_pois: int = 200, n_grids: int = 30) -> list:
+    """
+    Rows of (poi_uid, category, name, data_upload_id, grid_visualization_ids,
+    accessibility_indices).
+    """
+    rng = np.random.default_rng(seed)
+    categories = list(MULTIPLE_ENTRANCES) + ["kindergarten"]
+    records = []
+    for i in range(n_pois):
+        grid_ids = rng.choice(n_grids, size=rng.integers(0, 6), replace=False)
+        costs = rng.integers(0, 1200, size=len(grid_ids))
+        records.append(
+            (
+                f"poi_{i}",
+                categories[rng.integers(len(categories))],
+                f"name_{rng.integers(5)}",
+                int(rng.choice([0, 0, 0, 7, 8])),
+                grid_ids.tolist(),
+                accessibility_indices(costs, SENSITIVITIES).tolist(),
+            )
+        )
+    return records
+
+
+def sql_accessibility(records, configuration, data_upload_ids) -> dict:
+    """
+    Accessibility per grid cell as basic.prepare_heatmap_local_accessibility summed per
+    grid cell: POIs with one entrance count each, the entrances of POIs with multiple
+    entrances count with their maximum per grid cell, category and name. Default and
+    uploaded POIs are queried separately.
+    """
+    rows = []
+    multiple = defaultdict(list)
+    for poi_uid, category, name, data_upload_id, grid_ids, indices in records:
+        if category not in configuration or category not in MULTIPLE_ENTRANCES:
+            continue
+        if data_upload_id != 0 and data_upload_id not in data_upload_ids:
+            continue
+        row = SENSITIVITIES.index(configuration[category]["sensitivity"])
+        weight = configuration[category]["weight"]
+        for grid_id, index in zip(grid_ids, indices[row]):
+            if MULTIPLE_ENTRANCES[category]:
+                source = "poi_user" if data_upload_id else "poi"
+                multiple[(grid_id, source, category, name)].append(index * weight)
+            else:
+                rows.append((grid_id, index * weight))
+    rows += [(key[0], max(values)) for key, values in multiple.items()]
+
+    heatmap = defaultdict(int)
+    for grid_id, value in rows:
+        heatmap[grid_id] += value
+    return dict(heatmap)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("data_upload_ids", [[], [7], [7, 8]])
+def test_accessibility_matches_sql(seed, data_upload_ids):
+    records = random_records(seed)
+    pois = PoiAccessibility.from_records(records)
+    base_mask = (pois.poi_data_upload_id == 0) | np.isin(
+        pois.poi_data_upload_id, data_upload_ids
+    )
+
+    grid_ids, values = pois.accessibility(
+        CONFIGURATION, SENSITIVITIES, MULTIPLE_ENTRANCES, base_mask
+    )
+
+    assert dict(zip(grid_ids.tolist(), values.tolist())) == sql_accessibility(
+        records, CONFIGURATION, data_upload_ids
+    )
+
+
+def test_accessibility_of_selected_categories():
+    records = random_records(3)
+    configuration = {"subway": {"sensitivity": 150000, "weight": 1}}
+    pois = PoiAccessibility.from_records(records)
+
+    grid_ids, values = pois.accessibility(
+        configuration, SENSITIVITIES, MULTIPLE_ENTRANCES
+    )
+
+    assert dict(zip(grid_ids.tolist(), values.tolist())) == sql_accessibility(
+        records, configuration, [7, 8]
+    )
+
+
+def test_accessibility_of_no_pois():
+    pois = PoiAccessibility.from_records([])
+
+    grid_ids, values = pois.accessibility(
+        CONFIGURATION, SENSITIVITIES, MULTIPLE_ENTRANCES
+    )
+
+    assert len(grid_ids) == len(values) == 0
+
+
+def test_accessibility_indices():
+    indices = accessibility_indices(np.array([0, 300, 600]), [300000, 150000])
+
+    # One row per sensitivity in ascending order
+    assert indices.shape == (2, 3)
+    assert indices[:, 0].tolist() == [10000, 10000]
+    assert indices[0, 1] == round(np.exp(-300 * 300 / 150000) * 10000)
+    assert indices[1, 2] == round(np.exp(-600 * 600 / 300000) * 10000)
+
+
+def test_ntile_like_postgres():
+    # ntile(5) over 7 rows: the first two buckets get two rows
+    values = np.array([70, 10, 30, 20, 60, 50, 40])
+
+    assert ntile(values).tolist() == [5, 1, 2, 1, 4, 3, 2]
@@ -0,0 +1,101 @@
+import struct
+
+import numpy as np
+import pandas as pd
+from geopandas import GeoDataFrame, GeoSeries
+from shapely import wkb
+from shapely.geometry import Point
+
+from src.db.copy import COPY_HEADER, COPY_TRAILER, CopyStream, encode_chunk
+
+
+def decode_tuples(data: bytes, n_fields: int) -> list:
+    """Fields of the tuples of a binary COPY as bytes, None for NULL."""
+    rows = []
+    position = 0
+    while position < len(data):
+        (count,) = struct.unpack_from(">h", data, position)
+        assert count == n_fields
+        position += 2
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack_from(">i", data, position)
+            position += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(data[position : position + length])
+                position += length
+        rows.append(row)
+    return rows
+
+
+def test_encode_chunk_round_trip():
+    df = pd.DataFrame(
+        {
+            "id": pd.array([1, None, 3], dtype="Int64"),
+            "big_id": np.array([2**40, -1, 0], dtype=np.int64),
+            "cost": [1.5, np.nan, -2.25],
+            "small": np.array([7, -8, 9], dtype=np.int16),
+            "flag": [True, False, True],
+            "name": ["a", None, "äö"],
+            "properties": ['{"a": 1}', None, "{}"],
+            "blob": [b"\x00\x01", None, b""],
+        }
+    )
+    types = ["int4", "int8", "float8", "int2", "bool", "text", "jsonb", "bytea"]
+
+    rows = decode_tuples(encode_chunk(df, types), len(types))
+
+    assert len(rows) == 3
+    assert [None if v is None else struct.unpack(">i", v)[0] for v in (r[0] for r in rows)] == [1, None, 3]
+    assert [struct.unpack(">q", r[1])[0] for r in rows] == [2**40, -1, 0]
+    assert [None if r[2] is None else struct.unpack(">d", r[2])[0] for r in rows] == [1.5, None, -2.25]
+    assert [struct.unpack(">h", r[3])[0] for r in rows] == [7, -8, 9]
+    assert [r[4] for r in rows] == [b"\x01", b"\x00", b"\x01"]
+    assert [r[5] for r in rows] == [b"a", None, "äö".encode()]
+    assert [r[6] for r in rows] == [b'\x01{"a": 1}', None, b"\x01{}"]
+    assert [r[7] for r in rows] == [b"\x00\x01", None, b""]
+
+
+def test_encode_chunk_json_values():
+    df = pd.DataFrame(
+        {
+            "properties": [{"a": 1, "b": "c"}, [1, 2], None, np.nan, '{"d": null}'],
+            "settings": [{"a": [1]}, ["x"], None, np.nan, "[]"],
+        }
+    )
+
+    rows = decode_tuples(encode_chunk(df, ["jsonb", "json"]), 2)
+
+    assert [r[0] for r in rows] == [b'\x01{"a": 1, "b": "c"}', b"\x01[1, 2]", None, None, b'\x01{"d": null}']
+    assert [r[1] for r in rows] == [b'{"a": [1]}', b'["x"]', None, None, b"[]"]
+
+
+def test_encode_chunk_geometries():
+    geometries = GeoSeries([Point(11.5, 48.1), None, Point(1, 2)], crs="EPSG:4326")
+    df = GeoDataFrame({"id": np.array([1, 2, 3], dtype=np.int32), "geom": geometries}, geometry="geom")
+
+    rows = decode_tuples(encode_chunk(df, ["int4", "geometry"]), 2)
+
+    assert rows[1][1] is None
+    point = wkb.loads(rows[0][1])
+    assert (point.x, point.y) == (11.5, 48.1)
+    # The geometries are sent as EWKB with the SRID of the GeoSeries
+    assert wkb.loads(rows[2][1]).equals(Point(1, 2))
+    assert struct.unpack_from("<I", rows[0][1], 5)[0] == 4326
+
+
+def test_copy_stream_reads_across_chunks():
+    chunks = [COPY_HEADER, b"", b"abc", b"defgh", COPY_TRAILER]
+    stream = CopyStream(iter(chunks))
+
+    data = b""
+    buffer = bytearray(3)
+    while True:
+        size = stream.readinto(buffer)
+        if size == 0:
+            break
+        data += bytes(buffer[:size])
+
+    assert data == b"".join(chunks)
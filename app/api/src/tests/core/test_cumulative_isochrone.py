@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.core.network_cache import RoutingNetwork
+from src.exts.cpp.bind import cumulative_polygons, isochrone
+
+NETWORK_CSV = Path(__file__).parents[2] / "exts" / "cpp" / "data" / "network_munich_small.csv"
+STEPS = [120, 240, 360, 480, 600]
+
+
+@pytest.fixture(scope="module")
+def network() -> RoutingNetwork:
+    # The geometry is the last column and contains the separator
+    rows = [line.rstrip("\n").split(",", 6) for line in NETWORK_CSV.read_text().splitlines()[1:]]
+    geometries = [json.loads(row[6]) for row in rows]
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(geometry) for geometry in geometries], out=offsets[1:])
+    return RoutingNetwork.from_columns(
+        {
+            "id": [int(row[0]) for row in rows],
+            "source": [int(row[1]) for row in rows],
+            "target": [int(row[2]) for row in rows],
+            "cost": [float(row[3]) for row in rows],
+            "reverse_cost": [float(row[4]) for row in rows],
+            "length": [float(row[5]) for row in rows],
+            "coordinates": np.concatenate(geometries),
+            "offsets": offsets,
+        }
+    )
+
+
+def assert_nested(steps, polygons):
+    assert steps == sorted(steps)
+    for previous, current in zip(polygons, polygons[1:]):
+        assert previous.within(current.buffer(1e-9))
+
+
+def test_cumulative_polygons_are_nested(network):
+    for start_vertex in np.unique(np.concatenate((network.source, network.target))):
+        result = isochrone(network, [start_vertex], STEPS, cumulative=True)
+
+        steps, polygons = cumulative_polygons(result)
+
+        assert_nested(steps, polygons)
+        assert all(polygon.is_valid for polygon in polygons)
+
+
+def test_cumulative_polygons_of_multi_isochrone_are_nested(network):
+    start_vertices = np.unique(network.source)[::7]
+    result = isochrone(network, start_vertices, STEPS, multi_source=True, cumulative=True)
+
+    steps, polygons = cumulative_polygons(result)
+
+    assert len(steps) > 0
+    assert_nested(steps, polygons)
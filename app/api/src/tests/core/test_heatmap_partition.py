@@ -0,0 +1,75 @@
+import numpy as np
+
+from src.core.heatmap_partition import TILE_SIZE, EdgeDensity, partition
+
+
+def uniform_density(n_tiles: int, edges_per_tile: int = 1) -> EdgeDensity:
+    tile_x, tile_y = np.meshgrid(np.arange(n_tiles), np.arange(n_tiles), indexing="ij")
+    return EdgeDensity(tile_x.ravel(), tile_y.ravel(), np.full(n_tiles * n_tiles, edges_per_tile))
+
+
+def test_edge_density_counts_boxes():
+    density = EdgeDensity(np.array([0, 1, 1, 5]), np.array([0, 0, 2, 5]), np.array([1, 2, 3, 4]))
+
+    assert density.count(0, 0, TILE_SIZE - 1, TILE_SIZE - 1) == 1
+    assert density.count(0, 0, 2 * TILE_SIZE - 1, TILE_SIZE - 1) == 3
+    assert density.count(0, 0, 2 * TILE_SIZE - 1, 3 * TILE_SIZE - 1) == 6
+    # Boxes beyond the extent of the tiles are clipped
+    assert density.count(-10 * TILE_SIZE, -10 * TILE_SIZE, 10 * TILE_SIZE, 10 * TILE_SIZE) == 10
+    assert density.count(20 * TILE_SIZE, 20 * TILE_SIZE, 30 * TILE_SIZE, 30 * TILE_SIZE) == 0
+
+
+def test_partition_labels_and_footprints():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 40 * TILE_SIZE, 1000)
+    y = rng.uniform(0, 40 * TILE_SIZE, 1000)
+    density = uniform_density(40)
+
+    labels, footprints = partition(x, y, density, buffer=TILE_SIZE, batches=8)
+
+    assert labels.shape == (1000,)
+    assert sorted(np.unique(labels).tolist()) == list(range(8))
+    assert len(footprints) == 8
+    # The batches are numbered by descending footprint
+    assert np.all(np.diff(footprints) <= 0)
+    for batch, footprint in enumerate(footprints):
+        cells = labels == batch
+        assert footprint == density.count(
+            x[cells].min() - TILE_SIZE,
+            y[cells].min() - TILE_SIZE,
+            x[cells].max() + TILE_SIZE,
+            y[cells].max() + TILE_SIZE,
+        )
+
+
+def test_partition_balances_the_work():
+    # Dense network in the west, sparse in the east: the batches in the west get fewer cells
+    tile_x, tile_y = np.meshgrid(np.arange(20), np.arange(20), indexing="ij")
+    counts = np.where(tile_x < 10, 20, 1)
+    density = EdgeDensity(tile_x.ravel(), tile_y.ravel(), counts.ravel())
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 20 * TILE_SIZE, 2000)
+    y = rng.uniform(0, 20 * TILE_SIZE, 2000)
+
+    labels, _ = partition(x, y, density, buffer=TILE_SIZE, batches=4)
+
+    work = density.count(x - TILE_SIZE, y - TILE_SIZE, x + TILE_SIZE, y + TILE_SIZE) + 1
+    batch_work = np.bincount(labels, weights=work)
+    assert batch_work.max() / batch_work.min() < 1.2
+    cells_west = [np.mean(x[labels == b] < 10 * TILE_SIZE) for b in range(4)]
+    batch_sizes = np.bincount(labels)
+    assert batch_sizes[np.argmax(cells_west)] < batch_sizes[np.argmin(cells_west)]
+
+
+def test_partition_small_inputs():
+    density = uniform_density(2)
+
+    labels, footprints = partition(np.array([10.0]), np.array([10.0]), density, buffer=100, batches=4)
+    assert labels.tolist() == [0]
+    assert len(footprints) == 1
+
+    labels, footprints = partition(
+        np.array([10.0, 400.0]), np.array([10.0, 10.0]), density, buffer=100, batches=1
+    )
+    assert labels.tolist() == [0, 0]
+    assert len(footprints) == 1
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from src.core.isochrone_cache import IsochroneCache, IsochroneCacheEntry
+
+
+def isochrone_request(**kwargs) -> SimpleNamespace:
+    request = dict(
+        x=11.575306697287969,
+        y=48.13697276799013,
+        routing_profile="walking_standard",
+        speed=5,
+        minutes=10,
+        n=2,
+        modus="default",
+        scenario_id=None,
+    )
+    request.update(kwargs)
+    return SimpleNamespace(**request)
+
+
+def entry() -> IsochroneCacheEntry:
+    return IsochroneCacheEntry(result=object(), starting_point="POINT (11.57531 48.13697)")
+
+
+def test_key_rounds_the_starting_point():
+    key = IsochroneCache.key(isochrone_request(), 1)
+
+    assert key == IsochroneCache.key(isochrone_request(x=11.5753071, y=48.1369731), 1)
+    assert key != IsochroneCache.key(isochrone_request(x=11.57532), 1)
+    assert key == IsochroneCache.key(
+        isochrone_request(x=0, y=0), 1, x="11.57531", y="48.13697"
+    )
+
+
+def test_key_depends_on_routing_parameters_and_data_version():
+    key = IsochroneCache.key(isochrone_request(), 1)
+
+    assert key != IsochroneCache.key(isochrone_request(), 2)
+    assert key != IsochroneCache.key(isochrone_request(routing_profile="cycling_standard"), 1)
+    assert key != IsochroneCache.key(isochrone_request(minutes=15), 1)
+    assert key != IsochroneCache.key(isochrone_request(n=3), 1)
+
+
+def test_key_ignores_scenario_of_default_modus():
+    assert IsochroneCache.key(isochrone_request(scenario_id=4), 1) == IsochroneCache.key(
+        isochrone_request(), 1
+    )
+    assert IsochroneCache.key(
+        isochrone_request(modus="scenario", scenario_id=4), 1
+    ) != IsochroneCache.key(isochrone_request(modus="scenario", scenario_id=5), 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = IsochroneCache(max_size=2)
+    keys = [IsochroneCache.key(isochrone_request(minutes=minutes), 1) for minutes in (5, 10, 15)]
+    entries = [entry() for _ in keys]
+
+    cache.put(keys[0], entries[0])
+    cache.put(keys[1], entries[1])
+    assert cache.get(keys[0]) is entries[0]
+    cache.put(keys[2], entries[2])
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is entries[0]
+    assert cache.get(keys[2]) is entries[2]
+
+
+def test_invalidate_scenario():
+    cache = IsochroneCache(max_size=4)
+    default_key = IsochroneCache.key(isochrone_request(), 1)
+    scenario_key = IsochroneCache.key(isochrone_request(modus="scenario", scenario_id=4), 1)
+    cache.put(default_key, entry())
+    cache.put(scenario_key, entry())
+
+    cache.invalidate(4)
+    assert cache.get(scenario_key) is None
+    assert cache.get(default_key) is not None
+
+    cache.invalidate()
+    assert cache.get(default_key) is None
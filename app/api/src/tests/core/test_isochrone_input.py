@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.core.network_cache import RoutingNetwork
+from src.exts.cpp.bind import isochrone
+
+
+def line_network() -> RoutingNetwork:
+    """Three edges of 100 m in a row from vertex 1 to vertex 4."""
+    coordinates = np.array([[0.0, 0.0], [100.0, 0.0], [100.0, 0.0], [200.0, 0.0], [200.0, 0.0], [300.0, 0.0]])
+    return RoutingNetwork.from_columns(
+        {
+            "id": [1, 2, 3],
+            "source": [1, 2, 3],
+            "target": [2, 3, 4],
+            "cost": [100.0, 100.0, 100.0],
+            "reverse_cost": [100.0, 100.0, 100.0],
+            "length": [100.0, 100.0, 100.0],
+            "coordinates": coordinates,
+            "offsets": [0, 2, 4, 6],
+        }
+    )
+
+
+def test_isochrone_of_valid_network():
+    result = isochrone(line_network(), [1], [150.0])
+
+    assert len(result.network.edge) > 0
+
+
+@pytest.mark.parametrize(
+    "modify",
+    [
+        # Truncated coordinates
+        lambda network: setattr(network, "coordinates", network.coordinates[:4]),
+        lambda network: setattr(network, "offsets", np.array([1, 2, 4, 6])),
+        lambda network: setattr(network, "offsets", np.array([0, 4, 2, 6])),
+        lambda network: setattr(network, "offsets", np.array([0, 2, 4])),
+        lambda network: setattr(network, "source", network.source[:2]),
+    ],
+)
+def test_isochrone_rejects_malformed_network(modify):
+    network = line_network()
+    modify(network)
+
+    with pytest.raises(ValueError):
+        isochrone(network, [1], [150.0], threads=2)
@@ -0,0 +1,120 @@
+import struct
+
+import numpy as np
+import pytest
+
+from src.core.network_cache import EARTH_RADIUS, decode_wkb_linestrings, snap_points
+
+
+def wkb_linestring(points, byte_order="<", geometry_type=2) -> bytes:
+    """WKB of a linestring like ST_AsBinary(geom, 'NDR') with byte_order '<'."""
+    flag = 1 if byte_order == "<" else 0
+    dimensions = len(points[0]) if points else 2
+    data = struct.pack(f"{byte_order}bII", flag, geometry_type, len(points))
+    return data + b"".join(struct.pack(f"{byte_order}{dimensions}d", *p) for p in points)
+
+
+def buffer(lines):
+    """Coordinate buffer and offsets of linestrings."""
+    coordinates = np.array([point for line in lines for point in line], dtype=np.float64).reshape(-1, 2)
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum([len(line) for line in lines], out=offsets[1:])
+    return coordinates, offsets
+
+
+def test_snap_points_to_nearest_linestring():
+    coordinates, offsets = buffer(
+        [
+            [(0, 0), (100, 0)],
+            [(0, 50), (0, 150), (100, 150)],
+        ]
+    )
+    x = np.array([25.0, 5.0, 50.0])
+    y = np.array([3.0, 100.0, 148.0])
+
+    line_index, fractions = snap_points(coordinates, offsets, x, y, max_distance=10)
+
+    assert line_index.tolist() == [0, 1, 1]
+    np.testing.assert_allclose(fractions, [0.25, 50 / 200, 150 / 200])
+
+
+def test_snap_points_beyond_max_distance():
+    coordinates, offsets = buffer([[(0, 0), (100, 0)]])
+
+    line_index, fractions = snap_points(
+        coordinates, offsets, np.array([50.0, 50.0]), np.array([5.0, 20.0]), max_distance=10
+    )
+
+    assert line_index.tolist() == [0, -1]
+    assert np.isnan(fractions[1])
+
+
+def test_snap_points_scales_max_distance_to_web_mercator():
+    # At 60 degrees latitude one meter is two units of web mercator
+    y_60 = np.log(np.tan(np.pi / 4 + np.radians(60) / 2)) * EARTH_RADIUS
+    coordinates, offsets = buffer([[(0, y_60), (100, y_60)]])
+
+    line_index, _ = snap_points(
+        coordinates, offsets, np.array([50.0, 50.0]), np.array([y_60 + 15, y_60 + 25]), max_distance=10
+    )
+
+    assert line_index.tolist() == [0, -1]
+
+
+def test_snap_points_skips_empty_linestrings():
+    coordinates, offsets = buffer([[], [(0, 0)], [(0, 10), (100, 10)]])
+
+    line_index, fractions = snap_points(
+        coordinates, offsets, np.array([50.0]), np.array([0.0]), max_distance=20
+    )
+
+    assert line_index.tolist() == [2]
+    np.testing.assert_allclose(fractions, [0.5])
+
+
+def test_snap_no_points_or_lines():
+    coordinates, offsets = buffer([])
+
+    line_index, fractions = snap_points(
+        coordinates, offsets, np.array([1.0]), np.array([1.0]), max_distance=10
+    )
+
+    assert line_index.tolist() == [-1]
+    assert np.isnan(fractions).all()
+
+
+def test_decode_wkb_linestrings():
+    geoms = [wkb_linestring([(0, 0), (1, 2), (3, 4)]), None, wkb_linestring([(5.5, -6), (7, 8)])]
+
+    coordinates, offsets = decode_wkb_linestrings(geoms)
+
+    assert offsets.tolist() == [0, 3, 3, 5]
+    np.testing.assert_array_equal(
+        coordinates, [(0, 0), (1, 2), (3, 4), (5.5, -6), (7, 8)]
+    )
+
+
+def test_decode_wkb_linestrings_rejects_other_geometries():
+    with pytest.raises(ValueError):
+        # Multilinestring header
+        decode_wkb_linestrings([wkb_linestring([(0, 0), (1, 1)], geometry_type=5)])
+    with pytest.raises(ValueError):
+        decode_wkb_linestrings([wkb_linestring([(0, 0), (1, 1)], byte_order=">")])
+    with pytest.raises(ValueError):
+        decode_wkb_linestrings([wkb_linestring([(0, 0, 0), (1, 1, 1)])])
+
+
+def test_snap_points_to_decoded_linestrings():
+    # Reached edges around a heatmap cluster are snapped to as WKB (see compute_reached_pois_cluster)
+    geoms = [
+        wkb_linestring([(0, 0), (100, 0)]),
+        wkb_linestring([(0, 20), (100, 20)]),
+    ]
+    coordinates, offsets = decode_wkb_linestrings(geoms)
+
+    line_index, fractions = snap_points(
+        coordinates, offsets, np.array([10.0, 80.0]), np.array([18.0, 2.0]), max_distance=5
+    )
+
+    assert line_index.tolist() == [1, 0]
+    np.testing.assert_allclose(fractions, [0.1, 0.8])
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.traveltime_store import TravelTimeMatrix, TravelTimeStore
+
+
+def edges_traveltime(rows) -> pd.DataFrame:
+    """Reached edges in the columns of customer.reached_edge_heatmap_grid_calculation."""
+    df = pd.DataFrame(
+        rows,
+        columns=[
+            "reached_edge_heatmap_id",
+            "grid_calculation_id",
+            "start_cost",
+            "end_cost",
+            "start_perc",
+            "end_perc",
+            "edge_type",
+        ],
+    )
+    df["start_perc"] = df["start_perc"].astype("Int64")
+    df["end_perc"] = df["end_perc"].astype("Int64")
+    return df
+
+
+@pytest.fixture
+def matrix() -> TravelTimeMatrix:
+    return TravelTimeMatrix.from_dataframe(
+        edges_traveltime(
+            [
+                # Full edge reached from two grid cells
+                (1, 10, 100, 200, None, None, None),
+                (1, 11, 300, 200, None, None, None),
+                # The first quarter of the edge is reached until the limit of 600 s
+                (2, 10, 500, 600, 0, 2500, "p"),
+                # Artificial edge at a starting point
+                (2000000001, 12, 0, 50, None, None, "a"),
+            ]
+        )
+    )
+
+
+def test_costs_of_full_edges(matrix: TravelTimeMatrix):
+    request_index, grid_ids, costs = matrix.costs(np.array([1, 2000000001]), np.array([0.5, 0.2]))
+
+    assert request_index.tolist() == [0, 0, 1]
+    assert grid_ids.tolist() == [10, 11, 12]
+    np.testing.assert_allclose(costs, [150, 250, 10])
+
+
+def test_costs_of_partial_edge(matrix: TravelTimeMatrix):
+    # The fractions are compared with the percentages stored times 10000
+    request_index, grid_ids, costs = matrix.costs(np.array([2, 2, 2]), np.array([0.1, 0.25, 0.3]))
+
+    assert request_index.tolist() == [0, 1]
+    assert grid_ids.tolist() == [10, 10]
+    # The cost is interpolated on the reached part of the edge
+    np.testing.assert_allclose(costs, [540, 600])
+
+
+def test_costs_of_reversed_partial_edge():
+    # Partial edge reached from the end of the edge, the percentages are in the direction of the geometry
+    matrix = TravelTimeMatrix.from_dataframe(
+        edges_traveltime([(3, 10, 600, 400, 5000, 10000, "p")])
+    )
+    request_index, grid_ids, costs = matrix.costs(np.array([3, 3]), np.array([0.25, 0.75]))
+
+    assert request_index.tolist() == [1]
+    np.testing.assert_allclose(costs, [500])
+
+
+def test_costs_of_unknown_edges(matrix: TravelTimeMatrix):
+    request_index, grid_ids, costs = matrix.costs(np.array([99]), np.array([0.5]))
+
+    assert len(request_index) == len(grid_ids) == len(costs) == 0
+
+
+def test_consolidated_store(tmp_path, matrix: TravelTimeMatrix):
+    store = TravelTimeStore(str(tmp_path))
+    store.write_cluster(
+        0, edges_traveltime([(2, 10, 500, 600, 0, 2500, "p"), (1, 10, 100, 200, None, None, None)])
+    )
+    store.write_cluster(1, edges_traveltime([(1, 11, 300, 200, None, None, None)]))
+    store.consolidate()
+    loaded = store.load()
+
+    assert loaded.edge_ids.tolist() == [1, 2]
+    assert store.full_edge_ids().tolist() == [1]
+    request_index, grid_ids, costs = loaded.costs(np.array([1, 2]), np.array([0.5, 0.1]))
+    assert sorted(zip(request_index.tolist(), grid_ids.tolist(), costs.tolist())) == [
+        (0, 10, 150.0),
+        (0, 11, 250.0),
+        (1, 10, 540.0),
+    ]